@@ -11,8 +11,14 @@ import uvicorn
 from fastapi import FastAPI
 from kiln_ai.adapters.remote_config import load_remote_models
 from kiln_ai.utils.logging import setup_litellm_logging
+from kiln_server.storage_executor import shutdown_storage_executor
 
 from app.desktop.log_config import log_config
+from app.desktop.studio_server.cache_warmup_api import (
+    connect_cache_warmup_api,
+    start_cache_warmup,
+    stop_cache_warmup,
+)
 from app.desktop.studio_server.data_gen_api import connect_data_gen_api
 from app.desktop.studio_server.eval_api import connect_evals_api
 from app.desktop.studio_server.finetune_api import connect_fine_tune_api
@@ -39,7 +45,13 @@ async def lifespan(app: FastAPI):
     # Set datamodel strict mode on startup
     original_strict_mode = datamodel_strict_mode.strict_mode()
     datamodel_strict_mode.set_strict_mode(True)
+    # Warm the model cache in the background (if enabled). Doesn't delay startup.
+    start_cache_warmup()
     yield
+    # Waits briefly for the load in progress, off the event loop
+    await asyncio.to_thread(stop_cache_warmup)
+    # Let in progress saves finish before exiting
+    await asyncio.to_thread(shutdown_storage_executor)
     # Reset datamodel strict mode on shutdown
     datamodel_strict_mode.set_strict_mode(original_strict_mode)
 
@@ -57,6 +69,7 @@ def make_app():
     connect_data_gen_api(app)
     connect_fine_tune_api(app)
     connect_evals_api(app)
+    connect_cache_warmup_api(app)
 
     # Important: webhost must be last, it handles all other URLs
     connect_webhost(app)
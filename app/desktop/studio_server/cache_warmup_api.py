@@ -0,0 +1,197 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Literal
+
+from fastapi import FastAPI
+from kiln_ai.datamodel import Project, Task
+from kiln_ai.datamodel.basemodel import KilnBaseModel
+from kiln_ai.datamodel.model_cache import ModelCache
+from kiln_ai.utils.config import Config
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Values for the cache_warmup setting
+WarmupLevel = Literal["off", "projects", "runs"]
+
+
+class CacheWarmupStatus(BaseModel):
+    state: Literal["not_started", "running", "done", "cancelled"]
+    # "projects": projects, tasks, prompts, evals and their configs. "runs": also task runs and eval runs.
+    level: WarmupLevel
+    projects_total: int
+    projects_done: int
+    tasks_total: int
+    tasks_done: int
+    models_loaded: int
+    errors: int
+    started_at: datetime | None
+    finished_at: datetime | None
+    cache_entries: int
+    cache_estimated_bytes: int
+
+
+class CacheWarmup:
+    """
+    Loads every project in the background, so the model cache is warm before the first request needs it.
+
+    Runs in a daemon thread, loading tasks in a thread pool. Never blocks server readiness: requests are served while it runs, and share the cache it populates.
+    """
+
+    def __init__(self, level: WarmupLevel = "projects", max_workers: int = 4):
+        self.level = level
+        self.max_workers = max_workers
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._state: Literal["not_started", "running", "done", "cancelled"] = (
+            "not_started"
+        )
+        self._projects_total = 0
+        self._projects_done = 0
+        self._tasks_total = 0
+        self._tasks_done = 0
+        self._models_loaded = 0
+        self._errors = 0
+        self._started_at: datetime | None = None
+        self._finished_at: datetime | None = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._state = "running"
+            self._started_at = datetime.now()
+            self._thread = threading.Thread(
+                target=self._run, name="kiln_cache_warmup", daemon=True
+            )
+            self._thread.start()
+
+    def cancel(self, timeout: float | None = 5.0) -> None:
+        """Stop the warm-up. Waits up to timeout seconds for the load in progress to finish."""
+        self._cancelled.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def status(self) -> CacheWarmupStatus:
+        cache_stats = ModelCache.shared().stats()
+        with self._lock:
+            return CacheWarmupStatus(
+                state=self._state,
+                level=self.level,
+                projects_total=self._projects_total,
+                projects_done=self._projects_done,
+                tasks_total=self._tasks_total,
+                tasks_done=self._tasks_done,
+                models_loaded=self._models_loaded,
+                errors=self._errors,
+                started_at=self._started_at,
+                finished_at=self._finished_at,
+                cache_entries=cache_stats.entries,
+                cache_estimated_bytes=cache_stats.estimated_bytes,
+            )
+
+    def _run(self) -> None:
+        projects = Config.shared().projects
+        project_paths = list(projects) if isinstance(projects, list) else []
+        with self._lock:
+            self._projects_total = len(project_paths)
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="kiln_cache_warmup"
+        ) as executor:
+            for project_path in project_paths:
+                if self._cancelled.is_set():
+                    break
+                try:
+                    project = Project.load_from_file(Path(project_path), readonly=True)
+                    tasks = project.tasks(readonly=True)
+                except Exception:
+                    # Missing or invalid projects are reported to the user elsewhere
+                    logger.debug("Cache warm-up skipped project %s", project_path)
+                    self._count(errors=1)
+                    tasks = []
+                else:
+                    self._count(models=1 + len(tasks))
+                with self._lock:
+                    self._tasks_total += len(tasks)
+                # Wait for each project's tasks, so cancelling doesn't leave a long queue behind
+                for _ in executor.map(self._warm_task, tasks):
+                    pass
+                self._count(projects=1)
+
+        with self._lock:
+            self._state = "cancelled" if self._cancelled.is_set() else "done"
+            self._finished_at = datetime.now()
+
+    def _warm_task(self, task: Task) -> None:
+        if self._cancelled.is_set():
+            return
+        try:
+            self._count(models=len(task.prompts(readonly=True)))
+            for eval in task.evals(readonly=True):
+                configs = eval.configs(readonly=True)
+                self._count(models=1 + len(configs))
+                if self.level == "runs":
+                    for config in configs:
+                        self._warm_runs(config.iter_runs(readonly=True, trusted=True))
+            if self.level == "runs":
+                self._warm_runs(task.iter_runs(readonly=True, trusted=True))
+        except Exception:
+            logger.exception("Cache warm-up failed for task %s", task.path)
+            self._count(errors=1)
+        self._count(tasks=1)
+
+    def _warm_runs(self, runs: Iterator[KilnBaseModel]) -> None:
+        # Lazy, so cancelling takes effect between runs
+        for _ in runs:
+            if self._cancelled.is_set():
+                return
+            self._count(models=1)
+
+    def _count(
+        self, projects: int = 0, tasks: int = 0, models: int = 0, errors: int = 0
+    ) -> None:
+        with self._lock:
+            self._projects_done += projects
+            self._tasks_done += tasks
+            self._models_loaded += models
+            self._errors += errors
+
+
+_current_warmup: CacheWarmup | None = None
+
+
+def cache_warmup_level() -> WarmupLevel:
+    level = Config.shared().cache_warmup
+    if level in ("projects", "runs"):
+        return level
+    return "off"
+
+
+def start_cache_warmup() -> CacheWarmup | None:
+    """Start warming the cache, if enabled by the cache_warmup setting."""
+    global _current_warmup
+    level = cache_warmup_level()
+    if level == "off":
+        return None
+    _current_warmup = CacheWarmup(level=level)
+    _current_warmup.start()
+    return _current_warmup
+
+
+def stop_cache_warmup() -> None:
+    if _current_warmup is not None:
+        _current_warmup.cancel()
+
+
+def connect_cache_warmup_api(app: FastAPI):
+    @app.get("/api/cache_warmup")
+    def get_cache_warmup_status() -> CacheWarmupStatus:
+        if _current_warmup is not None:
+            return _current_warmup.status()
+        return CacheWarmup(level="off").status()
@@ -1,7 +1,7 @@
 import json
-from typing import Any, Dict, List, Set, Tuple
+from typing import Any, Dict, Iterable, List, Set, Tuple
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse
 from kiln_ai.adapters.eval.eval_runner import EvalRunner
 from kiln_ai.adapters.ml_model_list import ModelProviderName
@@ -14,7 +14,12 @@ from kiln_ai.datamodel import (
     TaskRun,
 )
 from kiln_ai.datamodel.basemodel import ID_TYPE
-from kiln_ai.datamodel.dataset_filters import DatasetFilterId, dataset_filter_from_id
+from kiln_ai.datamodel.dataset_filters import (
+    DatasetFilterId,
+    dataset_filter_from_id,
+    filtered_run_ids,
+    iter_filtered_runs,
+)
 from kiln_ai.datamodel.eval import (
     Eval,
     EvalConfig,
@@ -28,6 +33,9 @@ from kiln_ai.datamodel.prompt_id import is_frozen_prompt
 from kiln_ai.datamodel.task import RunConfigProperties, TaskRunConfig
 from kiln_ai.datamodel.task_output import normalize_rating
 from kiln_ai.utils.name_generator import generate_memorable_name
+from kiln_server.conditional_get import collection_etag, not_modified_response
+from kiln_server.ndjson import ndjson_response
+from kiln_server.storage_executor import run_storage, run_storage_json
 from kiln_server.task_api import task_from_id
 from pydantic import BaseModel
 
@@ -188,7 +196,7 @@ def dataset_ids_in_filter(
 ) -> Set[ID_TYPE]:
     # Fetch all the dataset items IDs in a filter
     filter = dataset_filter_from_id(filter_id)
-    return {run.id for run in task.runs(readonly=readonly) if filter(run)}
+    return filtered_run_ids(task, filter)
 
 
 def runs_in_filter(
@@ -196,7 +204,7 @@ def runs_in_filter(
 ) -> list[TaskRun]:
     # Fetch all the dataset items IDs in a filter
     filter = dataset_filter_from_id(filter_id)
-    return [run for run in task.runs(readonly=readonly) if filter(run)]
+    return list(iter_filtered_runs(task, filter, readonly=readonly))
 
 
 def build_score_key_to_task_requirement_id(task: Task) -> Dict[str, ID_TYPE]:
@@ -239,7 +247,7 @@ def human_score_from_task_run(
 
 
 def count_human_evals(
-    items: List[TaskRun],
+    items: Iterable[TaskRun],
     eval: Eval,
     score_key_to_task_requirement_id: Dict[str, ID_TYPE],
 ) -> Tuple[int, int, int]:
@@ -269,6 +277,293 @@ def count_human_evals(
     return fully_rated_count, partially_rated_count, not_rated_count
 
 
+def eval_run_results(
+    project_id: str, task_id: str, eval_id: str, eval_config_id: str, run_config_id: str
+) -> EvalRunResult:
+    eval = eval_from_id(project_id, task_id, eval_id)
+    eval_config = eval_config_from_id(project_id, task_id, eval_id, eval_config_id)
+    run_config = task_run_config_from_id(project_id, task_id, run_config_id)
+    results = [
+        run_result
+        for run_result in eval_config.iter_runs(readonly=True)
+        if run_result.task_run_config_id == run_config_id
+    ]
+    return EvalRunResult(
+        results=results,
+        eval=eval,
+        eval_config=eval_config,
+        run_config=run_config,
+    )
+
+
+def eval_progress(project_id: str, task_id: str, eval_id: str) -> EvalProgress:
+    task = task_from_id(project_id, task_id)
+    eval = eval_from_id(project_id, task_id, eval_id)
+    dataset_ids = dataset_ids_in_filter(task, eval.eval_set_filter_id, readonly=True)
+    golden_dataset_runs = runs_in_filter(
+        task, eval.eval_configs_filter_id, readonly=True
+    )
+
+    # Count how many dataset items have human evals
+    fully_rated_count, partially_rated_count, not_rated_count = count_human_evals(
+        golden_dataset_runs,
+        eval,
+        build_score_key_to_task_requirement_id(task),
+    )
+
+    current_eval_method = next(
+        (
+            eval_config
+            for eval_config in eval.configs()
+            if eval_config.id == eval.current_config_id
+        ),
+        None,
+    )
+
+    current_run_method = next(
+        (
+            run_config
+            for run_config in task.run_configs()
+            if run_config.id == eval.current_run_config_id
+        ),
+        None,
+    )
+
+    return EvalProgress(
+        dataset_size=len(dataset_ids),
+        golden_dataset_size=len(golden_dataset_runs),
+        golden_dataset_not_rated_count=not_rated_count,
+        golden_dataset_partially_rated_count=partially_rated_count,
+        golden_dataset_fully_rated_count=fully_rated_count,
+        current_eval_method=current_eval_method,
+        current_run_method=current_run_method,
+    )
+
+
+# This compares run_configs to each other on a given eval_config. Compare to below which compares eval_configs to each other.
+def eval_config_score_summary(
+    project_id: str, task_id: str, eval_id: str, eval_config_id: str
+) -> EvalResultSummary:
+    task = task_from_id(project_id, task_id)
+    eval = eval_from_id(project_id, task_id, eval_id)
+    eval_config = eval_config_from_id(project_id, task_id, eval_id, eval_config_id)
+    task_runs_configs = task.run_configs()
+
+    # Build a set of all the dataset items IDs we expect to have scores for
+    expected_dataset_ids = dataset_ids_in_filter(
+        task, eval.eval_set_filter_id, readonly=True
+    )
+    if len(expected_dataset_ids) == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="No dataset ids in eval set filter. Add items to your dataset matching the eval set filter.",
+        )
+
+    # save a copy of the expected dataset ids for each run config, we'll update each as we process each eval run
+    remaining_expected_dataset_ids: Dict[ID_TYPE, Set[ID_TYPE]] = {
+        run_config.id: set(expected_dataset_ids) for run_config in task_runs_configs
+    }
+    # Track how often we are missing scores in a eval_config. Should be 0 for a complete eval_config
+    partial_incomplete_counts: Dict[ID_TYPE, int] = {
+        run_config.id: 0 for run_config in task_runs_configs
+    }
+
+    # task_run_config_id -> output_score_json_key -> score/total for calculating the mean score
+    total_scores: Dict[ID_TYPE, Dict[str, float]] = {}
+    score_counts: Dict[ID_TYPE, Dict[str, int]] = {}
+
+    for eval_run in eval_config.iter_runs(readonly=True):
+        if eval_run.task_run_config_id is None:
+            # This eval_run is not associated with a run_config, so we should not count it
+            continue
+        run_config_id = eval_run.task_run_config_id
+
+        # Check if we should count this eval_run. Not every eval_run has to go into the stats:
+        # - a dataset_id can be removed from the dataset filter (removed a tag)
+        # - this dataset_id was already counted (not great there are dupes, but shouldn't be double counted if there are)
+        if run_config_id not in remaining_expected_dataset_ids:
+            # This run_config is not in the eval config, so we should not count it
+            continue
+        if eval_run.dataset_id not in remaining_expected_dataset_ids[run_config_id]:
+            continue
+        else:
+            remaining_expected_dataset_ids[run_config_id].remove(eval_run.dataset_id)
+
+        incomplete = False
+        for output_score in eval.output_scores:
+            score_key = output_score.json_key()
+            if run_config_id not in total_scores:
+                total_scores[run_config_id] = {}
+                score_counts[run_config_id] = {}
+            if score_key not in total_scores[run_config_id]:
+                total_scores[run_config_id][score_key] = 0
+                score_counts[run_config_id][score_key] = 0
+            if score_key in eval_run.scores:
+                total_scores[run_config_id][score_key] += eval_run.scores[score_key]
+                score_counts[run_config_id][score_key] += 1
+            else:
+                # We're missing a required score, so this eval_run is incomplete
+                incomplete = True
+
+        if incomplete:
+            partial_incomplete_counts[run_config_id] += 1
+
+    # Convert to score summaries
+    results: Dict[ID_TYPE, Dict[str, ScoreSummary]] = {}
+    for run_config_id, output_scores in total_scores.items():
+        results[run_config_id] = {}
+        for output_score_id, score in output_scores.items():
+            count = score_counts[run_config_id][output_score_id]
+            if count > 0:
+                results[run_config_id][output_score_id] = ScoreSummary(
+                    mean_score=score / count
+                )
+
+    # Calculate the percent of the dataset that has been processed
+    run_config_percent_complete: Dict[ID_TYPE, float] = {}
+    for run_config in task_runs_configs:
+        # Partial incomplete (missing scores), and fully incomplete (no eval_run)
+        incomplete_count = partial_incomplete_counts[run_config.id] + len(
+            remaining_expected_dataset_ids[run_config.id]
+        )
+        percent_incomplete = incomplete_count / len(expected_dataset_ids)
+        run_config_percent_complete[run_config.id] = 1 - percent_incomplete
+
+    return EvalResultSummary(
+        results=results,
+        run_config_percent_complete=run_config_percent_complete,
+        dataset_size=len(expected_dataset_ids),
+    )
+
+
+# Compared to above, this is comparing all eval configs to each other, not looking at a single eval config
+def eval_configs_score_summary(
+    project_id: str, task_id: str, eval_id: str
+) -> EvalConfigCompareSummary:
+    task = task_from_id(project_id, task_id)
+    eval = eval_from_id(project_id, task_id, eval_id)
+    eval_configs = eval.configs(readonly=True)
+
+    score_key_to_task_requirement_id = build_score_key_to_task_requirement_id(task)
+
+    # Build a set of all the dataset items IDs we expect to have scores for
+    # Fetch all the dataset items in a filter, and return a map of dataset_id -> TaskRun
+    filter = dataset_filter_from_id(eval.eval_configs_filter_id)
+    expected_dataset_items = {
+        run.id: run for run in iter_filtered_runs(task, filter, readonly=True)
+    }
+    expected_dataset_ids = set(expected_dataset_items.keys())
+    if len(expected_dataset_ids) == 0:
+        return EvalConfigCompareSummary(
+            results={},
+            eval_config_percent_complete={},
+            dataset_size=0,
+            fully_rated_count=0,
+            partially_rated_count=0,
+            not_rated_count=0,
+        )
+
+    # save a copy of the expected dataset ids for each eval config id, we'll update each as we process each eval run
+    remaining_expected_dataset_ids: Dict[ID_TYPE, Set[ID_TYPE]] = {
+        eval_config.id: set(expected_dataset_ids) for eval_config in eval_configs
+    }
+
+    # eval_config_id -> output_score_json_key -> correlation calculator
+    correlation_calculators: Dict[ID_TYPE, Dict[str, CorrelationCalculator]] = {}
+
+    for eval_config in eval_configs:
+        for eval_run in eval_config.iter_runs(readonly=True):
+            dataset_item = expected_dataset_items.get(eval_run.dataset_id, None)
+            if dataset_item is None:
+                # A dataset_id can be removed from the dataset filter (ran previously, then removed the tag to remove it from the eval config set filter)
+                # A dataset_id could be for an run_config, not for comparing eval at all
+                continue
+
+            # Check if we should count this eval_run. Not every eval_run has to go into the stats:
+            # Example: this dataset_id was already counted (not great there are dupes, but shouldn't be double counted if there are)
+            if (
+                eval_run.dataset_id
+                not in remaining_expected_dataset_ids[eval_config.id]
+            ):
+                continue
+            else:
+                remaining_expected_dataset_ids[eval_config.id].remove(
+                    eval_run.dataset_id
+                )
+
+            for output_score in eval.output_scores:
+                score_key = output_score.json_key()
+                eval_score: float | None = eval_run.scores.get(score_key, None)
+
+                # Fetch the human eval score from the dataset item
+                human_score = human_score_from_task_run(
+                    dataset_item, output_score, score_key_to_task_requirement_id
+                )
+
+                if human_score is None or eval_score is None:
+                    # This score doesn't have both a human eval and eval score, so we can't compare
+                    continue
+
+                if eval_config.id not in correlation_calculators:
+                    correlation_calculators[eval_config.id] = {}
+
+                calculator = correlation_calculators[eval_config.id].get(
+                    score_key, None
+                )
+                if calculator is None:
+                    calculator = CorrelationCalculator()
+                    correlation_calculators[eval_config.id][score_key] = calculator
+
+                normalized_eval_score = normalize_rating(eval_score, output_score.type)
+                normalized_human_score = normalize_rating(
+                    human_score, output_score.type
+                )
+                calculator.add_score(
+                    CorrelationScore(
+                        measured_score=eval_score,
+                        human_score=human_score,
+                        normalized_measured_score=normalized_eval_score,
+                        normalized_human_score=normalized_human_score,
+                    )
+                )
+
+    # Convert to score summaries
+    results: Dict[ID_TYPE, Dict[str, CorrelationResult]] = {}
+    for eval_config_id in correlation_calculators.keys():
+        results[eval_config_id] = {}
+        for score_key in correlation_calculators[eval_config_id].keys():
+            calculator = correlation_calculators[eval_config_id].get(score_key, None)
+            if calculator is None:
+                # No scores to calculate correlation for this pair
+                continue
+
+            correlation_result = calculator.calculate_correlation()
+            results[eval_config_id][score_key] = correlation_result
+
+    # Calculate the percent of the dataset that has been processed
+    eval_config_percent_complete: Dict[ID_TYPE, float] = {}
+    for eval_config in eval_configs:
+        incomplete_count = len(remaining_expected_dataset_ids[eval_config.id])
+        percent_incomplete = incomplete_count / len(expected_dataset_ids)
+        eval_config_percent_complete[eval_config.id] = 1 - percent_incomplete
+
+    # Count how many dataset items have human evals
+    fully_rated_count, partially_rated_count, not_rated_count = count_human_evals(
+        expected_dataset_items.values(),
+        eval,
+        score_key_to_task_requirement_id,
+    )
+
+    return EvalConfigCompareSummary(
+        results=results,
+        eval_config_percent_complete=eval_config_percent_complete,
+        dataset_size=len(expected_dataset_ids),
+        fully_rated_count=fully_rated_count,
+        partially_rated_count=partially_rated_count,
+        not_rated_count=not_rated_count,
+    )
+
+
 def connect_evals_api(app: FastAPI):
     @app.post("/api/projects/{project_id}/tasks/{task_id}/create_evaluator")
     async def create_evaluator(
@@ -325,9 +620,18 @@ def connect_evals_api(app: FastAPI):
         eval.delete()
 
     @app.get("/api/projects/{project_id}/tasks/{task_id}/evals")
-    async def get_evals(project_id: str, task_id: str) -> list[Eval]:
-        task = task_from_id(project_id, task_id)
-        return task.evals()
+    async def get_evals(
+        project_id: str, task_id: str, request: Request, response: Response
+    ) -> list[Eval]:
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
+        if task.path is not None:
+            etag = await run_storage(
+                project_id, collection_etag, [Eval.relationship_folder(task.path)]
+            )
+            not_modified = not_modified_response(request, response, etag)
+            if not_modified is not None:
+                return not_modified  # type: ignore
+        return await run_storage(project_id, task.evals)
 
     @app.get("/api/projects/{project_id}/tasks/{task_id}/eval/{eval_id}/eval_configs")
     async def get_eval_configs(
@@ -550,73 +854,56 @@ def connect_evals_api(app: FastAPI):
         eval_config_id: str,
         run_config_id: str,
     ) -> EvalRunResult:
-        eval = eval_from_id(project_id, task_id, eval_id)
-        eval_config = eval_config_from_id(project_id, task_id, eval_id, eval_config_id)
-        run_config = task_run_config_from_id(project_id, task_id, run_config_id)
-        results = [
-            run_result
-            for run_result in eval_config.runs(readonly=True)
-            if run_result.task_run_config_id == run_config_id
-        ]
-        return EvalRunResult(
-            results=results,
-            eval=eval,
-            eval_config=eval_config,
-            run_config=run_config,
+        return await run_storage_json(  # type: ignore
+            project_id,
+            EvalRunResult,
+            eval_run_results,
+            project_id,
+            task_id,
+            eval_id,
+            eval_config_id,
+            run_config_id,
         )
 
-    # Overview of the eval progress
-    @app.get("/api/projects/{project_id}/tasks/{task_id}/eval/{eval_id}/progress")
-    async def get_eval_progress(
+    @app.get(
+        "/api/projects/{project_id}/tasks/{task_id}/eval/{eval_id}/eval_config/{eval_config_id}/runs_stream"
+    )
+    async def get_eval_runs_stream(
         project_id: str,
         task_id: str,
         eval_id: str,
-    ) -> EvalProgress:
-        task = task_from_id(project_id, task_id)
-        eval = eval_from_id(project_id, task_id, eval_id)
-        dataset_ids = dataset_ids_in_filter(
-            task, eval.eval_set_filter_id, readonly=True
-        )
-        golden_dataset_runs = runs_in_filter(
-            task, eval.eval_configs_filter_id, readonly=True
-        )
-
-        # Count how many dataset items have human evals
-        fully_rated_count, partially_rated_count, not_rated_count = count_human_evals(
-            golden_dataset_runs,
-            eval,
-            build_score_key_to_task_requirement_id(task),
-        )
-
-        current_eval_method = next(
-            (
-                eval_config
-                for eval_config in eval.configs()
-                if eval_config.id == eval.current_config_id
-            ),
-            None,
+        eval_config_id: str,
+        run_config_id: str | None = None,
+    ) -> StreamingResponse:
+        """The runs of an eval config, streamed as NDJSON (one run per line). Optionally only the runs of one task run config."""
+        eval_config = await run_storage(
+            project_id,
+            eval_config_from_id,
+            project_id,
+            task_id,
+            eval_id,
+            eval_config_id,
         )
-
-        current_run_method = next(
+        return ndjson_response(
+            project_id,
             (
-                run_config
-                for run_config in task.run_configs()
-                if run_config.id == eval.current_run_config_id
+                eval_run
+                for eval_run in eval_config.iter_runs(readonly=True, trusted=True)
+                if run_config_id is None or eval_run.task_run_config_id == run_config_id
             ),
-            None,
         )
 
-        return EvalProgress(
-            dataset_size=len(dataset_ids),
-            golden_dataset_size=len(golden_dataset_runs),
-            golden_dataset_not_rated_count=not_rated_count,
-            golden_dataset_partially_rated_count=partially_rated_count,
-            golden_dataset_fully_rated_count=fully_rated_count,
-            current_eval_method=current_eval_method,
-            current_run_method=current_run_method,
+    # Overview of the eval progress
+    @app.get("/api/projects/{project_id}/tasks/{task_id}/eval/{eval_id}/progress")
+    async def get_eval_progress(
+        project_id: str,
+        task_id: str,
+        eval_id: str,
+    ) -> EvalProgress:
+        return await run_storage(
+            project_id, eval_progress, project_id, task_id, eval_id
         )
 
-    # This compares run_configs to each other on a given eval_config. Compare to below which compares eval_configs to each other.
     @app.get(
         "/api/projects/{project_id}/tasks/{task_id}/eval/{eval_id}/eval_config/{eval_config_id}/score_summary"
     )
@@ -626,100 +913,15 @@ def connect_evals_api(app: FastAPI):
         eval_id: str,
         eval_config_id: str,
     ) -> EvalResultSummary:
-        task = task_from_id(project_id, task_id)
-        eval = eval_from_id(project_id, task_id, eval_id)
-        eval_config = eval_config_from_id(project_id, task_id, eval_id, eval_config_id)
-        task_runs_configs = task.run_configs()
-
-        # Build a set of all the dataset items IDs we expect to have scores for
-        expected_dataset_ids = dataset_ids_in_filter(
-            task, eval.eval_set_filter_id, readonly=True
+        return await run_storage(
+            project_id,
+            eval_config_score_summary,
+            project_id,
+            task_id,
+            eval_id,
+            eval_config_id,
         )
-        if len(expected_dataset_ids) == 0:
-            raise HTTPException(
-                status_code=400,
-                detail="No dataset ids in eval set filter. Add items to your dataset matching the eval set filter.",
-            )
-
-        # save a copy of the expected dataset ids for each run config, we'll update each as we process each eval run
-        remaining_expected_dataset_ids: Dict[ID_TYPE, Set[ID_TYPE]] = {
-            run_config.id: set(expected_dataset_ids) for run_config in task_runs_configs
-        }
-        # Track how often we are missing scores in a eval_config. Should be 0 for a complete eval_config
-        partial_incomplete_counts: Dict[ID_TYPE, int] = {
-            run_config.id: 0 for run_config in task_runs_configs
-        }
-
-        # task_run_config_id -> output_score_json_key -> score/total for calculating the mean score
-        total_scores: Dict[ID_TYPE, Dict[str, float]] = {}
-        score_counts: Dict[ID_TYPE, Dict[str, int]] = {}
-
-        for eval_run in eval_config.runs(readonly=True):
-            if eval_run.task_run_config_id is None:
-                # This eval_run is not associated with a run_config, so we should not count it
-                continue
-            run_config_id = eval_run.task_run_config_id
-
-            # Check if we should count this eval_run. Not every eval_run has to go into the stats:
-            # - a dataset_id can be removed from the dataset filter (removed a tag)
-            # - this dataset_id was already counted (not great there are dupes, but shouldn't be double counted if there are)
-            if run_config_id not in remaining_expected_dataset_ids:
-                # This run_config is not in the eval config, so we should not count it
-                continue
-            if eval_run.dataset_id not in remaining_expected_dataset_ids[run_config_id]:
-                continue
-            else:
-                remaining_expected_dataset_ids[run_config_id].remove(
-                    eval_run.dataset_id
-                )
 
-            incomplete = False
-            for output_score in eval.output_scores:
-                score_key = output_score.json_key()
-                if run_config_id not in total_scores:
-                    total_scores[run_config_id] = {}
-                    score_counts[run_config_id] = {}
-                if score_key not in total_scores[run_config_id]:
-                    total_scores[run_config_id][score_key] = 0
-                    score_counts[run_config_id][score_key] = 0
-                if score_key in eval_run.scores:
-                    total_scores[run_config_id][score_key] += eval_run.scores[score_key]
-                    score_counts[run_config_id][score_key] += 1
-                else:
-                    # We're missing a required score, so this eval_run is incomplete
-                    incomplete = True
-
-            if incomplete:
-                partial_incomplete_counts[run_config_id] += 1
-
-        # Convert to score summaries
-        results: Dict[ID_TYPE, Dict[str, ScoreSummary]] = {}
-        for run_config_id, output_scores in total_scores.items():
-            results[run_config_id] = {}
-            for output_score_id, score in output_scores.items():
-                count = score_counts[run_config_id][output_score_id]
-                if count > 0:
-                    results[run_config_id][output_score_id] = ScoreSummary(
-                        mean_score=score / count
-                    )
-
-        # Calculate the percent of the dataset that has been processed
-        run_config_percent_complete: Dict[ID_TYPE, float] = {}
-        for run_config in task_runs_configs:
-            # Partial incomplete (missing scores), and fully incomplete (no eval_run)
-            incomplete_count = partial_incomplete_counts[run_config.id] + len(
-                remaining_expected_dataset_ids[run_config.id]
-            )
-            percent_incomplete = incomplete_count / len(expected_dataset_ids)
-            run_config_percent_complete[run_config.id] = 1 - percent_incomplete
-
-        return EvalResultSummary(
-            results=results,
-            run_config_percent_complete=run_config_percent_complete,
-            dataset_size=len(expected_dataset_ids),
-        )
-
-    # Compared to above, this is comparing all eval configs to each other, not looking at a single eval config
     @app.get(
         "/api/projects/{project_id}/tasks/{task_id}/eval/{eval_id}/eval_configs_score_summary"
     )
@@ -728,127 +930,6 @@ def connect_evals_api(app: FastAPI):
         task_id: str,
         eval_id: str,
     ) -> EvalConfigCompareSummary:
-        task = task_from_id(project_id, task_id)
-        eval = eval_from_id(project_id, task_id, eval_id)
-        eval_configs = eval.configs(readonly=True)
-
-        score_key_to_task_requirement_id = build_score_key_to_task_requirement_id(task)
-
-        # Build a set of all the dataset items IDs we expect to have scores for
-        # Fetch all the dataset items in a filter, and return a map of dataset_id -> TaskRun
-        filter = dataset_filter_from_id(eval.eval_configs_filter_id)
-        expected_dataset_items = {run.id: run for run in task.runs() if filter(run)}
-        expected_dataset_ids = set(expected_dataset_items.keys())
-        if len(expected_dataset_ids) == 0:
-            return EvalConfigCompareSummary(
-                results={},
-                eval_config_percent_complete={},
-                dataset_size=0,
-                fully_rated_count=0,
-                partially_rated_count=0,
-                not_rated_count=0,
-            )
-
-        # save a copy of the expected dataset ids for each eval config id, we'll update each as we process each eval run
-        remaining_expected_dataset_ids: Dict[ID_TYPE, Set[ID_TYPE]] = {
-            eval_config.id: set(expected_dataset_ids) for eval_config in eval_configs
-        }
-
-        # eval_config_id -> output_score_json_key -> correlation calculator
-        correlation_calculators: Dict[ID_TYPE, Dict[str, CorrelationCalculator]] = {}
-
-        for eval_config in eval_configs:
-            for eval_run in eval_config.runs(readonly=True):
-                dataset_item = expected_dataset_items.get(eval_run.dataset_id, None)
-                if dataset_item is None:
-                    # A dataset_id can be removed from the dataset filter (ran previously, then removed the tag to remove it from the eval config set filter)
-                    # A dataset_id could be for an run_config, not for comparing eval at all
-                    continue
-
-                # Check if we should count this eval_run. Not every eval_run has to go into the stats:
-                # Example: this dataset_id was already counted (not great there are dupes, but shouldn't be double counted if there are)
-                if (
-                    eval_run.dataset_id
-                    not in remaining_expected_dataset_ids[eval_config.id]
-                ):
-                    continue
-                else:
-                    remaining_expected_dataset_ids[eval_config.id].remove(
-                        eval_run.dataset_id
-                    )
-
-                for output_score in eval.output_scores:
-                    score_key = output_score.json_key()
-                    eval_score: float | None = eval_run.scores.get(score_key, None)
-
-                    # Fetch the human eval score from the dataset item
-                    human_score = human_score_from_task_run(
-                        dataset_item, output_score, score_key_to_task_requirement_id
-                    )
-
-                    if human_score is None or eval_score is None:
-                        # This score doesn't have both a human eval and eval score, so we can't compare
-                        continue
-
-                    if eval_config.id not in correlation_calculators:
-                        correlation_calculators[eval_config.id] = {}
-
-                    calculator = correlation_calculators[eval_config.id].get(
-                        score_key, None
-                    )
-                    if calculator is None:
-                        calculator = CorrelationCalculator()
-                        correlation_calculators[eval_config.id][score_key] = calculator
-
-                    normalized_eval_score = normalize_rating(
-                        eval_score, output_score.type
-                    )
-                    normalized_human_score = normalize_rating(
-                        human_score, output_score.type
-                    )
-                    calculator.add_score(
-                        CorrelationScore(
-                            measured_score=eval_score,
-                            human_score=human_score,
-                            normalized_measured_score=normalized_eval_score,
-                            normalized_human_score=normalized_human_score,
-                        )
-                    )
-
-        # Convert to score summaries
-        results: Dict[ID_TYPE, Dict[str, CorrelationResult]] = {}
-        for eval_config_id in correlation_calculators.keys():
-            results[eval_config_id] = {}
-            for score_key in correlation_calculators[eval_config_id].keys():
-                calculator = correlation_calculators[eval_config_id].get(
-                    score_key, None
-                )
-                if calculator is None:
-                    # No scores to calculate correlation for this pair
-                    continue
-
-                correlation_result = calculator.calculate_correlation()
-                results[eval_config_id][score_key] = correlation_result
-
-        # Calculate the percent of the dataset that has been processed
-        eval_config_percent_complete: Dict[ID_TYPE, float] = {}
-        for eval_config in eval_configs:
-            incomplete_count = len(remaining_expected_dataset_ids[eval_config.id])
-            percent_incomplete = incomplete_count / len(expected_dataset_ids)
-            eval_config_percent_complete[eval_config.id] = 1 - percent_incomplete
-
-        # Count how many dataset items have human evals
-        fully_rated_count, partially_rated_count, not_rated_count = count_human_evals(
-            list(expected_dataset_items.values()),
-            eval,
-            score_key_to_task_requirement_id,
-        )
-
-        return EvalConfigCompareSummary(
-            results=results,
-            eval_config_percent_complete=eval_config_percent_complete,
-            dataset_size=len(expected_dataset_ids),
-            fully_rated_count=fully_rated_count,
-            partially_rated_count=partially_rated_count,
-            not_rated_count=not_rated_count,
+        return await run_storage(
+            project_id, eval_configs_score_summary, project_id, task_id, eval_id
         )
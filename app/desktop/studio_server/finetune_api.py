@@ -1,9 +1,9 @@
 import logging
 from enum import Enum
-from typing import Dict
+from typing import Dict, Iterator, Tuple
 
 import httpx
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.responses import StreamingResponse
 from kiln_ai.adapters.fine_tune.base_finetune import FineTuneParameter, FineTuneStatus
 from kiln_ai.adapters.fine_tune.dataset_formatter import (
@@ -28,6 +28,7 @@ from kiln_ai.datamodel import (
     Finetune,
     FineTuneStatusType,
     Task,
+    TaskRun,
 )
 from kiln_ai.datamodel.datamodel_enums import THINKING_DATA_STRATEGIES, ChatStrategy
 from kiln_ai.datamodel.dataset_filters import (
@@ -42,8 +43,12 @@ from kiln_ai.datamodel.dataset_split import (
     Train80Test20SplitDefinition,
     Train80Val20SplitDefinition,
 )
+from kiln_ai.datamodel.run_index import TaskRunIndex
 from kiln_ai.utils.config import Config
 from kiln_ai.utils.name_generator import generate_memorable_name
+from kiln_server.conditional_get import collection_etag, not_modified_response
+from kiln_server.ndjson import ndjson_response
+from kiln_server.storage_executor import run_storage
 from kiln_server.task_api import task_from_id
 from pydantic import BaseModel, Field, model_validator
 
@@ -170,18 +175,145 @@ def finetune_from_id(project_id: str, task_id: str, finetune_id: str) -> Finetun
     return finetune
 
 
+# Counts of runs for each fine_tune tag: all, reasoning, high quality, and reasoning and high quality
+FinetuneTagCounts = Tuple[
+    Dict[str, int], Dict[str, int], Dict[str, int], Dict[str, int]
+]
+
+
+def count_finetune_tags(task: Task) -> FinetuneTagCounts:
+    """
+    Count the runs with each fine_tune tag, with reasoning and high quality breakdowns.
+
+    Answered from the task run index's tag table when enabled, so no runs are loaded.
+    """
+    index = TaskRunIndex.for_task_path(task.path)
+    if index is not None:
+        return (
+            index.tag_counts("fine_tune"),
+            index.tag_counts("fine_tune", ["has_thinking"], refresh=False),
+            index.tag_counts("fine_tune", ["high_quality"], refresh=False),
+            index.tag_counts(
+                "fine_tune", ["has_thinking", "high_quality"], refresh=False
+            ),
+        )
+
+    finetune_tag_counts: Dict[str, int] = {}
+    reasoning_count: Dict[str, int] = {}
+    high_quality_count: Dict[str, int] = {}
+    reasoning_and_high_quality_count: Dict[str, int] = {}
+    for sample in task.iter_runs(readonly=True):
+        is_reasoning = ThinkingModelDatasetFilter(sample)
+        is_high_quality = HighRatingDatasetFilter(sample)
+        for tag in sample.tags:
+            if tag.startswith("fine_tune"):
+                finetune_tag_counts[tag] = finetune_tag_counts.get(tag, 0) + 1
+                if is_reasoning:
+                    reasoning_count[tag] = reasoning_count.get(tag, 0) + 1
+                if is_high_quality:
+                    high_quality_count[tag] = high_quality_count.get(tag, 0) + 1
+                if is_reasoning and is_high_quality:
+                    reasoning_and_high_quality_count[tag] = (
+                        reasoning_and_high_quality_count.get(tag, 0) + 1
+                    )
+    return (
+        finetune_tag_counts,
+        reasoning_count,
+        high_quality_count,
+        reasoning_and_high_quality_count,
+    )
+
+
+def build_finetune_dataset_info(project_id: str, task_id: str) -> FinetuneDatasetInfo:
+    task = task_from_id(project_id, task_id)
+    existing_datasets = task.dataset_splits()
+    existing_finetunes = task.finetunes()
+
+    (
+        finetune_tag_counts,
+        reasoning_count,
+        high_quality_count,
+        reasoning_and_high_quality_count,
+    ) = count_finetune_tags(task)
+
+    return FinetuneDatasetInfo(
+        existing_datasets=existing_datasets,
+        existing_finetunes=existing_finetunes,
+        finetune_tags=[
+            FinetuneDatasetTagInfo(
+                tag=tag,
+                count=count,
+                reasoning_count=reasoning_count.get(tag, 0),
+                high_quality_count=high_quality_count.get(tag, 0),
+                reasoning_and_high_quality_count=reasoning_and_high_quality_count.get(
+                    tag, 0
+                ),
+            )
+            for tag, count in finetune_tag_counts.items()
+        ],
+    )
+
+
 def connect_fine_tune_api(app: FastAPI):
     @app.get("/api/projects/{project_id}/tasks/{task_id}/dataset_splits")
     async def dataset_splits(project_id: str, task_id: str) -> list[DatasetSplit]:
-        task = task_from_id(project_id, task_id)
-        return task.dataset_splits()
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
+        return await run_storage(project_id, task.dataset_splits)
+
+    @app.get(
+        "/api/projects/{project_id}/tasks/{task_id}/dataset_splits/{split_id}/runs_stream"
+    )
+    async def dataset_split_runs_stream(
+        project_id: str, task_id: str, split_id: str, split_name: str | None = None
+    ) -> StreamingResponse:
+        """The runs in a dataset split, streamed as NDJSON (one run per line). Optionally only the runs in one split (eg. "train"). Runs deleted since the split was made are skipped."""
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
+        dataset = await run_storage(
+            project_id, DatasetSplit.from_id_and_parent_path, split_id, task.path
+        )
+        if dataset is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Dataset split with ID '{split_id}' not found",
+            )
+        if split_name is not None and split_name not in dataset.split_contents:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Split '{split_name}' not found in dataset split",
+            )
+        run_ids = [
+            run_id
+            for name, ids in dataset.split_contents.items()
+            if split_name is None or name == split_name
+            for run_id in ids
+        ]
+
+        def split_runs() -> Iterator[TaskRun]:
+            for run_id in run_ids:
+                run = TaskRun.from_id_and_parent_path(run_id, task.path)
+                if run is not None:
+                    yield run
+
+        return ndjson_response(project_id, split_runs())
 
     @app.get("/api/projects/{project_id}/tasks/{task_id}/finetunes")
     async def finetunes(
-        project_id: str, task_id: str, update_status: bool = False
+        project_id: str,
+        task_id: str,
+        request: Request,
+        response: Response,
+        update_status: bool = False,
     ) -> list[Finetune]:
-        task = task_from_id(project_id, task_id)
-        finetunes = task.finetunes()
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
+        # Status updates come from the provider, so can't be answered from disk
+        if not update_status and task.path is not None:
+            etag = await run_storage(
+                project_id, collection_etag, [Finetune.relationship_folder(task.path)]
+            )
+            not_modified = not_modified_response(request, response, etag)
+            if not_modified is not None:
+                return not_modified  # type: ignore
+        finetunes = await run_storage(project_id, task.finetunes)
 
         # Update the status of each finetune
         if update_status:
@@ -287,66 +419,33 @@ def connect_fine_tune_api(app: FastAPI):
     async def finetune_dataset_info(
         project_id: str, task_id: str
     ) -> FinetuneDatasetInfo:
-        task = task_from_id(project_id, task_id)
-        existing_datasets = task.dataset_splits()
-        existing_finetunes = task.finetunes()
-
-        finetune_tag_counts: Dict[str, int] = {}
-        reasoning_count: Dict[str, int] = {}
-        high_quality_count: Dict[str, int] = {}
-        reasoning_and_high_quality_count: Dict[str, int] = {}
-        for sample in task.runs(readonly=True):
-            for tag in sample.tags:
-                if tag.startswith("fine_tune"):
-                    finetune_tag_counts[tag] = finetune_tag_counts.get(tag, 0) + 1
-                    is_reasoning = ThinkingModelDatasetFilter(sample)
-                    is_high_quality = HighRatingDatasetFilter(sample)
-                    if is_reasoning:
-                        reasoning_count[tag] = reasoning_count.get(tag, 0) + 1
-                    if is_high_quality:
-                        high_quality_count[tag] = high_quality_count.get(tag, 0) + 1
-                    if is_reasoning and is_high_quality:
-                        reasoning_and_high_quality_count[tag] = (
-                            reasoning_and_high_quality_count.get(tag, 0) + 1
-                        )
-
-        return FinetuneDatasetInfo(
-            existing_datasets=existing_datasets,
-            existing_finetunes=existing_finetunes,
-            finetune_tags=[
-                FinetuneDatasetTagInfo(
-                    tag=tag,
-                    count=count,
-                    reasoning_count=reasoning_count.get(tag, 0),
-                    high_quality_count=high_quality_count.get(tag, 0),
-                    reasoning_and_high_quality_count=reasoning_and_high_quality_count.get(
-                        tag, 0
-                    ),
-                )
-                for tag, count in finetune_tag_counts.items()
-            ],
+        return await run_storage(
+            project_id, build_finetune_dataset_info, project_id, task_id
         )
 
     @app.post("/api/projects/{project_id}/tasks/{task_id}/dataset_splits")
     async def create_dataset_split(
         project_id: str, task_id: str, request: CreateDatasetSplitRequest
     ) -> DatasetSplit:
-        task = task_from_id(project_id, task_id)
         split_definitions = api_split_types[request.dataset_split_type]
 
         name = request.name
         if not name:
             name = generate_memorable_name()
 
-        dataset_split = DatasetSplit.from_task(
-            name,
-            task,
-            split_definitions,
-            filter_id=request.filter_id,
-            description=request.description,
-        )
-        dataset_split.save_to_file()
-        return dataset_split
+        def save_split() -> DatasetSplit:
+            task = task_from_id(project_id, task_id)
+            dataset_split = DatasetSplit.from_task(
+                name,
+                task,
+                split_definitions,
+                filter_id=request.filter_id,
+                description=request.description,
+            )
+            dataset_split.save_to_file()
+            return dataset_split
+
+        return await run_storage(project_id, save_split)
 
     @app.post("/api/projects/{project_id}/tasks/{task_id}/finetunes")
     async def create_finetune(
@@ -422,8 +521,10 @@ def connect_fine_tune_api(app: FastAPI):
 
         data_strategy_typed = ChatStrategy(data_strategy)
 
-        task = task_from_id(project_id, task_id)
-        dataset = DatasetSplit.from_id_and_parent_path(dataset_id, task.path)
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
+        dataset = await run_storage(
+            project_id, DatasetSplit.from_id_and_parent_path, dataset_id, task.path
+        )
         if dataset is None:
             raise HTTPException(
                 status_code=404,
@@ -447,7 +548,9 @@ def connect_fine_tune_api(app: FastAPI):
             system_message=system_message,
             thinking_instructions=thinking_instructions,
         )
-        path = dataset_formatter.dump_to_file(
+        path = await run_storage(
+            project_id,
+            dataset_formatter.dump_to_file,
             split_name,
             format_type_typed,
             data_strategy_typed,
@@ -0,0 +1,142 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from kiln_ai.datamodel import (
+    DataSource,
+    DataSourceType,
+    Project,
+    Task,
+    TaskOutput,
+    TaskRun,
+)
+
+import app.desktop.studio_server.cache_warmup_api as cache_warmup_api
+from app.desktop.studio_server.cache_warmup_api import (
+    CacheWarmup,
+    connect_cache_warmup_api,
+    start_cache_warmup,
+    stop_cache_warmup,
+)
+
+
+@pytest.fixture
+def project(tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    for i in range(2):
+        task = Task(name=f"Task {i}", instruction="Do the thing", parent=project)
+        task.save_to_file()
+        source = DataSource(
+            type=DataSourceType.human, properties={"created_by": "tester"}
+        )
+        for _ in range(3):
+            TaskRun(
+                parent=task,
+                input="input",
+                input_source=source,
+                output=TaskOutput(output="output", source=source),
+            ).save_to_file()
+    return project
+
+
+@pytest.fixture
+def mock_config(project, tmp_path):
+    with patch("app.desktop.studio_server.cache_warmup_api.Config") as mock_config:
+        config = mock_config.shared.return_value
+        config.projects = [str(project.path), str(tmp_path / "missing/project.kiln")]
+        config.cache_warmup = "projects"
+        yield config
+
+
+@pytest.fixture(autouse=True)
+def reset_current_warmup():
+    yield
+    stop_cache_warmup()
+    cache_warmup_api._current_warmup = None
+
+
+def run_warmup(level):
+    warmup = CacheWarmup(level=level)
+    warmup.start()
+    assert warmup._thread is not None
+    warmup._thread.join(10)
+    return warmup.status()
+
+
+def test_warm_projects(mock_config):
+    with patch.object(
+        TaskRun, "load_from_file", wraps=TaskRun.load_from_file
+    ) as mock_load_run:
+        status = run_warmup("projects")
+        mock_load_run.assert_not_called()
+    assert status.state == "done"
+    assert status.projects_total == 2
+    assert status.projects_done == 2
+    assert status.tasks_total == 2
+    assert status.tasks_done == 2
+    # The project and its tasks
+    assert status.models_loaded == 3
+    # The missing project
+    assert status.errors == 1
+    assert status.started_at is not None
+    assert status.finished_at is not None
+
+
+def test_warm_runs(mock_config):
+    status = run_warmup("runs")
+    assert status.state == "done"
+    assert status.models_loaded == 3 + 6
+
+
+def test_cancel(mock_config):
+    warmup = CacheWarmup(level="runs")
+    loading = threading.Event()
+    release = threading.Event()
+    original_warm_runs = warmup._warm_runs
+
+    def blocking_warm_runs(runs):
+        loading.set()
+        release.wait(5)
+        original_warm_runs(runs)
+
+    with patch.object(warmup, "_warm_runs", side_effect=blocking_warm_runs):
+        warmup.start()
+        assert loading.wait(5)
+        threading.Timer(0.1, release.set).start()
+        warmup.cancel(timeout=5)
+
+    status = warmup.status()
+    assert status.state == "cancelled"
+    assert status.tasks_done < 2 or status.models_loaded < 9
+
+
+def test_start_cache_warmup_off_by_default():
+    with patch("app.desktop.studio_server.cache_warmup_api.Config") as mock_config:
+        mock_config.shared.return_value.cache_warmup = None
+        assert start_cache_warmup() is None
+
+
+def test_status_endpoint(mock_config):
+    app = FastAPI()
+    connect_cache_warmup_api(app)
+    client = TestClient(app)
+
+    response = client.get("/api/cache_warmup")
+    assert response.status_code == 200
+    assert response.json()["state"] == "not_started"
+    assert response.json()["level"] == "off"
+
+    warmup = start_cache_warmup()
+    assert warmup is not None
+    assert warmup._thread is not None
+    warmup._thread.join(10)
+    response = client.get("/api/cache_warmup")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["state"] == "done"
+    assert body["level"] == "projects"
+    assert body["projects_done"] == 2
+    assert "cache_entries" in body
@@ -575,6 +575,7 @@ def mock_eval_config_for_score_summary():
         )
 
     config.runs.return_value = runs
+    config.iter_runs.side_effect = lambda readonly=False: iter(runs)
     return config
 
 
@@ -653,12 +654,47 @@ async def test_get_eval_config_score_summary(
         mock_eval_config_from_id.assert_called_once_with(
             "project1", "task1", "eval1", "eval_config1"
         )
-        mock_eval_config_for_score_summary.runs.assert_called_once_with(readonly=True)
+        mock_eval_config_for_score_summary.iter_runs.assert_called_once_with(
+            readonly=True
+        )
         mock_dataset_ids_in_filter.assert_called_once_with(
             mock_task, "tag::eval_set", readonly=True
         )
 
 
+def test_get_eval_runs_stream(
+    client, mock_task_from_id, mock_task, mock_eval, mock_eval_config
+):
+    mock_task_from_id.return_value = mock_task
+    eval_runs = [
+        EvalRun(
+            task_run_config_id=run_config_id,
+            scores={"score1": 3.0, "overall_rating": 1.0},
+            input="input",
+            output="output",
+            dataset_id=f"dataset_id{i}",
+            parent=mock_eval_config,
+        )
+        for i, run_config_id in enumerate(["run_config1", "run_config2", "run_config1"])
+    ]
+    for eval_run in eval_runs:
+        eval_run.save_to_file()
+    url = "/api/projects/project1/tasks/task1/eval/eval1/eval_config/eval_config1/runs_stream"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert sorted(json.loads(line)["id"] for line in lines) == sorted(
+        eval_run.id for eval_run in eval_runs
+    )
+
+    response = client.get(url, params={"run_config_id": "run_config2"})
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [
+        eval_runs[1].id
+    ]
+
+
 @pytest.mark.asyncio
 async def test_get_eval_run_results(
     client,
@@ -1196,7 +1232,7 @@ def test_runs_in_filter():
     run2 = Mock(spec=TaskRun, id="run2")
     run3 = Mock(spec=TaskRun, id="run3")
 
-    mock_task.runs.return_value = [run1, run2, run3]
+    mock_task.iter_runs.return_value = iter([run1, run2, run3])
 
     # Mock the dataset filter
     mock_filter = Mock()
@@ -1249,8 +1285,8 @@ def test_build_score_key_to_task_requirement_id():
         "app.desktop.studio_server.eval_api.string_to_json_key"
     ) as mock_string_to_json_key:
         # Configure the mock to convert spaces to underscores and lowercase
-        mock_string_to_json_key.side_effect = (
-            lambda name: name.lower().replace(" ", "_").replace("-", "_")
+        mock_string_to_json_key.side_effect = lambda name: (
+            name.lower().replace(" ", "_").replace("-", "_")
         )
 
         # Call the function under test
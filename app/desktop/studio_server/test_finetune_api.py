@@ -1,3 +1,4 @@
+import json
 import unittest.mock
 from pathlib import Path
 from unittest.mock import AsyncMock, Mock, patch
@@ -35,6 +36,7 @@ from kiln_ai.datamodel.dataset_split import (
     Train80Test20SplitDefinition,
     Train80Val20SplitDefinition,
 )
+from kiln_ai.datamodel.segment_store import migrate_to_segment_store
 from pydantic import BaseModel
 
 from app.desktop.studio_server.finetune_api import (
@@ -198,6 +200,41 @@ def test_get_dataset_splits(client, mock_task_from_id_disk_backed, test_task):
     mock_task_from_id_disk_backed.assert_called_once_with("project1", "task1")
 
 
+def test_dataset_split_runs_stream(client, mock_task_from_id_disk_backed, test_task):
+    runs = []
+    for i in range(3):
+        run = TaskRun(
+            id=str(i + 1),
+            input=f"input {i}",
+            output=TaskOutput(output=f"output {i}"),
+            parent=test_task,
+        )
+        run.save_to_file()
+        runs.append(run)
+    url = "/api/projects/project1/tasks/task1/dataset_splits/split1/runs_stream"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [
+        "1",
+        "2",
+    ]
+
+    # Deleted runs are skipped
+    runs[0].delete()
+    response = client.get(url, params={"split_name": "train"})
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == ["2"]
+
+    assert client.get(url, params={"split_name": "test"}).status_code == 404
+    assert (
+        client.get(
+            "/api/projects/project1/tasks/task1/dataset_splits/missing/runs_stream"
+        ).status_code
+        == 404
+    )
+
+
 def test_get_finetunes(client, mock_task_from_id_disk_backed, test_task):
     response = client.get("/api/projects/project1/tasks/task1/finetunes")
 
@@ -1568,9 +1605,18 @@ def test_data_strategies_from_finetune_id(
     assert data_strategies_from_finetune_id(model_id) == expected_data_strategies
 
 
-def test_finetune_dataset_info(client, mock_task_from_id_disk_backed, test_task):
+@pytest.mark.parametrize("use_run_index", [False, True])
+def test_finetune_dataset_info(
+    client, mock_task_from_id_disk_backed, test_task, use_run_index
+):
     """Test the finetune_dataset_info endpoint returns correct data"""
-    response = client.get("/api/projects/project1/tasks/task1/finetune_dataset_info")
+    with patch(
+        "kiln_ai.datamodel.run_index.task_run_index_enabled",
+        return_value=use_run_index,
+    ):
+        response = client.get(
+            "/api/projects/project1/tasks/task1/finetune_dataset_info"
+        )
 
     assert response.status_code == 200
     data = response.json()
@@ -1604,6 +1650,26 @@ def test_finetune_dataset_info(client, mock_task_from_id_disk_backed, test_task)
     mock_task_from_id_disk_backed.assert_called_once_with("project1", "task1")
 
 
+def test_finetune_dataset_info_segment_store(
+    client, mock_task_from_id_disk_backed, test_task
+):
+    """Runs in a segment store are counted from the store, not the run index"""
+    assert migrate_to_segment_store(test_task.path, TaskRun) == 3
+    with patch(
+        "kiln_ai.datamodel.run_index.task_run_index_enabled",
+        return_value=True,
+    ):
+        response = client.get(
+            "/api/projects/project1/tasks/task1/finetune_dataset_info"
+        )
+
+    assert response.status_code == 200
+    tags = {x["tag"]: x for x in response.json()["finetune_tags"]}
+    assert tags["fine_tune_1"]["count"] == 2
+    assert tags["fine_tune_1"]["reasoning_and_high_quality_count"] == 1
+    assert tags["fine_tune_2"]["count"] == 1
+
+
 def test_finetune_dataset_info_no_tags(
     client, mock_task_from_id_disk_backed, test_task
 ):
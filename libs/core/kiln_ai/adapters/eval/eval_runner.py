@@ -5,7 +5,10 @@ from typing import AsyncGenerator, Dict, List, Literal, Set
 from kiln_ai.adapters.eval.base_eval import BaseEval
 from kiln_ai.adapters.eval.registry import eval_adapter_from_type
 from kiln_ai.datamodel.basemodel import ID_TYPE
-from kiln_ai.datamodel.dataset_filters import dataset_filter_from_id
+from kiln_ai.datamodel.dataset_filters import (
+    dataset_filter_from_id,
+    iter_filtered_runs,
+)
 from kiln_ai.datamodel.eval import EvalConfig, EvalRun, EvalScores
 from kiln_ai.datamodel.task import TaskRunConfig
 from kiln_ai.datamodel.task_run import TaskRun
@@ -98,7 +101,7 @@ class EvalRunner:
         already_run: Dict[ID_TYPE, Set[ID_TYPE]] = {}
         for eval_config in self.eval_configs:
             already_run[eval_config.id] = set()
-            for run in eval_config.runs(readonly=True):
+            for run in eval_config.iter_runs(readonly=True):
                 already_run[eval_config.id].add(run.dataset_id)
 
         return [
@@ -107,8 +110,7 @@ class EvalRunner:
                 eval_config=eval_config,
                 type="eval_config_eval",
             )
-            for task_run in self.task.runs(readonly=True)
-            if filter(task_run)
+            for task_run in iter_filtered_runs(self.task, filter, readonly=True)
             for eval_config in self.eval_configs
             if task_run.id not in already_run[eval_config.id]
         ]
@@ -131,7 +133,7 @@ class EvalRunner:
             already_run[eval_config.id] = {}
             for run_config in self.run_configs or []:
                 already_run[eval_config.id][run_config.id] = set()
-            for run in eval_config.runs(readonly=True):
+            for run in eval_config.iter_runs(readonly=True):
                 if (
                     run.task_run_config_id is not None
                     and run.task_run_config_id in already_run[eval_config.id]
@@ -147,8 +149,7 @@ class EvalRunner:
                 type="task_run_eval",
                 eval_config=eval_config,
             )
-            for task_run in self.task.runs(readonly=True)
-            if filter(task_run)
+            for task_run in iter_filtered_runs(self.task, filter, readonly=True)
             for eval_config in self.eval_configs
             for run_config in self.run_configs or []
             if task_run.id not in already_run[eval_config.id][run_config.id]
@@ -203,6 +204,7 @@ class EvalRunner:
                 output=task_output,
                 intermediate_outputs=intermediate_outputs,
             )
+            # Saved as soon as it completes, so a crash never loses a paid result
             eval_run.save_to_file()
 
             return True
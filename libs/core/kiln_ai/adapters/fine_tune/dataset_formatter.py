@@ -362,8 +362,13 @@ class DatasetFormatter:
             / f"{self.dataset.name} -- split-{split_name} -- format-{format_type.value} -- {'cot' if include_cot else 'no-cot'}.jsonl"
         )
 
-        runs = self.task.runs()
-        runs_by_id = {run.id: run for run in runs}
+        # Only keep the runs in this split in memory
+        split_ids = set(self.dataset.split_contents[split_name])
+        runs_by_id = {
+            run.id: run
+            for run in self.task.iter_runs(readonly=True)
+            if run.id in split_ids
+        }
 
         # Generate formatted output with UTF-8 encoding
         with open(output_path, "w", encoding="utf-8") as f:
@@ -79,6 +79,7 @@ def mock_task():
         run.parent_task = Mock(return_value=task)
 
     task.runs.return_value = task_runs
+    task.iter_runs.side_effect = lambda readonly=False: iter(task_runs)
     return task
 
 
@@ -43,6 +43,7 @@ from kiln_ai.datamodel.task_output import (
 )
 from kiln_ai.datamodel.task_run import (
     TaskRun,
+    TaskRunSummary,
     Usage,
 )
 
@@ -53,6 +54,7 @@ __all__ = [
     "Task",
     "Project",
     "TaskRun",
+    "TaskRunSummary",
     "TaskOutput",
     "Priority",
     "DataSource",
@@ -1,17 +1,19 @@
-import json
 import os
 import re
 import shutil
 import uuid
 from abc import ABCMeta
 from builtins import classmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import (
     Any,
     Dict,
+    Iterator,
     List,
     Optional,
+    Sequence,
     Type,
     TypeVar,
 )
@@ -28,7 +30,13 @@ from pydantic import (
 from pydantic_core import ErrorDetails
 from typing_extensions import Self
 
+from kiln_ai.datamodel.child_listing_cache import ChildListingCache
+from kiln_ai.datamodel.collection_version import bump_collection_generations
 from kiln_ai.datamodel.model_cache import ModelCache
+from kiln_ai.datamodel.segment_store import SegmentStore
+from kiln_ai.datamodel.serialization import compact_model_files, model_serializer
+from kiln_ai.datamodel.trusted_load import construct_trusted
+from kiln_ai.datamodel.write_batch import current_write_batch, save_tree, write_batch
 from kiln_ai.utils.config import Config
 from kiln_ai.utils.formatting import snake_case
 
@@ -120,12 +128,15 @@ class KilnBaseModel(BaseModel):
         return cls.load_from_file(path)
 
     @classmethod
-    def load_from_file(cls: Type[T], path: Path | str, readonly: bool = False) -> T:
+    def load_from_file(
+        cls: Type[T], path: Path | str, readonly: bool = False, trusted: bool = False
+    ) -> T:
         """Load a model instance from a specific file path.
 
         Args:
             path (Path): Path to the model file
             readonly (bool): If True, the model will be returned in readonly mode (cached instance, not a copy, not safe to mutate)
+            trusted (bool): If True, skip validation of files written by Kiln with the current schema version. For bulk reads. See trusted_load.
 
         Returns:
             T: Instance of the model
@@ -136,19 +147,60 @@ class KilnBaseModel(BaseModel):
         """
         if isinstance(path, str):
             path = Path(path)
-        cached_model = ModelCache.shared().get_model(path, cls, readonly=readonly)
+        cached_model = ModelCache.shared().get_model(
+            path, cls, readonly=readonly, trusted=trusted
+        )
         if cached_model is not None:
             return cached_model
-        with open(path, "r", encoding="utf-8") as file:
+        return cls._load_uncached(path, readonly=readonly, trusted=trusted)
+
+    @classmethod
+    def _load_uncached(
+        cls: Type[T], path: Path, readonly: bool = False, trusted: bool = False
+    ) -> T:
+        """Load a model from its file (or segment store) without checking the cache first, and cache it. For callers which already checked.
+
+        Segment store records are checked in the cache by the store, which knows their version.
+        """
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            # High volume children may be kept in a segment store, rather than their own files
+            store = (
+                SegmentStore.for_child_path(path)
+                if issubclass(cls, KilnParentedModel)
+                else None
+            )
+            if store is None:
+                raise
+            return store.load_path(cls, path, readonly=readonly, trusted=trusted)  # type: ignore
+        with file:
             # modified time of file for cache invalidation. From file descriptor so it's atomic w read.
-            mtime_ns = os.fstat(file.fileno()).st_mtime_ns
-            file_data = file.read()
-            parsed_json = json.loads(file_data)
-            m = cls.model_validate(parsed_json, context={"loading_from_file": True})
-            if not isinstance(m, cls):
-                raise ValueError(f"Loaded model is not of type {cls.__name__}")
-            m._loaded_from_file = True
-            file_data = None
+            file_stat = os.fstat(file.fileno())
+            mtime_ns = file_stat.st_mtime_ns
+            parsed_json = model_serializer().loads(file.read())
+        m = construct_trusted(cls, parsed_json, path) if trusted else None
+        validated = m is None
+        if m is None:
+            m = cls.validate_loaded_data(parsed_json, path)
+        ModelCache.shared().set_model(
+            path, m, mtime_ns, file_stat.st_size, validated=validated
+        )
+        return m
+
+    @classmethod
+    def validate_loaded_data(
+        cls: Type[T], parsed_json: Dict[str, Any], path: Path
+    ) -> T:
+        """Validate a model loaded from disk, checking its type and schema version.
+
+        Raises:
+            ValueError: If the data is not of the expected type or version
+        """
+        m = cls.model_validate(parsed_json, context={"loading_from_file": True})
+        if not isinstance(m, cls):
+            raise ValueError(f"Loaded model is not of type {cls.__name__}")
+        m._loaded_from_file = True
         m.path = path
         if m.v > m.max_schema_version():
             raise ValueError(
@@ -162,7 +214,6 @@ class KilnBaseModel(BaseModel):
                 f"Class: {m.__class__.__name__}, id: {getattr(m, 'id', None)}, path: {path}, "
                 f"version: {m.v}, max version: {m.max_schema_version()}"
             )
-        ModelCache.shared().set_model(path, m, mtime_ns)
         return m
 
     def loaded_from_file(self, info: ValidationInfo | None = None) -> bool:
@@ -187,6 +238,29 @@ class KilnBaseModel(BaseModel):
     def save_to_file(self) -> None:
         """Save the model instance to a file.
 
+        Inside a `write_batch()` block the save is staged, and written when the batch commits.
+
+        Raises:
+            ValueError: If the path is not set
+        """
+        if self._save_to_segment_store():
+            return
+        path, json_data = self.prepare_save()
+        batch = current_write_batch()
+        if batch is not None:
+            batch.add(self, path, json_data)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(json_data)
+        # We could save, but invalidating will trigger load on next use.
+        # This ensures everything in cache is loaded from disk, and the cache perfectly reflects what's on disk
+        ModelCache.shared().invalidate(path)
+        self.__class__.after_save([self])
+
+    def prepare_save(self) -> tuple[Path, str]:
+        """Resolve the path and serialize the model for saving. Sets the path on the model.
+
         Raises:
             ValueError: If the path is not set
         """
@@ -196,15 +270,33 @@ class KilnBaseModel(BaseModel):
                 f"Cannot save to file because 'path' is not set. Class: {self.__class__.__name__}, "
                 f"id: {getattr(self, 'id', None)}, path: {path}"
             )
-        path.parent.mkdir(parents=True, exist_ok=True)
-        json_data = self.model_dump_json(indent=2, exclude={"path"})
-        with open(path, "w", encoding="utf-8") as file:
-            file.write(json_data)
+        json_data = model_serializer().dumps(
+            self, exclude={"path"}, compact=compact_model_files()
+        )
         # save the path so even if something like name changes, the file doesn't move
         self.path = path
-        # We could save, but invalidating will trigger load on next use.
-        # This ensures everything in cache is loaded from disk, and the cache perfectly reflects what's on disk
-        ModelCache.shared().invalidate(path)
+        return path, json_data
+
+    def _save_to_segment_store(self) -> bool:
+        """Saves to a segment store if this model is kept in one. Returns False if it's saved as a file."""
+        return False
+
+    @classmethod
+    def save_many(cls, models: Sequence["KilnBaseModel"], fsync: bool = False) -> None:
+        """Save many models as one batch. See `write_batch` for details."""
+        with write_batch(fsync=fsync):
+            for model in models:
+                model.save_to_file()
+
+    @classmethod
+    def after_save(cls, models: list[Self]) -> None:
+        """Called once models of this class are written to disk. Batched saves call this once per batch."""
+        pass
+
+    @classmethod
+    def after_delete(cls, paths: list[Path]) -> None:
+        """Called once models of this class are deleted, with the paths of their files. Bulk deletes call this once per batch."""
+        pass
 
     def delete(self) -> None:
         if self.path is None:
@@ -214,6 +306,7 @@ class KilnBaseModel(BaseModel):
             raise ValueError("Cannot delete model because path is not set")
         shutil.rmtree(dir_path)
         ModelCache.shared().invalidate(self.path)
+        self.__class__.after_delete([self.path])
         self.path = None
 
     def build_path(self) -> Path | None:
@@ -222,10 +315,16 @@ class KilnBaseModel(BaseModel):
         return None
 
     # increment for breaking changes
-    def max_schema_version(self) -> int:
+    @classmethod
+    def max_schema_version(cls) -> int:
         return 1
 
 
+def child_load_workers() -> int:
+    workers = Config.shared().child_load_workers
+    return workers if isinstance(workers, int) and workers > 0 else 1
+
+
 class KilnParentedModel(KilnBaseModel, metaclass=ABCMeta):
     """Base model for Kiln models that have a parent-child relationship. This base class is for child models.
 
@@ -329,66 +428,175 @@ class KilnParentedModel(KilnBaseModel, metaclass=ABCMeta):
             / self.__class__.base_filename()
         )
 
+    def _save_to_segment_store(self) -> bool:
+        path = self.build_path()
+        if path is None:
+            return False
+        store = SegmentStore.for_child_path(path)
+        if store is None:
+            return False
+        store.put_many([self])
+        self.__class__.after_save([self])
+        return True
+
+    @classmethod
+    def after_save(cls, models: list[Self]) -> None:
+        bump_collection_generations(
+            model.path.parent.parent for model in models if model.path is not None
+        )
+
     @classmethod
-    def iterate_children_paths_of_parent_path(cls: Type[PT], parent_path: Path | None):
+    def after_delete(cls, paths: list[Path]) -> None:
+        bump_collection_generations(path.parent.parent for path in paths)
+
+    def delete(self) -> None:
+        if self.path is not None and not self.path.exists():
+            store = SegmentStore.for_child_path(self.path)
+            if store is not None and self.id is not None and store.delete(self.id):
+                self.__class__.after_delete([self.path])
+                self.path = None
+                return
+        super().delete()
+
+    @classmethod
+    def segment_store(cls, parent_path: Path | None) -> SegmentStore | None:
+        """The segment store holding this type's children, or None if they're saved as files."""
         if parent_path is None:
-            # children are disk based. If not saved, they don't exist
-            return []
+            return None
+        return SegmentStore.for_relationship_folder(
+            cls.relationship_folder(parent_path)
+        )
 
-        # Determine the parent folder
+    @classmethod
+    def relationship_folder(cls, parent_path: Path) -> Path:
+        """The folder holding this type's children, given the parent's .kiln file (or folder)."""
         if parent_path.is_file():
             parent_folder = parent_path.parent
         else:
             parent_folder = parent_path
-
-        parent = cls.parent_type().load_from_file(parent_path)
-        if parent is None:
-            raise ValueError("Parent must be set to load children")
-
         # Ignore type error: this is abstract base class, but children must implement relationship_name
-        relationship_folder = parent_folder / Path(cls.relationship_name())  # type: ignore
+        return parent_folder / Path(cls.relationship_name())  # type: ignore
 
-        if not relationship_folder.exists() or not relationship_folder.is_dir():
+    @classmethod
+    def iterate_children_paths_of_parent_path(cls: Type[PT], parent_path: Path | None):
+        if parent_path is None:
+            # children are disk based. If not saved, they don't exist
             return []
 
-        # Collect all /relationship/{id}/{base_filename.kiln} files in the relationship folder
-        # manual code instead of glob for performance (5x speedup over glob)
+        relationship_folder = cls.relationship_folder(parent_path)
 
-        base_filename = cls.base_filename()
-        # Iterate through immediate subdirectories using scandir for better performance
-        # Benchmark: scandir is 10x faster than glob, so worth the extra code
-        with os.scandir(relationship_folder) as entries:
-            for entry in entries:
-                if not entry.is_dir():
-                    continue
+        store = SegmentStore.for_relationship_folder(relationship_folder)
+        if store is not None:
+            yield from store.child_paths(cls)
+            return
 
-                child_file = Path(entry.path) / base_filename
-                if child_file.is_file():
-                    yield child_file
+        # Collect all /relationship/{id}/{base_filename.kiln} files in the relationship folder. Cached until the folder changes.
+        yield from ChildListingCache.shared().child_files(
+            relationship_folder, cls.base_filename()
+        )
 
     @classmethod
     def all_children_of_parent_path(
-        cls: Type[PT], parent_path: Path | None, readonly: bool = False
+        cls: Type[PT],
+        parent_path: Path | None,
+        readonly: bool = False,
+        max_workers: int | None = None,
+        trusted: bool = False,
     ) -> list[PT]:
-        children = []
+        """Load all children of a parent, in directory order.
+
+        Args:
+            parent_path (Path): Path to the parent model file
+            readonly (bool): If True, return cached instances (not safe to mutate)
+            trusted (bool): If True, skip validation of files Kiln wrote with the current schema version. See trusted_load.
+            max_workers (int, optional): Threads used to load children missing from the cache. Defaults to the `child_load_workers` setting, serial if unset.
+        """
+        store = cls.segment_store(parent_path)
+        if store is not None:
+            return list(store.iter_models(cls, readonly=readonly, trusted=trusted))  # type: ignore
+
+        child_paths = list(cls.iterate_children_paths_of_parent_path(parent_path))
+        if max_workers is None:
+            max_workers = child_load_workers()
+
+        # Cache hits are cheaper than a thread hand-off, so serve those directly and only load misses in the pool
+        children: list[PT | None] = [
+            ModelCache.shared().get_model(
+                child_path, cls, readonly=readonly, trusted=trusted
+            )
+            for child_path in child_paths
+        ]
+        missing = [i for i, child in enumerate(children) if child is None]
+        if max_workers > 1 and len(missing) > 1:
+            # Overlaps file reads, and the load populates the shared cache for later warm reads
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(missing)),
+                thread_name_prefix="kiln_child_load",
+            ) as executor:
+                # Already missed the cache above: don't check it again
+                loaded = executor.map(
+                    lambda i: cls._load_uncached(
+                        child_paths[i], readonly=readonly, trusted=trusted
+                    ),
+                    missing,
+                )
+                for i, item in zip(missing, loaded):
+                    children[i] = item
+        else:
+            for i in missing:
+                children[i] = cls._load_uncached(
+                    child_paths[i], readonly=readonly, trusted=trusted
+                )
+        return children  # type: ignore
+
+    @classmethod
+    def iter_children_of_parent_path(
+        cls: Type[PT],
+        parent_path: Path | None,
+        readonly: bool = False,
+        trusted: bool = False,
+    ) -> Iterator[PT]:
+        """Lazily load the children of a parent, one at a time, in directory order.
+
+        Prefer over all_children_of_parent_path when filtering or counting, as the full list is never held in memory and callers can stop early.
+        """
+        store = cls.segment_store(parent_path)
+        if store is not None:
+            yield from store.iter_models(cls, readonly=readonly, trusted=trusted)  # type: ignore
+            return
+
         for child_path in cls.iterate_children_paths_of_parent_path(parent_path):
-            item = cls.load_from_file(child_path, readonly=readonly)
-            children.append(item)
-        return children
+            yield cls.load_from_file(child_path, readonly=readonly, trusted=trusted)
 
     @classmethod
     def from_id_and_parent_path(
         cls: Type[PT], id: str, parent_path: Path | None
     ) -> PT | None:
         """
-        Fast search by ID using the cache. Avoids the model_copy overhead on all but the exact match.
-
-        Uses cache so still slow on first load.
+        Fast search by ID. Finds the child's folder by name (which starts with the ID), falling back to checking the ID in every child file if that fails.
         """
         if parent_path is None:
             return None
 
-        # Note: we're using the in-file ID. We could make this faster using the path-ID if this becomes perf bottleneck, but it's better to have 1 source of truth.
+        store = cls.segment_store(parent_path)
+        if store is not None:
+            return store.load(cls, id)  # type: ignore
+
+        # Fast path: folder names start with the ID, so find the child's folder from a (cached) directory listing. The ID in the file is still the source of truth, so check it.
+        relationship_folder = cls.relationship_folder(parent_path)
+        child_folder = ChildListingCache.shared().child_folder(
+            relationship_folder, cls.base_filename(), id
+        )
+        if child_folder is not None:
+            try:
+                child = cls.load_from_file(child_folder / cls.base_filename())
+                if child.id == id:
+                    return child
+            except FileNotFoundError:
+                # Removed since the index was built
+                pass
+
+        # Folder names and file IDs disagree (or the child doesn't exist): check every file
         for child_path in cls.iterate_children_paths_of_parent_path(parent_path):
             child_id = ModelCache.shared().get_model_id(child_path, cls)
             if child_id == id:
@@ -416,13 +624,29 @@ class KilnParentModel(KilnBaseModel, metaclass=ABCMeta):
     def _create_child_method(
         cls, relationship_name: str, child_class: Type[KilnParentedModel]
     ):
-        def child_method(self, readonly: bool = False) -> list[child_class]:
-            return child_class.all_children_of_parent_path(self.path, readonly=readonly)
+        def child_method(
+            self, readonly: bool = False, trusted: bool = False
+        ) -> list[child_class]:
+            return child_class.all_children_of_parent_path(
+                self.path, readonly=readonly, trusted=trusted
+            )
 
         child_method.__name__ = relationship_name
         child_method.__annotations__ = {"return": List[child_class]}
         setattr(cls, relationship_name, child_method)
 
+        # Lazy variant, eg. iter_runs()
+        def iter_child_method(
+            self, readonly: bool = False, trusted: bool = False
+        ) -> Iterator[child_class]:
+            return child_class.iter_children_of_parent_path(
+                self.path, readonly=readonly, trusted=trusted
+            )
+
+        iter_child_method.__name__ = f"iter_{relationship_name}"
+        iter_child_method.__annotations__ = {"return": Iterator[child_class]}
+        setattr(cls, f"iter_{relationship_name}", iter_child_method)
+
     @classmethod
     def _create_parent_methods(
         cls, targetCls: Type[KilnParentedModel], relationship_name: str
@@ -469,10 +693,12 @@ class KilnParentModel(KilnBaseModel, metaclass=ABCMeta):
         Raises:
             ValidationError: If validation fails for the model or any of its children
         """
-        # Validate first, then save. Don't want error half way through, and partly persisted
-        # TODO P2: save to tmp dir, then move atomically. But need to merge directories so later.
-        cls._validate_nested(data, save=False, path=path, parent=parent)
-        instance = cls._validate_nested(data, save=True, path=path, parent=parent)
+        # Validate everything once, keeping the instances. Then save the whole tree as one transaction, so an error or crash never leaves it partly persisted.
+        instances: List[KilnBaseModel] = []
+        instance = cls._validate_nested(
+            data, path=path, parent=parent, validated_instances=instances
+        )
+        save_tree(instances)
         return instance
 
     @classmethod
@@ -482,7 +708,14 @@ class KilnParentModel(KilnBaseModel, metaclass=ABCMeta):
         save: bool = False,
         parent: KilnBaseModel | None = None,
         path: Path | None = None,
+        validated_instances: List[KilnBaseModel] | None = None,
     ):
+        """Validate a model and its nested children.
+
+        Args:
+            save: Save each model as it's validated (not transactional)
+            validated_instances: If provided, the validated models are appended, parents before children
+        """
         # Collect all validation errors so we can report them all at once
         validation_errors = []
 
@@ -494,6 +727,8 @@ class KilnParentModel(KilnBaseModel, metaclass=ABCMeta):
                 instance.parent = parent
             if save:
                 instance.save_to_file()
+            if validated_instances is not None:
+                validated_instances.append(instance)
         except ValidationError as e:
             instance = None
             for suberror in e.errors():
@@ -509,7 +744,11 @@ class KilnParentModel(KilnBaseModel, metaclass=ABCMeta):
                 for value_index, value in enumerate(value_list):
                     try:
                         if issubclass(parent_type, KilnParentModel):
-                            kwargs = {"data": value, "save": save}
+                            kwargs = {
+                                "data": value,
+                                "save": save,
+                                "validated_instances": validated_instances,
+                            }
                             if instance is not None:
                                 kwargs["parent"] = instance
                             parent_type._validate_nested(**kwargs)
@@ -520,6 +759,8 @@ class KilnParentModel(KilnBaseModel, metaclass=ABCMeta):
                                 subinstance.parent = instance
                             if save:
                                 subinstance.save_to_file()
+                            if validated_instances is not None:
+                                validated_instances.append(subinstance)
                         else:
                             raise ValueError(
                                 f"Invalid type {parent_type}. Should be KilnBaseModel based."
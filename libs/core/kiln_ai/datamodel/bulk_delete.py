@@ -0,0 +1,228 @@
+"""
+Bulk deletion of children, for deleting thousands of runs at once.
+
+Deleting children one by one costs a lookup and a recursive delete of each child's folder, all before returning. Instead `delete_children`:
+ - Resolves every ID in one pass, from the cached folder names (checking the ID in each file), with a single scan of the children for any IDs it misses.
+ - Renames each child's folder into a trash batch folder, `{relationship}/.trash/{batch}/`. A rename is atomic and cheap, so once it returns the children are gone for every reader. Dot prefixed folders are skipped when listing children.
+ - Updates caches and indexes once for the whole batch (see `KilnBaseModel.after_delete`).
+ - Removes the batch's files in a background worker pool. Batches left behind by a crash are removed by the next bulk delete in the same relationship folder.
+
+Children in a segment store are deleted with one batch of tombstones instead.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Sequence, Set, Type
+
+from kiln_ai.datamodel.child_listing_cache import ChildListingCache
+from kiln_ai.datamodel.model_cache import ModelCache
+from kiln_ai.datamodel.serialization import model_serializer
+
+if TYPE_CHECKING:
+    from kiln_ai.datamodel.basemodel import KilnParentedModel
+
+logger = logging.getLogger(__name__)
+
+TRASH_FOLDER = ".trash"
+# Threads removing trash batches. Deletes are IO bound, and this runs alongside the server, so keep it small.
+RECLAIM_WORKERS = 2
+
+_reclaim_lock = threading.Lock()
+_reclaim_executor: ThreadPoolExecutor | None = None
+# Trash batches this process is removing (or will remove)
+_active_batches: Set[Path] = set()
+_pending_reclaims: List[Future] = []
+
+
+@dataclass
+class BulkDeleteResult:
+    # IDs deleted, in the order requested
+    deleted: List[str] = field(default_factory=list)
+    # IDs with no child
+    missing: List[str] = field(default_factory=list)
+    # ID -> error, for children which couldn't be deleted
+    failed: Dict[str, Exception] = field(default_factory=dict)
+
+
+def delete_children(
+    child_class: Type["KilnParentedModel"], parent_path: Path, ids: Sequence[str]
+) -> BulkDeleteResult:
+    """
+    Delete many children of a parent by ID. Returns which were deleted, and why the others failed.
+
+    Returns once the children are removed from view. Their files are removed in the background.
+    """
+    # Inline import to avoid circular import
+    from kiln_ai.datamodel.basemodel import child_load_workers
+
+    result = BulkDeleteResult()
+    ids = list(dict.fromkeys(ids))
+    relationship_folder = child_class.relationship_folder(parent_path)
+
+    store = child_class.segment_store(parent_path)
+    if store is not None:
+        deleted_dirnames = store.delete_many(ids)
+        deleted_paths = []
+        for id in ids:
+            if id in deleted_dirnames:
+                result.deleted.append(id)
+                deleted_paths.append(
+                    relationship_folder
+                    / deleted_dirnames[id]
+                    / child_class.base_filename()
+                )
+            else:
+                result.missing.append(id)
+        ModelCache.shared().invalidate_many(deleted_paths)
+        if deleted_paths:
+            child_class.after_delete(deleted_paths)
+        return result
+
+    child_folders = _resolve_child_folders(
+        child_class, parent_path, ids, child_load_workers()
+    )
+
+    batch_folder = relationship_folder / TRASH_FOLDER / uuid.uuid4().hex
+    deleted_paths = []
+    for id in ids:
+        child_folder = child_folders.get(id)
+        if child_folder is None:
+            result.missing.append(id)
+            continue
+        try:
+            batch_folder.mkdir(parents=True, exist_ok=True)
+            os.rename(child_folder, batch_folder / child_folder.name)
+        except Exception as e:
+            result.failed[id] = e
+            continue
+        result.deleted.append(id)
+        deleted_paths.append(child_folder / child_class.base_filename())
+
+    # The folder renames change the relationship folder's mtime, so the listing caches would catch up anyway. Dropping them now saves a stat.
+    ChildListingCache.shared().invalidate(relationship_folder)
+    ModelCache.shared().invalidate_many(deleted_paths)
+    if deleted_paths:
+        child_class.after_delete(deleted_paths)
+
+    _reclaim_trash(relationship_folder / TRASH_FOLDER)
+    return result
+
+
+def wait_for_reclaim() -> None:
+    """Block until trash batches scheduled so far are removed."""
+    with _reclaim_lock:
+        pending = list(_pending_reclaims)
+    for future in pending:
+        future.result()
+
+
+def _resolve_child_folders(
+    child_class: Type["KilnParentedModel"],
+    parent_path: Path,
+    ids: List[str],
+    max_workers: int,
+) -> Dict[str, Path]:
+    """The folder of each child with an ID in ids. IDs with no child are missing from the result."""
+    relationship_folder = child_class.relationship_folder(parent_path)
+    folders_by_id = ChildListingCache.shared().folders_by_id(
+        relationship_folder, child_class.base_filename()
+    )
+    candidates: Dict[str, Path] = {}
+    for id in ids:
+        child_folder = folders_by_id.get(id)
+        if child_folder is not None:
+            candidates[id] = child_folder
+
+    # Folder names start with the ID, but the ID in the file is the source of truth, so check it
+    candidate_ids = list(candidates)
+    file_ids = _read_ids(
+        child_class,
+        [candidates[id] / child_class.base_filename() for id in candidate_ids],
+        max_workers,
+    )
+    resolved = {
+        id: candidates[id]
+        for id, file_id in zip(candidate_ids, file_ids)
+        if file_id == id
+    }
+    if len(resolved) == len(ids):
+        return resolved
+
+    # Folder names and file IDs disagree (or the child doesn't exist): check every other file, once for all unresolved IDs
+    unresolved = set(ids) - set(resolved)
+    resolved_folders = set(resolved.values())
+    other_paths = [
+        path
+        for path in child_class.iterate_children_paths_of_parent_path(parent_path)
+        if path.parent not in resolved_folders
+    ]
+    for path, file_id in zip(
+        other_paths, _read_ids(child_class, other_paths, max_workers)
+    ):
+        if file_id in unresolved and file_id not in resolved:
+            resolved[file_id] = path.parent
+    return resolved
+
+
+def _read_ids(
+    child_class: Type["KilnParentedModel"], paths: List[Path], max_workers: int
+) -> List[str | None]:
+    if max_workers > 1 and len(paths) > 1:
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(paths)),
+            thread_name_prefix="kiln_bulk_delete",
+        ) as executor:
+            return list(executor.map(lambda path: _read_id(child_class, path), paths))
+    return [_read_id(child_class, path) for path in paths]
+
+
+def _read_id(child_class: Type["KilnParentedModel"], path: Path) -> str | None:
+    cached_id = ModelCache.shared().get_model_id(path, child_class)
+    if cached_id is not None:
+        return cached_id
+    try:
+        # Only the ID is needed: skip validating the whole model
+        data = model_serializer().loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+    id = data.get("id") if isinstance(data, dict) else None
+    return id if isinstance(id, str) else None
+
+
+def _reclaim_trash(trash_folder: Path) -> None:
+    """Remove every trash batch in the folder in the background, including any left by an earlier process."""
+    global _reclaim_executor
+    try:
+        batches = [Path(entry.path) for entry in os.scandir(trash_folder)]
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    with _reclaim_lock:
+        if _reclaim_executor is None:
+            _reclaim_executor = ThreadPoolExecutor(
+                max_workers=RECLAIM_WORKERS, thread_name_prefix="kiln_trash_reclaim"
+            )
+        _pending_reclaims[:] = [f for f in _pending_reclaims if not f.done()]
+        for batch in batches:
+            if batch in _active_batches:
+                continue
+            _active_batches.add(batch)
+            _pending_reclaims.append(_reclaim_executor.submit(_remove_batch, batch))
+
+
+def _remove_batch(batch: Path) -> None:
+    try:
+        shutil.rmtree(batch)
+    except FileNotFoundError:
+        # Removed by another process
+        pass
+    except Exception:
+        logger.exception("Failed to remove trash batch %s", batch)
+    finally:
+        with _reclaim_lock:
+            _active_batches.discard(batch)
@@ -0,0 +1,153 @@
+"""
+Cached listings of the child files in relationship folders.
+
+Listing the children of a model takes a scandir of its relationship folder, plus a stat per child to check its file exists. The folder's mtime changes whenever a child folder is added, removed or renamed, so the listing is cached until it changes: a warm listing costs one stat, however many children there are.
+
+Two cases the folder's mtime doesn't cover:
+ - Changes within one tick of the filesystem's timestamps. Listings of folders modified less than RACY_WINDOW_NS before the scan aren't cached (the same approach as git's "racy" index entries), so this is safe on filesystems with coarse timestamps.
+ - A child's file being written after its folder was created. Child folders without their file are re-checked on each listing until it appears.
+
+Deleting a child removes its whole folder (see `KilnBaseModel.delete`), which changes the mtime.
+
+The same listing finds children by ID: child folders are named `{id} - {name}` (see `build_child_dirname`), so a child's folder can be found without opening any files. Folder names are a hint, not the source of truth: callers must check the ID in the file, and fall back to checking every file when they disagree (folders renamed by hand).
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Listings of folders modified within this long of the scan aren't cached. Covers filesystems with timestamps as coarse as 2 seconds (FAT).
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def id_from_dirname(dirname: str) -> str:
+    return dirname.split(" - ", 1)[0]
+
+
+@dataclass
+class _Listing:
+    mtime_ns: int
+    files: Tuple[Path, ...]
+    # Child folders which didn't contain the child file yet
+    incomplete: List[Path]
+    # Child ID -> child folder, from the folder names. Built on the first lookup by ID.
+    folders_by_id: Dict[str, Path] | None = None
+
+
+class ChildListingCache:
+    _shared_instance = None
+
+    def __init__(self):
+        # (relationship folder, child base filename) -> listing
+        self._listings: Dict[Tuple[Path, str], _Listing] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "ChildListingCache":
+        if cls._shared_instance is None:
+            cls._shared_instance = cls()
+        return cls._shared_instance
+
+    def child_files(
+        self, relationship_folder: Path, base_filename: str
+    ) -> Tuple[Path, ...]:
+        """The `{relationship_folder}/{child folder}/{base_filename}` files which exist, in directory order."""
+        listing = self._listing(relationship_folder, base_filename)
+        return listing.files if listing is not None else ()
+
+    def child_folder(
+        self, relationship_folder: Path, base_filename: str, id: str
+    ) -> Path | None:
+        """The folder of the child with this ID according to folder names, or None if no folder name matches."""
+        return self.folders_by_id(relationship_folder, base_filename).get(id)
+
+    def folders_by_id(
+        self, relationship_folder: Path, base_filename: str
+    ) -> Dict[str, Path]:
+        """Child ID -> child folder, according to folder names. Includes folders which don't contain their file yet. Don't modify the result."""
+        listing = self._listing(relationship_folder, base_filename)
+        if listing is None:
+            return {}
+        with self._lock:
+            if listing.folders_by_id is None:
+                folders_by_id: Dict[str, Path] = {}
+                for folder in [path.parent for path in listing.files] + list(
+                    listing.incomplete
+                ):
+                    # First folder wins if two share an ID. The caller checks the file, so a wrong guess only costs the fallback scan.
+                    folders_by_id.setdefault(id_from_dirname(folder.name), folder)
+                listing.folders_by_id = folders_by_id
+            return listing.folders_by_id
+
+    def _listing(
+        self, relationship_folder: Path, base_filename: str
+    ) -> _Listing | None:
+        try:
+            mtime_ns = relationship_folder.stat().st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+        key = (relationship_folder, base_filename)
+        with self._lock:
+            listing = self._listings.get(key)
+            if listing is not None and listing.mtime_ns == mtime_ns:
+                if listing.incomplete:
+                    self._recheck_incomplete(listing, base_filename)
+                return listing
+
+        scanned_at = time.time_ns()
+        listing = self._scan(relationship_folder, base_filename, mtime_ns)
+        with self._lock:
+            if mtime_ns < scanned_at - RACY_WINDOW_NS:
+                self._listings[key] = listing
+            else:
+                self._listings.pop(key, None)
+        return listing
+
+    def invalidate(self, relationship_folder: Path) -> None:
+        with self._lock:
+            for key in [key for key in self._listings if key[0] == relationship_folder]:
+                del self._listings[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._listings.clear()
+
+    def _scan(
+        self, relationship_folder: Path, base_filename: str, mtime_ns: int
+    ) -> _Listing:
+        files: List[Path] = []
+        incomplete: List[Path] = []
+        try:
+            # Benchmark: scandir is 10x faster than glob, so worth the extra code
+            with os.scandir(relationship_folder) as entries:
+                for entry in entries:
+                    # Dot prefixed folders are staging folders for in-progress saves
+                    if entry.name.startswith(".") or not entry.is_dir():
+                        continue
+                    child_file = Path(entry.path) / base_filename
+                    if child_file.is_file():
+                        files.append(child_file)
+                    else:
+                        incomplete.append(Path(entry.path))
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        return _Listing(mtime_ns, tuple(files), incomplete)
+
+    def _recheck_incomplete(self, listing: _Listing, base_filename: str) -> None:
+        # Caller holds the lock
+        found = [
+            folder
+            for folder in listing.incomplete
+            if (folder / base_filename).is_file()
+        ]
+        if found:
+            listing.files = listing.files + tuple(
+                folder / base_filename for folder in found
+            )
+            listing.incomplete = [
+                folder for folder in listing.incomplete if folder not in found
+            ]
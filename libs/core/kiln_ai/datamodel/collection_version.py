@@ -0,0 +1,78 @@
+"""
+Version tokens for collections of children, so list views can tell when nothing changed without loading any children.
+
+A collection is the children in one relationship folder (eg. a task's runs). Versions are used as ETags, so they must be the same in every server process.
+ - A task's runs, with the run index enabled: the index's generation (see `TaskRunIndex.generation`). Stored in the index file, so shared by every process. No stat per run.
+ - Otherwise, built from what's on disk: the relationship folder's mtime, and the mtime and size of each child's files (and of the segment store's files, if it has one). Covers children added, removed or edited by any process, including changes arriving through a git pull or sync. Nothing is written to the project, so this adds nothing to git or sync, but it costs a stat per child file.
+
+Separately, this module counts saves and deletes through Kiln in this process per folder (`collection_generation`). That's per process, so it's never part of a version. The run index uses it to tell when it needs a refresh.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator
+
+from kiln_ai.datamodel.segment_store import SEGMENT_FOLDER
+
+_lock = threading.Lock()
+# Relationship folder -> saves and deletes through Kiln in this process
+_generations: Dict[Path, int] = {}
+
+
+def bump_collection_generations(relationship_folders: Iterable[Path]) -> None:
+    """Record that children in these folders were saved or deleted."""
+    with _lock:
+        for relationship_folder in set(relationship_folders):
+            _generations[relationship_folder] = (
+                _generations.get(relationship_folder, 0) + 1
+            )
+
+
+def collection_generation(relationship_folder: Path) -> int:
+    """How many times children in the folder were saved or deleted through Kiln in this process."""
+    with _lock:
+        return _generations.get(relationship_folder, 0)
+
+
+def collection_version(relationship_folder: Path) -> str:
+    """A token which changes whenever children in the folder are added, removed or changed. The same in every process."""
+    # Inline import to avoid circular import
+    from kiln_ai.datamodel.run_index import TaskRunIndex
+
+    index = TaskRunIndex.for_runs_folder(relationship_folder)
+    if index is not None:
+        return f"index:{index.generation()}"
+    try:
+        mtime_ns = relationship_folder.stat().st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError):
+        return "none"
+    digest = hashlib.sha256()
+    for line in sorted(_child_file_stats(relationship_folder)):
+        digest.update(line.encode())
+    return f"{mtime_ns}:{digest.hexdigest()[:32]}"
+
+
+def _child_file_stats(relationship_folder: Path) -> Iterator[str]:
+    try:
+        with os.scandir(relationship_folder) as entries:
+            child_folders = [
+                entry.path
+                for entry in entries
+                # Dot prefixed folders are staging and trash folders, except the segment store
+                if (not entry.name.startswith(".") or entry.name == SEGMENT_FOLDER)
+                and entry.is_dir()
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    for child_folder in child_folders:
+        try:
+            with os.scandir(child_folder) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        yield f"{entry.path}:{stat.st_mtime_ns}:{stat.st_size}\n"
+        except (FileNotFoundError, NotADirectoryError):
+            # Removed while scanning: the folder's mtime reflects that
+            continue
@@ -1,11 +1,17 @@
 import re
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Annotated, ClassVar, List, Protocol
+from typing import TYPE_CHECKING, Annotated, ClassVar, Iterator, List, Protocol, Set
 
 from pydantic import AfterValidator
 
+from kiln_ai.datamodel.basemodel import ID_TYPE
+from kiln_ai.datamodel.run_index import TaskRunIndex, TaskRunIndexEntry
 from kiln_ai.datamodel.task_run import TaskRun
 
+if TYPE_CHECKING:
+    from kiln_ai.datamodel.task import Task
+
 
 class DatasetFilter(Protocol):
     """A protocol defining the interface for dataset filters.
@@ -180,3 +186,92 @@ def dataset_filter_from_id(id: DatasetFilterId) -> DatasetFilter:
         return static_dataset_filters[id]
 
     raise ValueError(f"Invalid dataset filter ID: {id}")
+
+
+@dataclass
+class DatasetFilterPlan:
+    """
+    A dataset filter split into the parts the run index can answer, and the rest.
+
+    A run matches if it has every tag, a true value for every flag (see `TaskRunIndex.query`), and passes every residual filter. Residual filters need the run loaded.
+    """
+
+    tags: List[str] = field(default_factory=list)
+    flags: List[str] = field(default_factory=list)
+    residual: List[DatasetFilter] = field(default_factory=list)
+
+    def extend(self, other: "DatasetFilterPlan") -> None:
+        self.tags += [tag for tag in other.tags if tag not in self.tags]
+        self.flags += [flag for flag in other.flags if flag not in self.flags]
+        self.residual += other.residual
+
+
+# Index flags equivalent to each built-in filter
+_static_filter_flags: List[tuple[DatasetFilter, List[str]]] = [
+    (AllDatasetFilter, []),
+    (HighRatingDatasetFilter, ["high_quality"]),
+    (ThinkingModelDatasetFilter, ["has_thinking"]),
+    (ThinkingModelHighRatedFilter, ["has_thinking", "high_quality"]),
+]
+
+
+def plan_dataset_filter(filter: DatasetFilter) -> DatasetFilterPlan:
+    """Split a filter into index lookups and residual filters. Filters this doesn't know (like custom callables) are residual."""
+    if isinstance(filter, MultiDatasetFilter):
+        plan = DatasetFilterPlan()
+        for sub_filter in filter.filters:
+            plan.extend(plan_dataset_filter(sub_filter))
+        return plan
+    if isinstance(filter, TagFilter):
+        return DatasetFilterPlan(tags=[filter.tag])
+    for static_filter, flags in _static_filter_flags:
+        if filter is static_filter:
+            return DatasetFilterPlan(flags=list(flags))
+    return DatasetFilterPlan(residual=[filter])
+
+
+def _query_index(
+    task: "Task", plan: DatasetFilterPlan
+) -> List[TaskRunIndexEntry] | None:
+    # None if the index is disabled, or doesn't cover this task's runs
+    index = TaskRunIndex.for_task_path(task.path)
+    if index is None:
+        return None
+    return index.query(plan.tags, plan.flags)
+
+
+def iter_filtered_runs(
+    task: "Task", filter: DatasetFilter, readonly: bool = False
+) -> Iterator[TaskRun]:
+    """
+    The runs of a task which pass a filter.
+
+    If the run index is enabled, the indexable parts of the filter are answered from it, and only runs which pass those are loaded. Otherwise every run is loaded and checked.
+    """
+    plan = plan_dataset_filter(filter)
+    # Without tags or flags to narrow down the runs, the index has nothing to skip
+    entries = _query_index(task, plan) if plan.tags or plan.flags else None
+    if entries is None:
+        for task_run in task.iter_runs(readonly=readonly):
+            if filter(task_run):
+                yield task_run
+        return
+
+    for entry in entries:
+        try:
+            task_run = TaskRun.load_from_file(entry.path, readonly=readonly)
+        except FileNotFoundError:
+            # Deleted since the index was refreshed
+            continue
+        if all(residual(task_run) for residual in plan.residual):
+            yield task_run
+
+
+def filtered_run_ids(task: "Task", filter: DatasetFilter) -> Set[ID_TYPE]:
+    """The IDs of the runs of a task which pass a filter. Loads no runs if the run index can answer the whole filter."""
+    plan = plan_dataset_filter(filter)
+    if not plan.residual:
+        entries = _query_index(task, plan)
+        if entries is not None:
+            return {entry.id for entry in entries}
+    return {task_run.id for task_run in iter_filtered_runs(task, filter, readonly=True)}
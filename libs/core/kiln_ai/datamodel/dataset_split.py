@@ -13,6 +13,7 @@ from kiln_ai.datamodel.dataset_filters import (
     DatasetFilter,
     DatasetFilterId,
     dataset_filter_from_id,
+    filtered_run_ids,
 )
 
 if TYPE_CHECKING:
@@ -124,10 +125,10 @@ class DatasetSplit(KilnParentedModel):
         splits: list[DatasetSplitDefinition],
         filter: DatasetFilter,
     ) -> dict[str, list[str]]:
-        valid_ids = []
-        for task_run in task.runs():
-            if filter(task_run):
-                valid_ids.append(task_run.id)
+        # Sorted so the shuffle is reproducible with a seeded random
+        valid_ids = sorted(
+            id for id in filtered_run_ids(task, filter) if id is not None
+        )
 
         # Shuffle and split by split percentage
         random.shuffle(valid_ids)
@@ -165,8 +166,7 @@ class DatasetSplit(KilnParentedModel):
         if parent is None:
             raise ValueError("DatasetSplit has no parent task")
 
-        runs = parent.runs(readonly=True)
-        all_ids = set(run.id for run in runs)
+        all_ids = set(run.id for run in parent.iter_runs(readonly=True))
         all_ids_in_splits = set()
         for ids in self.split_contents.values():
             all_ids_in_splits.update(ids)
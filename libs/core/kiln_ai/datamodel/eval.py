@@ -1,6 +1,6 @@
 import json
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Dict, List, Union
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Union
 
 from pydantic import BaseModel, Field, model_validator
 from typing_extensions import Self
@@ -217,8 +217,13 @@ class EvalConfig(KilnParentedModel, KilnParentModel, parent_of={"runs": EvalRun}
             raise ValueError("parent must be an Eval")
         return self.parent  # type: ignore
 
-    def runs(self, readonly: bool = False) -> list[EvalRun]:
-        return super().runs(readonly=readonly)  # type: ignore
+    def runs(self, readonly: bool = False, trusted: bool = False) -> list[EvalRun]:
+        return super().runs(readonly=readonly, trusted=trusted)  # type: ignore
+
+    def iter_runs(
+        self, readonly: bool = False, trusted: bool = False
+    ) -> Iterator[EvalRun]:
+        return super().iter_runs(readonly=readonly, trusted=trusted)  # type: ignore
 
     @model_validator(mode="after")
     def validate_properties(self) -> Self:
@@ -290,6 +295,9 @@ class Eval(KilnParentedModel, KilnParentModel, parent_of={"configs": EvalConfig}
     def configs(self, readonly: bool = False) -> list[EvalConfig]:
         return super().configs(readonly=readonly)  # type: ignore
 
+    def iter_configs(self, readonly: bool = False) -> Iterator[EvalConfig]:
+        return super().iter_configs(readonly=readonly)  # type: ignore
+
     @model_validator(mode="after")
     def validate_scores(self) -> Self:
         if self.output_scores is None or len(self.output_scores) == 0:
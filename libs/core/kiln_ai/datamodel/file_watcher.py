@@ -0,0 +1,181 @@
+"""
+Optional inotify based file watcher, used by the ModelCache to skip stat() calls on cache hits.
+
+Linux only, using inotify via ctypes (no extra dependencies). A background thread reads events and reports changed paths through a callback. Anything that goes wrong (not Linux, no libc, out of watches, event queue overflow) is reported so the cache can fall back to checking mtimes.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+# Any change to a file in the directory, or to the directory itself
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+DIRECTORY_GONE_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc() -> ctypes.CDLL:
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    # Raises AttributeError if the libc doesn't have inotify
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+class InotifyWatcher:
+    """
+    Watches directories for changes with inotify.
+
+    on_change is called from the watcher thread with:
+     - the path of a file that changed inside a watched directory
+     - the path of a watched directory which was deleted or moved
+     - None if events were lost (queue overflow), and all watched paths should be treated as changed
+    """
+
+    def __init__(self, on_change: Callable[[Path | None], None]):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        try:
+            self._libc = _load_libc()
+        except (OSError, AttributeError) as e:
+            raise OSError(f"inotify is not available: {e}") from e
+
+        fd = self._libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+
+        self._fd = fd
+        self._on_change = on_change
+        self._lock = threading.Lock()
+        self._dirs_by_wd: Dict[int, Path] = {}
+        self._wds_by_dir: Dict[Path, int] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="kiln_file_watcher", daemon=True
+        )
+        self._thread.start()
+
+    def watch(self, directory: Path) -> bool:
+        """Start watching a directory. Returns False if it can't be watched (eg. out of inotify watches)."""
+        with self._lock:
+            if directory in self._wds_by_dir:
+                return True
+            if self._stopped.is_set():
+                return False
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(directory), WATCH_MASK
+            )
+            if wd < 0:
+                errno = ctypes.get_errno()
+                logger.debug("Can't watch %s: %s", directory, os.strerror(errno))
+                return False
+            self._dirs_by_wd[wd] = directory
+            self._wds_by_dir[directory] = wd
+            return True
+
+    def unwatch(self, directory: Path) -> None:
+        with self._lock:
+            wd = self._wds_by_dir.pop(directory, None)
+            if wd is None:
+                return
+            self._dirs_by_wd.pop(wd, None)
+            if not self._stopped.is_set():
+                self._libc.inotify_rm_watch(self._fd, wd)
+
+    def is_watching(self, directory: Path) -> bool:
+        return directory in self._wds_by_dir
+
+    def close(self) -> None:
+        with self._lock:
+            if self._stopped.is_set():
+                return
+            self._stopped.set()
+            self._dirs_by_wd.clear()
+            self._wds_by_dir.clear()
+        self._thread.join()
+        os.close(self._fd)
+
+    def _run(self) -> None:
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        while not self._stopped.is_set():
+            # Timeout so close() doesn't wait on a quiet directory
+            if not poller.poll(200):
+                continue
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                logger.exception("File watcher failed, falling back to mtime checks")
+                self._stopped.set()
+                self._on_change(None)
+                return
+            self._handle_events(data)
+
+    def _handle_events(self, data: bytes) -> None:
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                self._on_change(None)
+                continue
+
+            with self._lock:
+                directory = self._dirs_by_wd.get(wd)
+                if directory is not None and mask & DIRECTORY_GONE_MASK:
+                    # The kernel drops the watch once the directory is deleted, but not when moved
+                    self._dirs_by_wd.pop(wd, None)
+                    self._wds_by_dir.pop(directory, None)
+                    if mask & IN_MOVE_SELF:
+                        self._libc.inotify_rm_watch(self._fd, wd)
+            if directory is None:
+                continue
+            if mask & DIRECTORY_GONE_MASK:
+                self._on_change(directory)
+            elif name:
+                self._on_change(directory / os.fsdecode(name))
@@ -1,6 +1,7 @@
 import json
 import re
-from typing import Annotated, Dict
+from functools import lru_cache
+from typing import Annotated, Any, Callable, Dict
 
 import jsonschema
 import jsonschema.exceptions
@@ -28,7 +29,8 @@ def _check_json_schema(v: str) -> str:
     Raises:
         ValueError: If the schema is invalid
     """
-    schema_from_json_str(v)
+    # Also warms the validator cache, as schemas are usually validated against soon after they're loaded
+    compiled_validator(v)
     return v
 
 
@@ -42,9 +44,11 @@ def validate_schema(instance: Dict, schema_str: str) -> None:
     Raises:
         jsonschema.exceptions.ValidationError: If validation fails
     """
-    schema = schema_from_json_str(schema_str)
-    v = jsonschema.Draft202012Validator(schema)
-    v.validate(instance)
+    validator, fast_validator = compiled_validator(schema_str)
+    if fast_validator is not None and fast_validator(instance):
+        return
+    # Also reached when the fast validator fails, so errors always come from jsonschema
+    validator.validate(instance)
 
 
 def validate_schema_with_value_error(
@@ -103,6 +107,121 @@ def schema_from_json_str(v: str) -> Dict:
         raise ValueError(f"Unexpected error parsing JSON schema: {v}\n {e}")
 
 
+# Number of distinct schemas to keep compiled validators for. Tasks and evals each have a few.
+VALIDATOR_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=VALIDATOR_CACHE_SIZE)
+def compiled_validator(
+    schema_str: str,
+) -> tuple[jsonschema.Draft202012Validator, Callable[[Any], bool] | None]:
+    """Get the compiled validators for a JSON schema string, cached by the schema string.
+
+    Building a validator parses and checks the schema, which costs far more than validating a typical instance.
+
+    Args:
+        schema_str: JSON schema string
+
+    Returns:
+        The jsonschema validator, and a fast validator if the schema is simple enough to generate one (see `generate_fast_validator`)
+
+    Raises:
+        ValueError: If the schema is invalid. Invalid schemas aren't cached.
+    """
+    schema = schema_from_json_str(schema_str)
+    return jsonschema.Draft202012Validator(schema), generate_fast_validator(schema)
+
+
+# Checks for a value `v` matching each JSON schema type, matching jsonschema's Draft 2020-12 semantics for values parsed from JSON. Subclasses (eg. str enums) fail, falling back to jsonschema.
+_FAST_TYPE_CHECKS = {
+    "string": "type(v) is str",
+    "integer": "(type(v) is int or (type(v) is float and v.is_integer()))",
+    "number": "(type(v) is int or type(v) is float)",
+    "boolean": "type(v) is bool",
+    "null": "v is None",
+}
+# Keywords which don't affect validation
+_ANNOTATION_KEYWORDS = {"title", "description", "default", "examples", "$comment"}
+
+
+def generate_fast_validator(schema: Dict) -> Callable[[Any], bool] | None:
+    """Generate a Python function checking instances against a simple object schema, like the ones Kiln creates for structured output.
+
+    Supports objects with properties of primitive types, `required` and `additionalProperties`. The function returns True if the instance is valid, and False if it's invalid or can't be checked quickly: callers fall back to jsonschema on False, for its error messages.
+
+    Args:
+        schema: Parsed JSON schema
+
+    Returns:
+        The validation function, or None if the schema uses anything else
+    """
+    if (
+        set(schema.keys())
+        - _ANNOTATION_KEYWORDS
+        - {
+            "$schema",
+            "type",
+            "properties",
+            "required",
+            "additionalProperties",
+        }
+    ):
+        return None
+    properties = schema.get("properties")
+    required = schema.get("required", [])
+    additional_properties = schema.get("additionalProperties", True)
+    if (
+        schema.get("type") != "object"
+        or not isinstance(properties, dict)
+        or not isinstance(required, list)
+        or not all(isinstance(name, str) for name in required)
+        or not isinstance(additional_properties, bool)
+    ):
+        return None
+
+    lines = [
+        "def fast_validator(instance):",
+        "    if type(instance) is not dict:",
+        "        return False",
+    ]
+    for name in required:
+        lines += [f"    if {name!r} not in instance:", "        return False"]
+    for name, property_schema in properties.items():
+        if not isinstance(property_schema, dict):
+            return None
+        if set(property_schema.keys()) - _ANNOTATION_KEYWORDS - {"type"}:
+            return None
+        if "type" not in property_schema:
+            # Any value is valid
+            continue
+        property_type = property_schema["type"]
+        check = (
+            _FAST_TYPE_CHECKS.get(property_type)
+            if isinstance(property_type, str)
+            else None
+        )
+        if check is None:
+            return None
+        lines += [
+            f"    v = instance.get({name!r}, _missing)",
+            f"    if v is not _missing and not {check}:",
+            "        return False",
+        ]
+    if not additional_properties:
+        lines += [
+            "    if not instance.keys() <= _property_names:",
+            "        return False",
+        ]
+    lines.append("    return True")
+
+    namespace: Dict[str, Any] = {
+        "_missing": object(),
+        "_property_names": frozenset(properties.keys()),
+    }
+    exec(compile("\n".join(lines), "<kiln fast validator>", "exec"), namespace)
+    return namespace["fast_validator"]
+
+
 def string_to_json_key(s: str) -> str:
     """Convert a string to a valid JSON key."""
     return re.sub(r"[^a-z0-9_]", "", s.strip().lower().replace(" ", "_"))
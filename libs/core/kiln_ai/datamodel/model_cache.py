@@ -10,25 +10,105 @@ Keeping this really simple. Our goal is to really be "disk-backed" data model, s
  - Use path as the cache key
  - Cache always populated from a disk read, so we know it refects what's on disk. Even if we had a memory-constructed version, we don't cache that.
  - Cache the parsed model, not the raw file contents. Parsing and validating is what's expensive. >99% speedup when measured.
+ - Optionally bounded (max entries and/or estimated bytes) with LRU eviction, so long running processes don't grow without limit. Unbounded by default.
+ - Optionally (Linux only) an inotify watcher marks entries stale when their files change, so cache hits don't need a stat() call. Falls back to the mtime check for any file which isn't watched.
+ - Optionally the cache is snapshotted to disk on exit and restored lazily on the next start, so restarts start warm. See model_cache_snapshot.
+ - Optionally misses check a store shared by every process on the host, so API workers share loads. See shared_model_store.
+ - Models built by a trusted load (see trusted_load) are marked unvalidated. They only satisfy trusted lookups: a normal lookup treats them as a miss, so the caller loads and validates the file, replacing the entry. They're never written to the snapshot or shared store.
+ - Records of a segment store (see segment_store) are cached at the path they would have as a file. They're checked against a version from the store, rather than the file's mtime, and are never written to the snapshot or shared store.
+ - Non-readonly reads return a structural copy: immutable values (strings, numbers, datetimes, enums) are shared with the cached model, only the mutable structure (models, lists, dicts) is copied. Much cheaper than a deep copy, with the same isolation.
 """
 
+import atexit
 import os
 import sys
+import threading
 import warnings
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional, Tuple, Type, TypeVar
+from typing import Any, Dict, Optional, Set, Tuple, Type, TypeVar
 
 from pydantic import BaseModel
 
+from kiln_ai.datamodel.file_watcher import InotifyWatcher
+from kiln_ai.datamodel.model_cache_snapshot import ModelCacheSnapshot
+from kiln_ai.datamodel.shared_model_store import STORE_FILENAME, SharedModelStore
+from kiln_ai.utils.config import Config
+
 T = TypeVar("T", bound=BaseModel)
 
+SNAPSHOT_FILENAME = "model_cache.snapshot"
+
+
+def structural_copy(value: Any) -> Any:
+    """
+    Copy the mutable structure of a value (pydantic models, lists, dicts, sets), sharing everything else.
+
+    Edits to the copy, including in-place edits of nested models or containers, never reach the original. Leaves are shared, which is safe because they are immutable. About 3x faster than `model_copy(deep=True)` on a typical TaskRun.
+    """
+    if isinstance(value, BaseModel):
+        # Shallow copy: new __dict__, private attrs and fields_set, without validation
+        copy = value.model_copy()
+        fields = copy.__dict__
+        for name, field_value in fields.items():
+            if isinstance(field_value, (BaseModel, list, dict, set)):
+                fields[name] = structural_copy(field_value)
+        return copy
+    if isinstance(value, list):
+        return [structural_copy(item) for item in value]
+    if isinstance(value, dict):
+        return {key: structural_copy(item) for key, item in value.items()}
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+@dataclass
+class ModelCacheStats:
+    """Counters for sizing the cache budget of a deployment."""
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    estimated_bytes: int
+    # Models restored from the on-disk snapshot, rather than loaded from their files
+    snapshot_restores: int = 0
+    # Models loaded by another process, restored from the shared store
+    shared_restores: int = 0
+
 
 class ModelCache:
     _shared_instance = None
 
-    def __init__(self):
-        # Store both the model and the modified time of the cached file contents
-        self.model_cache: Dict[Path, Tuple[BaseModel, int]] = {}
+    def __init__(self, max_entries: int | None = None, max_bytes: int | None = None):
+        """
+        Args:
+            max_entries: Maximum number of models to keep. None for unbounded.
+            max_bytes: Maximum estimated size of cached models, in bytes. None for unbounded. Estimated from the size of the file each model was loaded from.
+        """
+        # Store the model, the modified time of the cached file contents (or a record's version), and the estimated size. Ordered from least to most recently used.
+        self.model_cache: OrderedDict[Path, Tuple[BaseModel, int, int]] = OrderedDict()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._estimated_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.RLock()
+        # With a file watcher: paths whose files are known unchanged since they were cached, grouped by watched directory
+        self._watcher: InotifyWatcher | None = None
+        self._trusted_paths: Set[Path] = set()
+        # Paths whose cached model came from a trusted load, skipping validation
+        self._unvalidated_paths: Set[Path] = set()
+        # Paths of segment store records, cached with a version rather than an mtime
+        self._record_paths: Set[Path] = set()
+        self._watched_dirs: Dict[Path, Set[Path]] = {}
+        self._snapshot: ModelCacheSnapshot | None = None
+        self._snapshot_restores = 0
+        self._shared_store: SharedModelStore | None = None
+        self._shared_restores = 0
         self._enabled = self._check_timestamp_granularity()
         if not self._enabled:
             warnings.warn(
@@ -39,62 +119,390 @@ class ModelCache:
     @classmethod
     def shared(cls):
         if cls._shared_instance is None:
-            cls._shared_instance = cls()
+            config = Config.shared()
+            cls._shared_instance = cls(
+                max_entries=config.model_cache_max_entries,
+                max_bytes=config.model_cache_max_bytes,
+            )
+            if config.enable_file_watcher is True:
+                cls._shared_instance.enable_file_watcher()
+            if config.model_cache_snapshot is True:
+                cls._shared_instance.enable_snapshot(
+                    Path(Config.settings_dir()) / SNAPSHOT_FILENAME
+                )
+            if config.shared_model_cache is True:
+                cls._shared_instance.enable_shared_store(
+                    Path(Config.settings_dir()) / STORE_FILENAME
+                )
         return cls._shared_instance
 
+    def enable_shared_store(self, path: Path) -> bool:
+        """
+        Share loaded models with other processes through a store at path.
+
+        Returns False if caching is disabled on this filesystem.
+        """
+        with self._lock:
+            if not self._enabled:
+                return False
+            self._shared_store = SharedModelStore(path)
+        return True
+
+    def enable_snapshot(self, path: Path, save_at_exit: bool = True) -> bool:
+        """
+        Restore cached models from a snapshot at path (lazily, as they're requested), and save a new snapshot when the process exits.
+
+        Returns False if caching is disabled on this filesystem.
+        """
+        with self._lock:
+            if not self._enabled:
+                return False
+            self._snapshot = ModelCacheSnapshot(path)
+        if save_at_exit:
+            atexit.register(self.save_snapshot)
+        return True
+
+    def save_snapshot(self) -> int:
+        """Write the cached models to the snapshot. Returns the number of models written."""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return 0
+            models = [
+                (path, model, mtime_ns, size_bytes)
+                for path, (model, mtime_ns, size_bytes) in self.model_cache.items()
+                if path not in self._unvalidated_paths
+                and path not in self._record_paths
+            ]
+            try:
+                return snapshot.write(models, max_entries=self.max_entries)
+            except OSError as e:
+                warnings.warn(f"Failed to save model cache snapshot: {e}")
+                return 0
+
+    def enable_file_watcher(self) -> bool:
+        """
+        Watch cached files with inotify, so cache hits can skip the stat() call.
+
+        Returns False (and keeps using mtime checks) if a watcher isn't available on this platform.
+        """
+        with self._lock:
+            if self._watcher is not None:
+                return True
+            if not self._enabled:
+                return False
+            try:
+                self._watcher = InotifyWatcher(self._on_file_change)
+            except OSError as e:
+                warnings.warn(
+                    f"File watcher unavailable, using mtime checks for the model cache: {e}"
+                )
+                return False
+            return True
+
+    def disable_file_watcher(self):
+        with self._lock:
+            watcher = self._watcher
+            self._watcher = None
+            self._trusted_paths.clear()
+            self._watched_dirs.clear()
+        if watcher is not None:
+            watcher.close()
+
     def _is_cache_valid(self, path: Path, cached_mtime_ns: int) -> bool:
+        # The watcher will have removed the path from the trusted set if the file changed
+        if path in self._trusted_paths:
+            return True
         try:
             current_mtime_ns = path.stat().st_mtime_ns
         except Exception:
             return False
         return cached_mtime_ns == current_mtime_ns
 
-    def _get_model(self, path: Path, model_type: Type[T]) -> Optional[T]:
-        if path not in self.model_cache:
-            return None
-        model, cached_mtime_ns = self.model_cache[path]
-        if not self._is_cache_valid(path, cached_mtime_ns):
-            self.invalidate(path)
-            return None
+    def _get_model(
+        self,
+        path: Path,
+        model_type: Type[T],
+        trusted: bool = False,
+        version: int | None = None,
+    ) -> Optional[T]:
+        with self._lock:
+            entry = self.model_cache.get(path)
+            is_record = path in self._record_paths
+            snapshot = self._snapshot
+            shared_store = self._shared_store
+        if entry is not None and is_record != (version is not None):
+            # A record looked up as a file (eg. load_from_file before it falls back to the store), or the reverse: a miss which leaves the entry alone
+            entry = None
+        elif (
+            entry is None
+            and version is None
+            and (snapshot is not None or shared_store is not None)
+        ):
+            # Restoring reads and unpickles the model: done without the lock, so other lookups aren't blocked
+            entry = self._restore(path, snapshot, shared_store)
+
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return None
+            model, cached_mtime_ns, _ = entry
+            if (
+                cached_mtime_ns != version
+                if version is not None
+                else not self._is_cache_valid(path, cached_mtime_ns)
+            ):
+                self._remove(path)
+                self._misses += 1
+                return None
+            if not trusted and path in self._unvalidated_paths:
+                # Kept: the caller's validated load replaces it
+                self._misses += 1
+                return None
 
-        if not isinstance(model, model_type):
-            self.invalidate(path)
-            raise ValueError(f"Model at {path} is not of type {model_type.__name__}")
-        return model
+            if not isinstance(model, model_type):
+                self._remove(path)
+                raise ValueError(
+                    f"Model at {path} is not of type {model_type.__name__}"
+                )
+            self.model_cache.move_to_end(path)
+            self._hits += 1
+            return model
 
     def get_model(
-        self, path: Path, model_type: Type[T], readonly: bool = False
+        self,
+        path: Path,
+        model_type: Type[T],
+        readonly: bool = False,
+        trusted: bool = False,
+    ) -> Optional[T]:
+        """
+        Args:
+            readonly: Return the cached instance, rather than a copy. Not safe to mutate.
+            trusted: Also return models cached by a trusted load, which skipped validation.
+        """
+        # We return a copy by default, so in-memory edits don't impact the cache until they are saved.
+        # Only the mutable structure is copied: immutable leaves are shared with the cached model.
+        model = self._get_model(path, model_type, trusted=trusted)
+        if model:
+            if readonly:
+                return model
+            else:
+                return structural_copy(model)
+        return None
+
+    def get_record(
+        self,
+        path: Path,
+        model_type: Type[T],
+        version: int,
+        readonly: bool = False,
+        trusted: bool = False,
     ) -> Optional[T]:
-        # We return a copy by default, so in-memory edits don't impact the cache until they are saved
-        # Benchmark shows about 2x slower, but much more foolproof
-        model = self._get_model(path, model_type)
+        """Like get_model, for a segment store record cached with set_record. Misses unless the cached version matches."""
+        model = self._get_model(path, model_type, trusted=trusted, version=version)
         if model:
             if readonly:
                 return model
             else:
-                return model.model_copy(deep=True)
+                return structural_copy(model)
         return None
 
     def get_model_id(self, path: Path, model_type: Type[T]) -> Optional[str]:
-        model = self._get_model(path, model_type)
+        # A trusted load reads the same ID, validated or not
+        model = self._get_model(path, model_type, trusted=True)
         if model and hasattr(model, "id"):
             id = model.id  # type: ignore
             if isinstance(id, str):
                 return id
         return None
 
-    def set_model(self, path: Path, model: BaseModel, mtime_ns: int):
+    def set_model(
+        self,
+        path: Path,
+        model: BaseModel,
+        mtime_ns: int,
+        size_bytes: int = 0,
+        validated: bool = True,
+    ):
+        """
+        Args:
+            validated: False for models built by a trusted load. They're only returned to trusted lookups, and kept out of the shared store.
+        """
         # disable caching if the filesystem doesn't support fine-grained timestamps
         if not self._enabled:
             return
-        self.model_cache[path] = (model, mtime_ns)
+        with self._lock:
+            self._remove(path)
+            self._insert(path, model, mtime_ns, size_bytes, validated=validated)
+            shared_store = self._shared_store
+        if shared_store is not None and validated:
+            shared_store.put(path, model, mtime_ns, size_bytes)
+
+    def set_record(
+        self,
+        path: Path,
+        model: BaseModel,
+        version: int,
+        size_bytes: int = 0,
+        validated: bool = True,
+    ):
+        """
+        Cache a model loaded from a segment store record, at the path it would have as a file. Kept in this process only.
+
+        Args:
+            version: Identifies the record in the store. Lookups with any other version miss.
+            validated: As for set_model.
+        """
+        if not self._enabled:
+            return
+        with self._lock:
+            self._remove(path)
+            self._insert(
+                path, model, version, size_bytes, validated=validated, record=True
+            )
+
+    def _insert(
+        self,
+        path: Path,
+        model: BaseModel,
+        mtime_ns: int,
+        size_bytes: int,
+        validated: bool = True,
+        record: bool = False,
+    ):
+        self.model_cache[path] = (model, mtime_ns, size_bytes)
+        self._estimated_bytes += size_bytes
+        if not validated:
+            self._unvalidated_paths.add(path)
+        if record:
+            self._record_paths.add(path)
+        elif self._watcher is not None:
+            self._watch(path, mtime_ns)
+        self._evict()
+
+    def _restore(
+        self,
+        path: Path,
+        snapshot: ModelCacheSnapshot | None,
+        shared_store: SharedModelStore | None,
+    ) -> Tuple[BaseModel, int, int] | None:
+        """Restore a model from the snapshot or the shared store, and cache it. Call without holding the lock."""
+        restored = snapshot.take(path) if snapshot is not None else None
+        from_snapshot = restored is not None
+        if restored is None and shared_store is not None:
+            restored = shared_store.get(path)
+        if restored is None:
+            return None
+
+        model, mtime_ns, size_bytes = restored
+        with self._lock:
+            # Another thread may have loaded or saved it meanwhile: keep theirs
+            current = self.model_cache.get(path)
+            if current is not None:
+                return current
+            self._insert(path, model, mtime_ns, size_bytes)
+            if from_snapshot:
+                self._snapshot_restores += 1
+            else:
+                self._shared_restores += 1
+            return self.model_cache.get(path)
 
     def invalidate(self, path: Path):
-        if path in self.model_cache:
-            del self.model_cache[path]
+        self.invalidate_many([path])
+
+    def invalidate_many(self, paths: list[Path]):
+        with self._lock:
+            for path in paths:
+                self._remove(path)
+            shared_store = self._shared_store
+        # Saved or deleted: other processes shouldn't keep checking the old entry
+        if shared_store is not None:
+            shared_store.remove_many(paths)
 
     def clear(self):
-        self.model_cache.clear()
+        with self._lock:
+            self.model_cache.clear()
+            self._estimated_bytes = 0
+            if self._watcher is not None:
+                for directory in self._watched_dirs:
+                    self._watcher.unwatch(directory)
+            self._trusted_paths.clear()
+            self._unvalidated_paths.clear()
+            self._record_paths.clear()
+            self._watched_dirs.clear()
+
+    def stats(self) -> ModelCacheStats:
+        return ModelCacheStats(
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            entries=len(self.model_cache),
+            estimated_bytes=self._estimated_bytes,
+            snapshot_restores=self._snapshot_restores,
+            shared_restores=self._shared_restores,
+        )
+
+    def _remove(self, path: Path):
+        if self._snapshot is not None:
+            self._snapshot.discard(path)
+        entry = self.model_cache.pop(path, None)
+        if entry is not None:
+            self._estimated_bytes -= entry[2]
+        self._unvalidated_paths.discard(path)
+        self._record_paths.discard(path)
+        self._unwatch(path)
+
+    def _watch(self, path: Path, mtime_ns: int):
+        assert self._watcher is not None
+        directory = path.parent
+        if directory not in self._watched_dirs:
+            if not self._watcher.watch(directory):
+                # Out of watches or similar: this path keeps using mtime checks
+                return
+            self._watched_dirs[directory] = set()
+        self._watched_dirs[directory].add(path)
+        # The file may have changed between being read and the watch starting. Check once, events cover it from here.
+        if self._is_cache_valid(path, mtime_ns):
+            self._trusted_paths.add(path)
+
+    def _unwatch(self, path: Path):
+        self._trusted_paths.discard(path)
+        directory = path.parent
+        paths = self._watched_dirs.get(directory)
+        if paths is None:
+            return
+        paths.discard(path)
+        if not paths:
+            del self._watched_dirs[directory]
+            if self._watcher is not None:
+                self._watcher.unwatch(directory)
+
+    def _on_file_change(self, path: Path | None):
+        # Called from the watcher thread
+        with self._lock:
+            if path is None:
+                # Events were lost: nothing can be trusted, fall back to mtime checks
+                self._trusted_paths.clear()
+            elif path in self._watched_dirs:
+                # The directory itself was deleted or moved
+                for child_path in list(self._watched_dirs.pop(path)):
+                    self._trusted_paths.discard(child_path)
+            elif path in self.model_cache:
+                self._remove(path)
+
+    def _evict(self):
+        # Evict least recently used entries until we're within budget
+        while self.model_cache and (
+            (self.max_entries is not None and len(self.model_cache) > self.max_entries)
+            or (self.max_bytes is not None and self._estimated_bytes > self.max_bytes)
+        ):
+            path, (_, _, size_bytes) = self.model_cache.popitem(last=False)
+            self._estimated_bytes -= size_bytes
+            self._unvalidated_paths.discard(path)
+            self._record_paths.discard(path)
+            self._unwatch(path)
+            self._evictions += 1
 
     def _check_timestamp_granularity(self) -> bool:
         """Check if filesystem supports fine-grained timestamps (microseconds or better)."""
@@ -0,0 +1,266 @@
+"""
+An on-disk snapshot of the model cache, so a restarted process starts warm.
+
+Opt in with the `model_cache_snapshot` setting (or KILN_MODEL_CACHE_SNAPSHOT env var). The snapshot is written when the process exits, and read back lazily: the index is read on the first cache miss, and each model is read from the file and unpickled the first time it's requested, if its file's mtime and size still match. Only the index is held in memory, and the file is closed once every entry has been restored or invalidated. Unpickling skips parsing and validation, so it's much faster than loading the file. Anything changed since is loaded from disk as usual.
+
+File layout: MAGIC, the length of the index (8 bytes), the pickled index, then one pickled model per entry.
+
+The snapshot is only used by the same version of the datamodel code, pydantic and Python which wrote it. Like settings.yaml it's trusted local state: pickle must never be loaded from an untrusted source.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import struct
+import sys
+import threading
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Set, Tuple
+
+import pydantic
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"KILNMC01"
+INDEX_LENGTH = struct.Struct("<Q")
+
+# path -> (mtime_ns, size_bytes, offset, length) of the pickled model, relative to the start of the models
+SnapshotIndex = Dict[str, Tuple[int, int, int, int]]
+
+_fingerprint: str | None = None
+_fingerprint_lock = threading.Lock()
+
+
+def code_fingerprint() -> str:
+    """Identifies the datamodel code, pydantic and Python versions, which all affect whether pickled models can be reused."""
+    global _fingerprint
+    with _fingerprint_lock:
+        if _fingerprint is None:
+            digest = hashlib.sha256()
+            digest.update(pydantic.VERSION.encode())
+            digest.update(sys.version.encode())
+            datamodel_folder = Path(__file__).parent
+            for source in sorted(datamodel_folder.glob("*.py")):
+                if source.name.startswith("test_"):
+                    continue
+                digest.update(source.name.encode())
+                digest.update(source.read_bytes())
+            _fingerprint = digest.hexdigest()
+        return _fingerprint
+
+
+def pickle_model(model: BaseModel) -> bytes | None:
+    """Pickle a cached model, without its parent. Returns None if the model can't be pickled."""
+    if model.__dict__.get("parent") is not None:
+        # Parents are loaded lazily from their own cache entries. Don't store a copy with each child.
+        model = model.model_copy()
+        model.__dict__["parent"] = None
+    try:
+        return pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        # eg. an unpicklable value in a dict field
+        return None
+
+
+def unpickle_model(blob: bytes, path: Path | str) -> BaseModel | None:
+    try:
+        model = pickle.loads(blob)
+    except Exception:
+        logger.warning("Couldn't restore cached model %s", path)
+        return None
+    if not isinstance(model, BaseModel):
+        return None
+    return model
+
+
+class ModelCacheSnapshot:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Read on first use
+        self._loaded = False
+        self._index: SnapshotIndex = {}
+        self._models_offset = 0
+        # Open while the index has entries. Models are read from it by offset, so the file must stay the one the index came from.
+        self._file: BinaryIO | None = None
+        # Discarded before the snapshot was read
+        self._discarded: Set[str] = set()
+
+    def take(self, path: Path) -> Tuple[BaseModel, int, int] | None:
+        """
+        Remove a model from the snapshot and return it, with its mtime and size, if its file is unchanged.
+
+        Returns None if the path isn't in the snapshot, or the file changed since the snapshot was written.
+        """
+        with self._lock:
+            self._load()
+            entry = self._index.pop(str(path), None)
+            if entry is None:
+                return None
+            mtime_ns, size_bytes, offset, length = entry
+            blob = self._read_blob(offset, length)
+            self._close_if_done()
+        if blob is None:
+            return None
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if stat.st_mtime_ns != mtime_ns or stat.st_size != size_bytes:
+            return None
+        model = unpickle_model(blob, path)
+        if model is None:
+            return None
+        return model, mtime_ns, size_bytes
+
+    def discard(self, path: Path) -> None:
+        """Drop a path from the snapshot, eg. because its file was saved."""
+        with self._lock:
+            if self._loaded:
+                self._index.pop(str(path), None)
+                self._close_if_done()
+            else:
+                self._discarded.add(str(path))
+
+    def remaining(self) -> Iterable[Tuple[str, Tuple[int, int], bytes]]:
+        """Entries not yet taken, as (path, (mtime_ns, size_bytes), pickled model). Used to carry them into the next snapshot."""
+        with self._lock:
+            self._load()
+            items = list(self._index.items())
+        for path, (mtime_ns, size_bytes, offset, length) in items:
+            with self._lock:
+                blob = self._read_blob(offset, length)
+            if blob is not None:
+                yield path, (mtime_ns, size_bytes), blob
+
+    def write(
+        self,
+        models: Iterable[Tuple[Path, BaseModel, int, int]],
+        max_entries: int | None = None,
+    ) -> int:
+        """
+        Write a new snapshot: the given cached models (path, model, mtime_ns, size_bytes), plus entries of the current snapshot which were never taken, if their files are unchanged.
+
+        Returns the number of entries written.
+        """
+        blobs: Dict[str, Tuple[int, int, bytes]] = {}
+        # Carried over entries first: they weren't used by this process, so are the least recently used
+        for path, (mtime_ns, size_bytes), blob in self.remaining():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if stat.st_mtime_ns == mtime_ns and stat.st_size == size_bytes:
+                blobs[path] = (mtime_ns, size_bytes, blob)
+        for path, model, mtime_ns, size_bytes in models:
+            blob = pickle_model(model)
+            if blob is None:
+                continue
+            blobs.pop(str(path), None)
+            blobs[str(path)] = (mtime_ns, size_bytes, blob)
+        if max_entries is not None:
+            # Keep the most recently used
+            blobs = dict(list(blobs.items())[-max_entries:])
+
+        index: SnapshotIndex = {}
+        offset = 0
+        for path, (mtime_ns, size_bytes, blob) in blobs.items():
+            index[path] = (mtime_ns, size_bytes, offset, len(blob))
+            offset += len(blob)
+        header = pickle.dumps(
+            {"fingerprint": code_fingerprint(), "index": index},
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(MAGIC)
+                file.write(INDEX_LENGTH.pack(len(header)))
+                file.write(header)
+                for _, _, blob in blobs.values():
+                    file.write(blob)
+            with self._lock:
+                # Re-read from the new snapshot if needed again. Also Windows can't replace an open file.
+                self._close()
+                self._loaded = False
+            os.replace(temp_path, self.path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return len(blobs)
+
+    def _load(self) -> None:
+        # Caller holds the lock
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        except OSError:
+            logger.warning("Couldn't read model cache snapshot %s", self.path)
+            return
+
+        try:
+            header = self._read_header(file)
+        except OSError:
+            logger.warning("Couldn't read model cache snapshot %s", self.path)
+            header = None
+        if header is None or header.get("fingerprint") != code_fingerprint():
+            # Invalid, or written by different code: the pickled models may not match the current classes
+            file.close()
+            return
+        self._index = header["index"]
+        for path in self._discarded:
+            self._index.pop(path, None)
+        self._discarded.clear()
+        self._models_offset = file.tell()
+        self._file = file
+        self._close_if_done()
+
+    def _read_header(self, file: BinaryIO) -> dict | None:
+        prefix = file.read(len(MAGIC) + INDEX_LENGTH.size)
+        if (
+            len(prefix) < len(MAGIC) + INDEX_LENGTH.size
+            or prefix[: len(MAGIC)] != MAGIC
+        ):
+            logger.warning("Ignoring invalid model cache snapshot %s", self.path)
+            return None
+        (header_length,) = INDEX_LENGTH.unpack_from(prefix, len(MAGIC))
+        try:
+            header = pickle.loads(file.read(header_length))
+        except Exception:
+            logger.warning("Ignoring invalid model cache snapshot %s", self.path)
+            return None
+        if not isinstance(header, dict):
+            return None
+        return header
+
+    def _read_blob(self, offset: int, length: int) -> bytes | None:
+        # Caller holds the lock
+        if self._file is None:
+            return None
+        try:
+            self._file.seek(self._models_offset + offset)
+            blob = self._file.read(length)
+        except OSError:
+            logger.warning("Couldn't read model cache snapshot %s", self.path)
+            return None
+        return blob if len(blob) == length else None
+
+    def _close_if_done(self) -> None:
+        # Caller holds the lock
+        if not self._index:
+            self._close()
+
+    def _close(self) -> None:
+        # Caller holds the lock
+        self._index = {}
+        if self._file is not None:
+            self._file.close()
+            self._file = None
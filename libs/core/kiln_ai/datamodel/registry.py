@@ -1,3 +1,7 @@
+import os
+import threading
+from typing import Dict, Sequence, Tuple
+
 from kiln_ai.datamodel import Project
 from kiln_ai.utils.config import Config
 
@@ -16,16 +20,83 @@ def all_projects() -> list[Project]:
     return projects
 
 
-def project_from_id(project_id: str) -> Project | None:
-    project_paths = Config.shared().projects
-    if project_paths is not None:
+def _mtime_ns(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+class ProjectRegistryIndex:
+    """
+    Project ID -> project file, so finding a project loads one file rather than every project.
+
+    An entry is used while its file's mtime is unchanged and it's still in the projects setting. Anything else (new, moved or edited projects, unknown IDs) rebuilds the index by loading every project, like a plain scan.
+
+    Task IDs don't need an index here: `Task.from_id_and_parent_path` finds tasks from their folder names (see ChildListingCache).
+    """
+
+    _shared_instance = None
+
+    def __init__(self):
+        # project ID -> (project path, mtime_ns when indexed)
+        self._paths: Dict[str, Tuple[str, int | None]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "ProjectRegistryIndex":
+        if cls._shared_instance is None:
+            cls._shared_instance = cls()
+        return cls._shared_instance
+
+    def project_from_id(
+        self, project_id: str, project_paths: Sequence[str]
+    ) -> Project | None:
+        entry = self._paths.get(project_id)
+        if entry is not None:
+            path, mtime_ns = entry
+            if (
+                mtime_ns is not None
+                and path in project_paths
+                and _mtime_ns(path) == mtime_ns
+            ):
+                try:
+                    project = Project.load_from_file(path)
+                    if project.id == project_id:
+                        return project
+                except Exception:
+                    pass
+        return self._rebuild(project_id, project_paths)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._paths = {}
+
+    def _rebuild(self, project_id: str, project_paths: Sequence[str]) -> Project | None:
+        paths: Dict[str, Tuple[str, int | None]] = {}
+        found = None
         for project_path in project_paths:
+            # Before loading: if the file changes during the load, the entry is stale rather than wrongly trusted
+            mtime_ns = _mtime_ns(project_path)
             try:
                 project = Project.load_from_file(project_path)
-                if project.id == project_id:
-                    return project
             except Exception:
                 # deleted files are possible continue with the rest
                 continue
+            if project.id is None:
+                continue
+            # First match wins, as in a plain scan
+            if project.id not in paths:
+                paths[project.id] = (project_path, mtime_ns)
+            if found is None and project.id == project_id:
+                found = project
+        with self._lock:
+            self._paths = paths
+        return found
 
-    return None
+
+def project_from_id(project_id: str) -> Project | None:
+    project_paths = Config.shared().projects
+    if project_paths is None:
+        return None
+    return ProjectRegistryIndex.shared().project_from_id(project_id, project_paths)
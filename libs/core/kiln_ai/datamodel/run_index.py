@@ -0,0 +1,410 @@
+"""
+An optional on-disk metadata index for the runs of a task.
+
+The `.kiln` files are always the source of truth. This index is a derived, disposable cache of the small set of fields list views and dataset filters need (tags, rating, repair/thinking flags, usage), so they can be answered without parsing every `task_run.kiln` file.
+
+ - Opt in with the `enable_task_run_index` setting (or KILN_ENABLE_TASK_RUN_INDEX env var).
+ - Stored in a SQLite file next to `task.kiln`. Safe to delete at any time, it will be rebuilt.
+ - Rebuilt incrementally: `refresh()` stats each run file and only re-parses files whose mtime/size changed.
+ - `entries`, `tag_counts` and `query` refresh first, but skip it when nothing can have changed since the last refresh in this process: the runs folder (runs added or removed), runs saved or deleted through Kiln in this process, and the index file (runs saved by other Kiln processes) are all unchanged. Edits to existing run files outside Kiln (eg. a git pull) don't change any of those, so a full refresh also runs if the last one is older than REFRESH_MAX_AGE_SECONDS.
+ - Kept current by `TaskRun.save_to_file` and `TaskRun.delete` when enabled.
+ - Dataset filters use `query` to skip loading runs which can't match (see `dataset_filters.iter_filtered_runs`).
+ - Every write bumps a generation stored in the index, which list endpoints use as the version of the task's runs (see `collection_version`).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Sequence, Set, Tuple
+
+from kiln_ai.datamodel.collection_version import collection_generation
+from kiln_ai.utils.config import Config
+
+if TYPE_CHECKING:
+    from kiln_ai.datamodel.task_run import TaskRun, Usage
+
+INDEX_FILENAME = ".task_run_index.sqlite"
+# Bump when the table layout changes. Old indexes are dropped and rebuilt.
+INDEX_SCHEMA_VERSION = 2
+# Boolean columns which `query` can filter on
+QUERY_FLAGS = ("repaired", "has_thinking", "high_quality")
+# Longest a read goes without a full refresh, when nothing else shows a change. Bounds how stale edits to run files made outside Kiln can be.
+REFRESH_MAX_AGE_SECONDS = 5.0
+
+_refresh_lock = threading.Lock()
+# Task path -> (change token, monotonic time) at the end of the last full refresh in this process
+_last_refresh: Dict[Path, Tuple[tuple, float]] = {}
+
+
+@dataclass
+class TaskRunIndexEntry:
+    """The indexed metadata for a single task run."""
+
+    id: str | None
+    path: Path
+    mtime_ns: int
+    size: int
+    created_at: datetime
+    tags: List[str]
+    rating_type: str | None
+    rating_value: float | None
+    repaired: bool
+    has_thinking: bool
+    high_quality: bool
+    usage: "Usage | None"
+
+
+def task_run_index_enabled() -> bool:
+    return Config.shared().enable_task_run_index is True
+
+
+class TaskRunIndex:
+    """
+    Metadata index for the runs of a single task, backed by SQLite.
+
+    Construct with the path to the task's `task.kiln` file.
+    """
+
+    def __init__(self, task_path: Path):
+        self.task_path = task_path
+        self.index_path = task_path.parent / INDEX_FILENAME
+
+    @classmethod
+    def for_task_path(cls, task_path: Path | None) -> "TaskRunIndex | None":
+        """Returns the index for a task, or None if indexing is disabled, the task isn't saved, or its runs are in a segment store (which has no run files to index)."""
+        if task_path is None or not task_run_index_enabled():
+            return None
+        # Inline import to avoid circular import
+        from kiln_ai.datamodel.task_run import TaskRun
+
+        if TaskRun.segment_store(task_path) is not None:
+            return None
+        return cls(task_path)
+
+    @classmethod
+    def for_runs_folder(cls, runs_folder: Path) -> "TaskRunIndex | None":
+        """Like `for_task_path`, given a task's runs folder. Returns None if the folder isn't a task's runs folder."""
+        # Inline import to avoid circular import
+        from kiln_ai.datamodel.task import Task
+        from kiln_ai.datamodel.task_run import TaskRun
+
+        task_path = runs_folder.parent / Task.base_filename()
+        if runs_folder.name != TaskRun.relationship_name() or not task_path.is_file():
+            return None
+        return cls.for_task_path(task_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        # WAL lets readers proceed while another process updates the index
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != INDEX_SCHEMA_VERSION:
+            with conn:
+                conn.execute("DROP TABLE IF EXISTS generation")
+                conn.execute("DROP TABLE IF EXISTS run_tags")
+                conn.execute("DROP TABLE IF EXISTS runs")
+                conn.execute(
+                    """
+                    CREATE TABLE runs (
+                        path TEXT PRIMARY KEY,
+                        id TEXT,
+                        mtime_ns INTEGER NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at TEXT NOT NULL,
+                        tags TEXT NOT NULL,
+                        rating_type TEXT,
+                        rating_value REAL,
+                        repaired INTEGER NOT NULL,
+                        has_thinking INTEGER NOT NULL,
+                        high_quality INTEGER NOT NULL,
+                        usage TEXT
+                    )
+                    """
+                )
+                conn.execute(
+                    "CREATE TABLE run_tags (tag TEXT NOT NULL, path TEXT NOT NULL, PRIMARY KEY (tag, path))"
+                )
+                conn.execute("CREATE INDEX run_tags_path ON run_tags (path)")
+                # Starts at the creation time, so a rebuilt index doesn't repeat an old index's generations
+                conn.execute("CREATE TABLE generation (value INTEGER NOT NULL)")
+                conn.execute("INSERT INTO generation VALUES (?)", (time.time_ns(),))
+                conn.execute(f"PRAGMA user_version={INDEX_SCHEMA_VERSION}")
+        return conn
+
+    def refresh(self) -> None:
+        """
+        Bring the index up to date with the run files on disk.
+
+        Only files which are new, or whose mtime or size changed since they were indexed, are parsed.
+        """
+        # Taken first, so a change during the refresh makes the next read refresh again. Unless this refresh wrote to the index: then it's taken again, so the next read doesn't refresh because of our own write.
+        change_token = self._change_token()
+        if self._refresh_files():
+            change_token = self._change_token()
+        with _refresh_lock:
+            _last_refresh[self.task_path] = (change_token, time.monotonic())
+
+    def refresh_if_changed(self) -> None:
+        """Refresh, unless nothing can have changed since the last refresh (see the module docstring)."""
+        with _refresh_lock:
+            last_refresh = _last_refresh.get(self.task_path)
+        if (
+            last_refresh is not None
+            and time.monotonic() - last_refresh[1] < REFRESH_MAX_AGE_SECONDS
+            and last_refresh[0] == self._change_token()
+        ):
+            return
+        self.refresh()
+
+    def _change_token(self) -> tuple:
+        """Stats which change when runs are added or removed, or saved through Kiln. A few stats, rather than one per run."""
+        # Inline import to avoid circular import
+        from kiln_ai.datamodel.task_run import TaskRun
+
+        runs_folder = TaskRun.relationship_folder(self.task_path)
+        token: list = [collection_generation(runs_folder)]
+        # The index's WAL changes whenever any process writes to the index
+        for path in [runs_folder, self.index_path, Path(f"{self.index_path}-wal")]:
+            try:
+                stat = path.stat()
+                token.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                token.append(None)
+        return tuple(token)
+
+    def _refresh_files(self) -> bool:
+        """Returns True if the index was updated."""
+        # Inline import to avoid circular import
+        from kiln_ai.datamodel.task_run import TaskRun
+
+        on_disk: Dict[str, os.stat_result] = {}
+        for child_path in TaskRun.iterate_children_paths_of_parent_path(self.task_path):
+            try:
+                on_disk[str(child_path)] = child_path.stat()
+            except FileNotFoundError:
+                # deleted mid-scan
+                continue
+
+        with closing(self._connect()) as conn:
+            indexed = {
+                row[0]: (row[1], row[2])
+                for row in conn.execute("SELECT path, mtime_ns, size FROM runs")
+            }
+            stale_paths = [path for path in indexed if path not in on_disk]
+            changed_paths = [
+                path
+                for path, stat in on_disk.items()
+                if indexed.get(path) != (stat.st_mtime_ns, stat.st_size)
+            ]
+            if not stale_paths and not changed_paths:
+                return False
+
+            with conn:
+                self._bump_generation(conn)
+                for path in stale_paths:
+                    self._delete_row(conn, path)
+                for path in changed_paths:
+                    try:
+                        run = TaskRun.load_from_file(Path(path), readonly=True)
+                    except FileNotFoundError:
+                        self._delete_row(conn, path)
+                        continue
+                    self._upsert_row(conn, run, on_disk[path])
+        return True
+
+    def update_run(self, run: "TaskRun") -> None:
+        """Index a run which was just saved to disk."""
+        self.update_runs([run])
+
+    def update_runs(self, runs: List["TaskRun"]) -> None:
+        """Index runs which were just saved to disk, in one transaction."""
+        stats = []
+        for run in runs:
+            if run.path is None:
+                continue
+            try:
+                stats.append((run, run.path.stat()))
+            except FileNotFoundError:
+                continue
+        if not stats:
+            return
+        with closing(self._connect()) as conn, conn:
+            self._bump_generation(conn)
+            for run, stat in stats:
+                self._upsert_row(conn, run, stat)
+
+    def remove_path(self, path: Path) -> None:
+        """Remove a run from the index (by the path of its .kiln file)."""
+        self.remove_paths([path])
+
+    def remove_paths(self, paths: List[Path]) -> None:
+        """Remove runs from the index in one transaction (by the paths of their .kiln files)."""
+        if not self.index_path.exists():
+            return
+        with closing(self._connect()) as conn, conn:
+            self._bump_generation(conn)
+            for path in paths:
+                self._delete_row(conn, str(path))
+
+    def generation(self, refresh: bool = True) -> int:
+        """A number which changes with every write to the index, by any process. Refreshes first unless refresh is False, so it also changes when run files change."""
+        if refresh:
+            self.refresh_if_changed()
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT value FROM generation").fetchone()[0]
+
+    def entries(self, refresh: bool = True) -> List[TaskRunIndexEntry]:
+        """All indexed runs. Refreshes from disk first if anything changed (see `refresh_if_changed`), unless refresh is False."""
+        if refresh:
+            self.refresh_if_changed()
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT path, id, mtime_ns, size, created_at, tags, rating_type, rating_value, repaired, has_thinking, high_quality, usage FROM runs"
+            ).fetchall()
+        return [self._entry_from_row(row) for row in rows]
+
+    def tag_counts(
+        self, prefix: str = "", flags: Sequence[str] = (), refresh: bool = True
+    ) -> Dict[str, int]:
+        """
+        The number of runs with each tag, from the tag table without loading any runs.
+
+        Optionally only tags starting with prefix, and only counting runs with a true value for each of the flags (any of QUERY_FLAGS).
+        """
+        for flag in flags:
+            if flag not in QUERY_FLAGS:
+                raise ValueError(f"Not an indexed flag: {flag}")
+        if refresh:
+            self.refresh_if_changed()
+        # substr, not LIKE: "_" in tags like fine_tune_data is a LIKE wildcard
+        where = " AND ".join(
+            ["substr(run_tags.tag, 1, ?) = ?"] + [f"runs.{flag}" for flag in flags]
+        )
+        with closing(self._connect()) as conn:
+            return {
+                tag: count
+                for tag, count in conn.execute(
+                    f"SELECT run_tags.tag, COUNT(*) FROM run_tags JOIN runs ON runs.path = run_tags.path WHERE {where} GROUP BY run_tags.tag",
+                    (len(prefix), prefix),
+                )
+            }
+
+    def query(
+        self, tags: List[str], flags: List[str], refresh: bool = True
+    ) -> List[TaskRunIndexEntry]:
+        """
+        Runs which have all of the tags, and a true value for each of the flags (any of QUERY_FLAGS), oldest first.
+
+        Tags are checked rarest first, so each later tag only narrows down the runs left.
+        """
+        for flag in flags:
+            if flag not in QUERY_FLAGS:
+                raise ValueError(f"Not an indexed flag: {flag}")
+        if refresh:
+            self.refresh_if_changed()
+        with closing(self._connect()) as conn:
+            tag_counts = {
+                tag: conn.execute(
+                    "SELECT COUNT(*) FROM run_tags WHERE tag = ?", (tag,)
+                ).fetchone()[0]
+                for tag in set(tags)
+            }
+            candidates: Set[str] | None = None
+            for tag in sorted(tag_counts, key=lambda tag: tag_counts[tag]):
+                paths = {
+                    row[0]
+                    for row in conn.execute(
+                        "SELECT path FROM run_tags WHERE tag = ?", (tag,)
+                    )
+                }
+                candidates = paths if candidates is None else candidates & paths
+                if not candidates:
+                    return []
+
+            where = " AND ".join(flags) if flags else "1"
+            rows = conn.execute(
+                f"SELECT path, id, mtime_ns, size, created_at, tags, rating_type, rating_value, repaired, has_thinking, high_quality, usage FROM runs WHERE {where} ORDER BY created_at"
+            ).fetchall()
+        return [
+            self._entry_from_row(row)
+            for row in rows
+            if candidates is None or row[0] in candidates
+        ]
+
+    def _upsert_row(
+        self, conn: sqlite3.Connection, run: "TaskRun", stat: os.stat_result
+    ) -> None:
+        # Inline import to avoid circular import
+        from kiln_ai.datamodel.dataset_filters import HighRatingDatasetFilter
+
+        path = str(run.path)
+        rating = run.output.rating if run.output else None
+        conn.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                run.id,
+                stat.st_mtime_ns,
+                stat.st_size,
+                run.created_at.isoformat(),
+                json.dumps(run.tags),
+                rating.type.value if rating else None,
+                rating.value if rating else None,
+                run.repaired_output is not None,
+                run.has_thinking_training_data(),
+                HighRatingDatasetFilter(run),
+                run.usage.model_dump_json() if run.usage else None,
+            ),
+        )
+        conn.execute("DELETE FROM run_tags WHERE path = ?", (path,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO run_tags VALUES (?, ?)",
+            [(tag, path) for tag in run.tags],
+        )
+
+    def _bump_generation(self, conn: sqlite3.Connection) -> None:
+        conn.execute("UPDATE generation SET value = value + 1")
+
+    def _delete_row(self, conn: sqlite3.Connection, path: str) -> None:
+        conn.execute("DELETE FROM runs WHERE path = ?", (path,))
+        conn.execute("DELETE FROM run_tags WHERE path = ?", (path,))
+
+    def _entry_from_row(self, row: tuple) -> TaskRunIndexEntry:
+        # Inline import to avoid circular import
+        from kiln_ai.datamodel.task_run import Usage
+
+        (
+            path,
+            id,
+            mtime_ns,
+            size,
+            created_at,
+            tags,
+            rating_type,
+            rating_value,
+            repaired,
+            has_thinking,
+            high_quality,
+            usage,
+        ) = row
+        return TaskRunIndexEntry(
+            id=id,
+            path=Path(path),
+            mtime_ns=mtime_ns,
+            size=size,
+            created_at=datetime.fromisoformat(created_at),
+            tags=json.loads(tags),
+            rating_type=rating_type,
+            rating_value=rating_value,
+            repaired=bool(repaired),
+            has_thinking=bool(has_thinking),
+            high_quality=bool(high_quality),
+            usage=Usage.model_validate_json(usage) if usage else None,
+        )
@@ -0,0 +1,778 @@
+"""
+Append-only segment store: an alternative to one folder per child, for high volume children like task runs and eval runs.
+
+By default each child is saved to its own `{relationship}/{id} - {name}/{type}.kiln` file. That's easy to browse and diff, but at millions of runs the inode count makes backups, scans and deletes very slow. A segment store keeps the children of one relationship in a few large files instead:
+
+    {relationship}/.segments/
+        000001.jsonl    One compact JSON record per line. Saving appends, deleting appends a tombstone line: {"tombstone": "<id>"}
+        000001.idx      Offset index for the segment, one line per record: "{put|del}\\t{id}\\t{offset}\\t{length}\\t{folder name}"
+
+ - Selected per relationship folder: if `.segments` exists, the relationship is stored in segments. Use `migrate_to_segment_store` and `migrate_to_files` to switch (or `python -m kiln_ai.datamodel.segment_store`).
+ - It's transparent to callers: children get the same `path` they would have as files (so parent lookups work), and `all_children_of_parent_path`, `save_to_file`, `delete`, `load_from_file` and `from_id_and_parent_path` read and write the store.
+ - Segments roll over at SEGMENT_MAX_BYTES. Once overwritten and deleted records outweigh live ones, a background thread compacts all segments into one. Records are copied without holding the store's lock, so saves and loads carry on during compaction.
+ - Loaded children are kept in the model cache, at the path they'd have as files, with a version from their record's location. Records never change in place, so a cached model is current while its record is the latest for its ID.
+ - Crash safe: an index which doesn't match its segment (eg. torn write) is rebuilt from the segment, dropping any partial last line.
+ - Multiple processes can share a store. Appends hold a file lock (`.segments/append.lock`) and take their offsets from the segment file, not from memory. Each process applies index lines written by others before it appends, before listing, and when a lookup misses.
+ - The task run metadata index (run_index) doesn't cover runs in a segment store.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+from kiln_ai.datamodel.child_listing_cache import id_from_dirname
+from kiln_ai.datamodel.model_cache import ModelCache
+from kiln_ai.datamodel.serialization import model_serializer
+from kiln_ai.datamodel.trusted_load import construct_trusted
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+if TYPE_CHECKING:
+    from kiln_ai.datamodel.basemodel import KilnParentedModel
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_FOLDER = ".segments"
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+# Don't bother compacting until there's at least this much to reclaim
+COMPACT_MIN_DEAD_BYTES = 4 * 1024 * 1024
+# Lock files in the segment folder, shared by every process using the store
+APPEND_LOCK_FILENAME = "append.lock"
+COMPACT_LOCK_FILENAME = "compact.lock"
+
+PUT = "put"
+DELETE = "del"
+
+# Store generations are unique within the process (across stores too), so a record's cache version is never reused
+_generations = itertools.count(1)
+
+
+@dataclass
+class _Location:
+    segment: int
+    offset: int
+    length: int
+    dirname: str
+
+
+@dataclass
+class _Applied:
+    """How much of a segment's index this process has applied to its in-memory index."""
+
+    # Changes if the index file is rebuilt
+    index_inode: int
+    index_bytes: int
+    data_bytes: int
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on a file, across processes. Blocks until it's available. Not reentrant."""
+    with open(path, "a+b") as file:
+        if sys.platform == "win32":
+            file.seek(0)
+            while True:
+                try:
+                    # Locks the first byte. Gives up with an OSError after retrying for ~10s.
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class SegmentStore:
+    """The segment store for the children in one relationship folder."""
+
+    _stores: Dict[Path, "SegmentStore"] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, relationship_folder: Path, folder_name: str = SEGMENT_FOLDER):
+        self.relationship_folder = relationship_folder
+        self.folder = relationship_folder / folder_name
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        # id -> location of the latest record. Dict order is the order children were added.
+        self._locations: Dict[str, _Location] = {}
+        self._segments: List[int] = []
+        self._applied: Dict[int, _Applied] = {}
+        self._live_bytes = 0
+        self._dead_bytes = 0
+        # Changed by compaction and resets, so readers holding open segments know to reopen them, and cached records from before miss
+        self._generation = next(_generations)
+        self._compactor: threading.Thread | None = None
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._refresh()
+
+    @classmethod
+    def for_relationship_folder(
+        cls, relationship_folder: Path
+    ) -> "SegmentStore | None":
+        """The store for a relationship folder, or None if its children are saved as files."""
+        if not (relationship_folder / SEGMENT_FOLDER).is_dir():
+            with cls._stores_lock:
+                cls._stores.pop(relationship_folder, None)
+            return None
+        with cls._stores_lock:
+            store = cls._stores.get(relationship_folder)
+            if store is None:
+                store = cls(relationship_folder)
+                cls._stores[relationship_folder] = store
+            return store
+
+    @classmethod
+    def for_child_path(cls, child_path: Path) -> "SegmentStore | None":
+        # {relationship}/{id} - {name}/{type}.kiln
+        return cls.for_relationship_folder(child_path.parent.parent)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._locations)
+
+    def __contains__(self, id: str) -> bool:
+        with self._lock:
+            return id in self._locations
+
+    def child_paths(self, model_class: Type["KilnParentedModel"]) -> List[Path]:
+        """The path each child would have as a file. Used as the child's `path`."""
+        self._refresh()
+        with self._lock:
+            dirnames = [location.dirname for location in self._locations.values()]
+        base_filename = model_class.base_filename()
+        return [
+            self.relationship_folder / dirname / base_filename for dirname in dirnames
+        ]
+
+    def put_many(self, models: Sequence["KilnParentedModel"]) -> None:
+        """Append models to the store, replacing any earlier records with the same IDs. Sets each model's path."""
+        records = []
+        for model in models:
+            if model.id is None:
+                raise ValueError("ID is not set - can not save to segment store")
+            dirname = str(model.build_child_dirname())
+            data = model_serializer().dumps(model, exclude={"path"}, compact=True)
+            records.append((PUT, model.id, dirname, (data + "\n").encode("utf-8")))
+            model.path = self.relationship_folder / dirname / model.base_filename()
+        with self._locked():
+            self._append(records)
+
+    def delete(self, id: str) -> bool:
+        """Append a tombstone for a record. Returns False if there was no record with this ID."""
+        return id in self.delete_many([id])
+
+    def delete_many(self, ids: Sequence[str]) -> Dict[str, str]:
+        """Append tombstones for records, in one write. Returns the folder name of each deleted record by ID. IDs without a record are skipped."""
+        with self._locked():
+            deleted: Dict[str, str] = {}
+            records = []
+            for id in ids:
+                location = self._locations.get(id)
+                if location is None or id in deleted:
+                    continue
+                deleted[id] = location.dirname
+                line = json.dumps({"tombstone": id}, separators=(",", ":")) + "\n"
+                records.append((DELETE, id, "", line.encode("utf-8")))
+            self._append(records)
+            return deleted
+
+    def load(
+        self,
+        model_class: Type["KilnParentedModel"],
+        id: str,
+        readonly: bool = False,
+        trusted: bool = False,
+    ) -> "KilnParentedModel | None":
+        """
+        Load a child by ID, or None if there's no record for it.
+
+        Args:
+            readonly: If True, may return the cached instance (not safe to mutate)
+            trusted: If True, skip validation where it's safe. See trusted_load.
+        """
+        cached = self._load_cached(model_class, id, readonly, trusted)
+        if cached is not None:
+            return cached
+
+        found = self._read_latest(id)
+        if found is None:
+            # Saved by another process, or moved by its compaction, since we last looked
+            self._refresh()
+            found = self._read_latest(id)
+            if found is None:
+                return None
+        raw, location, version = found
+        return self._to_model(model_class, raw, location, version, trusted)
+
+    def load_path(
+        self,
+        model_class: Type["KilnParentedModel"],
+        path: Path,
+        readonly: bool = False,
+        trusted: bool = False,
+    ) -> "KilnParentedModel":
+        """Load a child by the path it would have as a file."""
+        model = self.load(
+            model_class,
+            id_from_dirname(path.parent.name),
+            readonly=readonly,
+            trusted=trusted,
+        )
+        if model is None:
+            raise FileNotFoundError(f"No record in segment store for {path}")
+        return model
+
+    def iter_models(
+        self,
+        model_class: Type["KilnParentedModel"],
+        readonly: bool = False,
+        trusted: bool = False,
+    ) -> Iterator["KilnParentedModel"]:
+        """Load children one at a time, in the order they were added. Cached children are served from the model cache, see `load` for the arguments."""
+        self._refresh()
+        with self._lock:
+            ids = list(self._locations.keys())
+        files: Dict[int, BinaryIO] = {}
+        generation = self._generation
+        try:
+            for id in ids:
+                cached = self._load_cached(model_class, id, readonly, trusted)
+                if cached is not None:
+                    yield cached
+                    continue
+
+                for attempt in range(2):
+                    with self._lock:
+                        location = self._locations.get(id)
+                        if location is None:
+                            # deleted mid-iteration
+                            break
+                        if generation != self._generation:
+                            # compacted mid-iteration: old segments are gone
+                            for file in files.values():
+                                file.close()
+                            files = {}
+                            generation = self._generation
+                        try:
+                            file = files.get(location.segment)
+                            if file is None:
+                                file = open(self._data_path(location.segment), "rb")
+                                files[location.segment] = file
+                            raw = self._read(file, location)
+                            version = self._version(location)
+                        except FileNotFoundError:
+                            if attempt > 0:
+                                raise
+                            raw = None
+                    if raw is not None:
+                        yield self._to_model(
+                            model_class, raw, location, version, trusted
+                        )
+                        break
+                    # Compacted by another process: catch up, then read it from its new segment
+                    self._refresh()
+        finally:
+            for file in files.values():
+                file.close()
+
+    def compact(self) -> None:
+        """
+        Rewrite all live records into a single new segment, dropping overwritten records and tombstones.
+
+        The store is only locked to take a snapshot of the index, and to swap in the new segment. Records saved while the snapshot is copied go to a segment after the new one, so they override the copies.
+        """
+        with self._compact_lock, _file_lock(self.folder / COMPACT_LOCK_FILENAME):
+            with self._locked():
+                if not self._segments:
+                    return
+                old_segments = list(self._segments)
+                snapshot = dict(self._locations)
+                new_segment = old_segments[-1] + 1
+                saves_segment = new_segment + 1
+                self._data_path(saves_segment).touch()
+                self._index_path(saves_segment).touch()
+
+            # Old segments are sealed (saves go to saves_segment), and other compactions wait on the compact lock, so they're safe to read unlocked
+            new_locations = self._write_compacted(snapshot, new_segment)
+
+            with self._locked():
+                data_path = self._data_path(new_segment)
+                index_path = self._index_path(new_segment)
+                # Once the new segment is in place it overrides the old ones, so a crash from here on loses nothing
+                os.replace(_temp_path(data_path), data_path)
+                os.replace(_temp_path(index_path), index_path)
+                # Oldest first: if interrupted, remaining old segments still have any tombstones for their records
+                for segment in old_segments:
+                    self._index_path(segment).unlink(missing_ok=True)
+                    self._data_path(segment).unlink(missing_ok=True)
+                    del self._applied[segment]
+                stat = index_path.stat()
+                self._applied[new_segment] = _Applied(
+                    stat.st_ino,
+                    stat.st_size,
+                    sum(location.length for location in new_locations.values()),
+                )
+                segments = [new_segment] + self._segments[len(old_segments) :]
+                if segments == [new_segment, saves_segment] and (
+                    self._applied[saves_segment].data_bytes == 0
+                ):
+                    # Nothing saved during compaction: keep appending to the new segment
+                    self._index_path(saves_segment).unlink()
+                    self._data_path(saves_segment).unlink()
+                    del self._applied[saves_segment]
+                    segments = [new_segment]
+                self._segments = segments
+
+                # Records saved or deleted during the copy stay where they are
+                for id, location in self._locations.items():
+                    if location.segment < new_segment:
+                        self._locations[id] = new_locations[id]
+                self._live_bytes = sum(
+                    location.length for location in self._locations.values()
+                )
+                self._dead_bytes = (
+                    sum(self._applied[segment].data_bytes for segment in segments)
+                    - self._live_bytes
+                )
+                self._generation = next(_generations)
+
+    def _write_compacted(
+        self, snapshot: Dict[str, _Location], new_segment: int
+    ) -> Dict[str, _Location]:
+        """Copy records to temporary files for a new segment. Returns their locations in it."""
+        new_locations: Dict[str, _Location] = {}
+        offset = 0
+        files: Dict[int, BinaryIO] = {}
+        try:
+            with (
+                open(_temp_path(self._data_path(new_segment)), "wb") as data_file,
+                open(_temp_path(self._index_path(new_segment)), "wb") as index_file,
+            ):
+                for id, location in snapshot.items():
+                    file = files.get(location.segment)
+                    if file is None:
+                        file = open(self._data_path(location.segment), "rb")
+                        files[location.segment] = file
+                    raw = self._read(file, location)
+                    data_file.write(raw)
+                    index_file.write(
+                        _index_line(PUT, id, offset, len(raw), location.dirname)
+                    )
+                    new_locations[id] = _Location(
+                        new_segment, offset, len(raw), location.dirname
+                    )
+                    offset += len(raw)
+        finally:
+            for file in files.values():
+                file.close()
+        return new_locations
+
+    def needs_compaction(self) -> bool:
+        with self._lock:
+            return (
+                self._dead_bytes >= COMPACT_MIN_DEAD_BYTES
+                and self._dead_bytes > self._live_bytes
+            )
+
+    def wait_for_compaction(self) -> None:
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def _data_path(self, segment: int) -> Path:
+        return self.folder / f"{segment:06d}.jsonl"
+
+    def _index_path(self, segment: int) -> Path:
+        return self.folder / f"{segment:06d}.idx"
+
+    def _read(self, file: BinaryIO, location: _Location) -> bytes:
+        file.seek(location.offset)
+        return file.read(location.length)
+
+    def _read_latest(self, id: str) -> Tuple[bytes, _Location, int] | None:
+        """The latest record for an ID, its location and its cache version."""
+        with self._lock:
+            location = self._locations.get(id)
+            if location is None:
+                return None
+            try:
+                with open(self._data_path(location.segment), "rb") as file:
+                    return self._read(file, location), location, self._version(location)
+            except FileNotFoundError:
+                # Compacted by another process
+                return None
+
+    def _load_cached(
+        self,
+        model_class: Type["KilnParentedModel"],
+        id: str,
+        readonly: bool,
+        trusted: bool,
+    ) -> "KilnParentedModel | None":
+        """The child from the model cache, if its latest record is cached."""
+        with self._lock:
+            location = self._locations.get(id)
+            if location is None:
+                return None
+            version = self._version(location)
+        return ModelCache.shared().get_record(
+            self._child_path(model_class, location),
+            model_class,
+            version,
+            readonly=readonly,
+            trusted=trusted,
+        )
+
+    def _version(self, location: _Location) -> int:
+        """Identifies a record for the model cache. Call holding the lock, with a location from the current generation."""
+        # A segment's bytes never change within a generation: appends add records after the existing ones
+        return (self._generation << 96) | (location.segment << 64) | location.offset
+
+    def _child_path(
+        self, model_class: Type["KilnParentedModel"], location: _Location
+    ) -> Path:
+        return self.relationship_folder / location.dirname / model_class.base_filename()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the store's lock, across threads and processes, with other processes' changes applied. Not reentrant."""
+        with self._lock, _file_lock(self.folder / APPEND_LOCK_FILENAME):
+            self._catch_up()
+            yield
+
+    def _refresh(self) -> None:
+        """Apply records saved or deleted by other processes."""
+        with self._locked():
+            pass
+
+    def _to_model(
+        self,
+        model_class: Type["KilnParentedModel"],
+        raw: bytes,
+        location: _Location,
+        version: int,
+        trusted: bool = False,
+    ) -> "KilnParentedModel":
+        """Build and cache the model for a record."""
+        path = self._child_path(model_class, location)
+        parsed_json = model_serializer().loads(raw)
+        model = construct_trusted(model_class, parsed_json, path) if trusted else None
+        validated = model is None
+        if model is None:
+            model = model_class.validate_loaded_data(parsed_json, path)
+        ModelCache.shared().set_record(
+            path, model, version, len(raw), validated=validated
+        )
+        return model
+
+    def _append(self, records: List[Tuple[str, str, str, bytes]]) -> None:
+        """Append records to the last segment. Call from within `_locked`."""
+        if not records:
+            return
+        if not self._segments or (
+            self._applied[self._segments[-1]].data_bytes >= SEGMENT_MAX_BYTES
+        ):
+            self._segments.append(self._segments[-1] + 1 if self._segments else 1)
+        segment = self._segments[-1]
+        data = b"".join(line for _, _, _, line in records)
+
+        # Data first: an index pointing past the end of its segment is detected and rebuilt on load
+        with open(self._data_path(segment), "ab") as file:
+            file.write(data)
+            file.flush()
+            # The file lock keeps other processes out, but they may have appended since this process last wrote, so the offset comes from the file
+            offset = os.fstat(file.fileno()).st_size - len(data)
+        entries = []
+        index_lines = []
+        for op, id, dirname, line in records:
+            entries.append((op, id, _Location(segment, offset, len(line), dirname)))
+            index_lines.append(_index_line(op, id, offset, len(line), dirname))
+            offset += len(line)
+        with open(self._index_path(segment), "ab") as file:
+            file.write(b"".join(index_lines))
+            file.flush()
+            stat = os.fstat(file.fileno())
+        self._applied[segment] = _Applied(stat.st_ino, stat.st_size, offset)
+        for op, id, location in entries:
+            self._apply(op, id, location)
+
+        if self.needs_compaction() and self._compactor is None:
+            self._compactor = threading.Thread(
+                target=self._compact_in_background,
+                name="kiln_segment_compactor",
+                daemon=True,
+            )
+            self._compactor.start()
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        except Exception:
+            logger.exception("Failed to compact segment store %s", self.folder)
+        finally:
+            with self._lock:
+                self._compactor = None
+
+    def _apply(self, op: str, id: str, location: _Location) -> None:
+        previous = self._locations.get(id)
+        if previous is not None:
+            self._live_bytes -= previous.length
+            self._dead_bytes += previous.length
+        if op == PUT:
+            self._locations[id] = location
+            self._live_bytes += location.length
+        else:
+            self._locations.pop(id, None)
+            # The tombstone itself is reclaimable
+            self._dead_bytes += location.length
+
+    def _reset(self) -> None:
+        self._locations = {}
+        self._segments = []
+        self._applied = {}
+        self._live_bytes = 0
+        self._dead_bytes = 0
+        self._generation = next(_generations)
+
+    def _catch_up(self) -> None:
+        """Apply index lines written since this process last read them (by any process). Call holding both locks."""
+        segments = sorted(
+            int(path.stem)
+            for path in self.folder.glob("*.jsonl")
+            if path.stem.isdigit()
+        )
+        if any(segment not in segments for segment in self._segments):
+            # Compacted by another process
+            self._reset()
+        # Only the last segment is appended to: earlier ones we've read are complete
+        sealed = set(self._segments[:-1])
+        for segment in segments:
+            if segment in sealed:
+                continue
+            applied = self._applied.get(segment)
+            read = self._read_index(segment, applied)
+            if read is None:
+                if applied is not None:
+                    # Index rebuilt, or a torn write since we last read it: start over
+                    self._reset()
+                    self._catch_up()
+                    return
+                read = self._rebuild_index(segment)
+            entries, self._applied[segment] = read
+            for op, id, location in entries:
+                self._apply(op, id, location)
+        self._segments = segments
+
+    def _read_index(
+        self, segment: int, applied: _Applied | None
+    ) -> Tuple[List[Tuple[str, str, _Location]], _Applied] | None:
+        """Read a segment's index, from where this process last stopped. None if it doesn't match the segment."""
+        entries: List[Tuple[str, str, _Location]] = []
+        index_bytes = applied.index_bytes if applied is not None else 0
+        data_bytes = applied.data_bytes if applied is not None else 0
+        try:
+            with open(self._index_path(segment), "rb") as file:
+                index_inode = os.fstat(file.fileno()).st_ino
+                if applied is not None and index_inode != applied.index_inode:
+                    return None
+                file.seek(index_bytes)
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    op, id, offset, length, dirname = (
+                        line[:-1].decode("utf-8").split("\t", 4)
+                    )
+                    location = _Location(segment, int(offset), int(length), dirname)
+                    entries.append((op, id, location))
+                    index_bytes += len(line)
+                    data_bytes = location.offset + location.length
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if data_bytes != self._data_path(segment).stat().st_size:
+            return None
+        return entries, _Applied(index_inode, index_bytes, data_bytes)
+
+    def _rebuild_index(
+        self, segment: int
+    ) -> Tuple[List[Tuple[str, str, _Location]], _Applied]:
+        """Rebuild a segment's index from its records, truncating a partially written last record."""
+        logger.warning("Rebuilding segment index %s", self._index_path(segment))
+        entries: List[Tuple[str, str, _Location]] = []
+        data_path = self._data_path(segment)
+        offset = 0
+        with open(data_path, "rb") as file:
+            for line in file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("partial record")
+                    record = model_serializer().loads(line)
+                except ValueError:
+                    break
+                if "tombstone" in record:
+                    op, id, dirname = DELETE, record["tombstone"], ""
+                else:
+                    op, id = PUT, record["id"]
+                    dirname = _default_dirname(record)
+                entries.append((op, id, _Location(segment, offset, len(line), dirname)))
+                offset += len(line)
+        if offset != data_path.stat().st_size:
+            os.truncate(data_path, offset)
+
+        index_path = self._index_path(segment)
+        temp_path = _temp_path(index_path)
+        with open(temp_path, "wb") as file:
+            for op, id, location in entries:
+                file.write(
+                    _index_line(
+                        op, id, location.offset, location.length, location.dirname
+                    )
+                )
+        os.replace(temp_path, index_path)
+        stat = index_path.stat()
+        return entries, _Applied(stat.st_ino, stat.st_size, offset)
+
+
+def _index_line(op: str, id: str, offset: int, length: int, dirname: str) -> bytes:
+    return f"{op}\t{id}\t{offset}\t{length}\t{dirname}\n".encode("utf-8")
+
+
+def _temp_path(path: Path) -> Path:
+    return path.with_name(path.name + ".tmp")
+
+
+def _default_dirname(record: dict) -> str:
+    # Matches KilnParentedModel.build_child_dirname
+    name = record.get("name")
+    if name is not None:
+        return f"{record['id']} - {name[:32]}"
+    return record["id"]
+
+
+def migrate_to_segment_store(
+    parent_path: Path, child_class: Type["KilnParentedModel"]
+) -> int:
+    """
+    Move the children of a parent from their own folders into a segment store. Returns the number of children moved.
+
+    The store is built in a temporary folder and switched in with a rename, so readers see either all files or the full store. Safe to re-run if interrupted.
+    """
+    relationship_folder = child_class.relationship_folder(parent_path)
+    base_filename = child_class.base_filename()
+    # Children still saved as files. Listed directly, as once the store exists children are read from it.
+    child_paths: List[Path] = []
+    if relationship_folder.is_dir():
+        with os.scandir(relationship_folder) as entries:
+            for entry in entries:
+                if not entry.is_dir() or entry.name.startswith("."):
+                    continue
+                child_path = Path(entry.path) / base_filename
+                if child_path.is_file():
+                    child_paths.append(child_path)
+    models = [child_class.load_from_file(path) for path in child_paths]
+
+    store = SegmentStore.for_relationship_folder(relationship_folder)
+    if store is not None:
+        # Finishing an interrupted migration: the store is already live
+        store.put_many(models)
+    else:
+        temp_name = f"{SEGMENT_FOLDER}.{uuid.uuid4().hex}.tmp"
+        SegmentStore(relationship_folder, folder_name=temp_name).put_many(models)
+        os.rename(relationship_folder / temp_name, relationship_folder / SEGMENT_FOLDER)
+
+    for path in child_paths:
+        shutil.rmtree(path.parent)
+    ModelCache.shared().invalidate_many(child_paths)
+    return len(models)
+
+
+def migrate_to_files(parent_path: Path, child_class: Type["KilnParentedModel"]) -> int:
+    """
+    Move the children of a parent from a segment store back to their own folders. Returns the number of children moved.
+
+    The store stays authoritative until every file is written, then is removed. Safe to re-run if interrupted.
+    """
+    relationship_folder = child_class.relationship_folder(parent_path)
+    store = SegmentStore.for_relationship_folder(relationship_folder)
+    if store is None:
+        return 0
+
+    count = 0
+    for model in store.iter_models(child_class):
+        # Written directly: save_to_file would write back to the store
+        path, json_data = model.prepare_save()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(json_data)
+        count += 1
+
+    store.wait_for_compaction()
+    # Switch to files with a rename, then clean up
+    retired = relationship_folder / f"{SEGMENT_FOLDER}.{uuid.uuid4().hex}.old"
+    os.rename(store.folder, retired)
+    with SegmentStore._stores_lock:
+        SegmentStore._stores.pop(relationship_folder, None)
+    shutil.rmtree(retired)
+    return count
+
+
+def main() -> None:
+    # Inline import to avoid circular import
+    from kiln_ai.datamodel.eval import EvalRun
+    from kiln_ai.datamodel.task_run import TaskRun
+
+    child_classes: Dict[str, Type["KilnParentedModel"]] = {
+        TaskRun.type_name(): TaskRun,
+        EvalRun.type_name(): EvalRun,
+    }
+    parser = argparse.ArgumentParser(
+        description="Move high volume children between folders and a segment store"
+    )
+    parser.add_argument("direction", choices=["to-segments", "to-files"])
+    parser.add_argument(
+        "parent_path", type=Path, help="path to the parent .kiln file (eg. task.kiln)"
+    )
+    parser.add_argument("child_type", choices=sorted(child_classes.keys()))
+    args = parser.parse_args()
+
+    child_class = child_classes[args.child_type]
+    if args.direction == "to-segments":
+        count = migrate_to_segment_store(args.parent_path, child_class)
+    else:
+        count = migrate_to_files(args.parent_path, child_class)
+    print(f"Moved {count} {args.child_type} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Serialization of models to and from .kiln files.
+
+The serializer is pluggable (`set_model_serializer`). By default orjson is used if it's installed, falling back to the standard library. Both produce byte-identical files:
+ - Pretty (2 space indent) by default, which keeps files readable and git diffs small.
+ - Compact if the `compact_model_files` setting is enabled, for smaller files and faster saves when the project isn't edited by hand.
+"""
+
+import json
+from typing import AbstractSet, Any
+
+from pydantic import BaseModel
+
+from kiln_ai.utils.config import Config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+
+class ModelSerializer:
+    """Standard library serializer. Subclass and pass to `set_model_serializer` to plug in another."""
+
+    name = "json"
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def dumps(
+        self, model: BaseModel, exclude: AbstractSet[str], compact: bool = False
+    ) -> str:
+        return model.model_dump_json(indent=None if compact else 2, exclude=exclude)
+
+
+class OrjsonModelSerializer(ModelSerializer):
+    """
+    Serializer using orjson, which parses JSON several times faster than the standard library.
+
+    Models are dumped to JSON compatible Python objects by pydantic, then encoded by orjson, which matches pydantic's own JSON output byte for byte.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError(
+                "orjson is not installed. Install it, or use ModelSerializer."
+            )
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+    def dumps(
+        self, model: BaseModel, exclude: AbstractSet[str], compact: bool = False
+    ) -> str:
+        try:
+            return orjson.dumps(
+                model.model_dump(mode="json", exclude=exclude),
+                option=0 if compact else orjson.OPT_INDENT_2,
+            ).decode("utf-8")
+        except TypeError:
+            # Values orjson can't encode (eg. integers over 64 bits)
+            return super().dumps(model, exclude, compact)
+
+
+_model_serializer: ModelSerializer = (
+    OrjsonModelSerializer() if orjson is not None else ModelSerializer()
+)
+
+
+def model_serializer() -> ModelSerializer:
+    return _model_serializer
+
+
+def set_model_serializer(serializer: ModelSerializer) -> None:
+    global _model_serializer
+    _model_serializer = serializer
+
+
+def compact_model_files() -> bool:
+    return Config.shared().compact_model_files is True
@@ -0,0 +1,210 @@
+"""
+A model cache tier shared by every process on a host, for running the API with several workers.
+
+Each process still has its own in-memory `ModelCache`. On a miss, it checks this store before loading the file: a model another worker already loaded is unpickled, skipping parsing and validation. Models loaded from files are added to the store for the other workers.
+
+ - Opt in with the `shared_model_cache` setting (or KILN_SHARED_MODEL_CACHE env var).
+ - Stored in a SQLite file in the settings folder, in WAL mode so readers never block each other. Safe to delete at any time.
+ - Keyed by path, mtime and size: an entry is only used if its file is unchanged, so a stale entry can never be served.
+ - `save_to_file` and `delete` remove their file's entry, so other workers don't keep paying to check it. In-memory caches in other workers already check mtimes (or watch files with inotify), so they see the change too.
+ - Only used by the same version of the datamodel code, pydantic and Python which wrote it. Like the cache snapshot, it's trusted local state: pickle must never be loaded from an untrusted source.
+
+Writes are pickled and batched by a background thread, so loading never waits on pickling or SQLite.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Set, Tuple
+
+from pydantic import BaseModel
+
+from kiln_ai.datamodel.model_cache_snapshot import (
+    code_fingerprint,
+    pickle_model,
+    unpickle_model,
+)
+
+logger = logging.getLogger(__name__)
+
+STORE_FILENAME = "model_cache.sqlite"
+# Bump when the table layout changes. Old stores are dropped and rebuilt.
+STORE_SCHEMA_VERSION = 1
+# Most models written in one transaction
+MAX_WRITE_BATCH = 500
+
+
+class SharedModelStore:
+    def __init__(self, path: Path, max_pending: int = 10_000):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        # Opened per process: connections must not be shared across a fork
+        self._conn_pid: int | None = None
+        # Models waiting for the writer thread to pickle and write them, by path. Removing a path drops its pending write.
+        self._pending: Dict[str, Tuple[int, int, BaseModel]] = {}
+        self._max_pending = max_pending
+        # The batch the writer is pickling, and any of its paths removed meanwhile
+        self._writing: Set[str] = set()
+        self._removed_while_writing: Set[str] = set()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._writer: threading.Thread | None = None
+        self._writer_pid: int | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Caller holds the lock
+        if self._conn is not None and self._conn_pid == os.getpid():
+            return self._conn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != STORE_SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS models")
+                conn.execute("DROP TABLE IF EXISTS meta")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS models (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    data BLOB NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            conn.execute(f"PRAGMA user_version={STORE_SCHEMA_VERSION}")
+            row = conn.execute(
+                "SELECT value FROM meta WHERE key = 'fingerprint'"
+            ).fetchone()
+            if row is None or row[0] != code_fingerprint():
+                # Written by different code: the pickled models may not match the current classes
+                conn.execute("DELETE FROM models")
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)",
+                    (code_fingerprint(),),
+                )
+        self._conn = conn
+        self._conn_pid = os.getpid()
+        return conn
+
+    def get(self, path: Path) -> Tuple[BaseModel, int, int] | None:
+        """
+        Return a model with its mtime and size, if it's in the store and its file is unchanged.
+        """
+        try:
+            with self._lock:
+                row = (
+                    self._connect()
+                    .execute(
+                        "SELECT mtime_ns, size_bytes, data FROM models WHERE path = ?",
+                        (str(path),),
+                    )
+                    .fetchone()
+                )
+        except sqlite3.Error as e:
+            logger.warning("Couldn't read shared model cache %s: %s", self.path, e)
+            return None
+        if row is None:
+            return None
+        mtime_ns, size_bytes, data = row
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if stat.st_mtime_ns != mtime_ns or stat.st_size != size_bytes:
+            return None
+        model = unpickle_model(data, path)
+        if model is None:
+            return None
+        return model, mtime_ns, size_bytes
+
+    def put(self, path: Path, model: BaseModel, mtime_ns: int, size_bytes: int):
+        """Add a model loaded from its file. Pickled and written in the background: the model must not be modified after."""
+        with self._lock:
+            if len(self._pending) >= self._max_pending:
+                # The writer is falling behind. Sharing is best effort: never slow down loading for it.
+                return
+            self._pending[str(path)] = (mtime_ns, size_bytes, model)
+            self._idle.clear()
+            self._start_writer()
+        self._wake.set()
+
+    def remove_many(self, paths: Iterable[Path]) -> None:
+        """Remove models whose files were saved or deleted, including any pending writes for them."""
+        keys = [(str(path),) for path in paths]
+        if not keys:
+            return
+        try:
+            with self._lock:
+                for (key,) in keys:
+                    self._pending.pop(key, None)
+                    if key in self._writing:
+                        self._removed_while_writing.add(key)
+                conn = self._connect()
+                with conn:
+                    conn.executemany("DELETE FROM models WHERE path = ?", keys)
+        except sqlite3.Error as e:
+            logger.warning("Couldn't update shared model cache %s: %s", self.path, e)
+
+    def flush(self) -> None:
+        """Block until pending writes are written."""
+        self._wake.set()
+        self._idle.wait()
+
+    def _start_writer(self) -> None:
+        # Caller holds the lock. Threads don't survive a fork, so start one per process.
+        if self._writer is not None and self._writer_pid == os.getpid():
+            return
+        self._writer = threading.Thread(
+            target=self._write_loop, name="kiln_shared_model_store", daemon=True
+        )
+        self._writer_pid = os.getpid()
+        self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._idle.set()
+                        break
+                    keys = list(self._pending)[:MAX_WRITE_BATCH]
+                    models = [(key, *self._pending.pop(key)) for key in keys]
+                    self._writing = set(keys)
+                # Pickled without the lock, so puts from the loading threads don't wait
+                batch = []
+                for key, mtime_ns, size_bytes, model in models:
+                    blob = pickle_model(model)
+                    if blob is not None:
+                        batch.append((key, mtime_ns, size_bytes, blob))
+                with self._lock:
+                    # Removed while pickling: the file was saved or deleted
+                    batch = [
+                        row
+                        for row in batch
+                        if row[0] not in self._removed_while_writing
+                    ]
+                    self._writing = set()
+                    self._removed_while_writing = set()
+                    try:
+                        conn = self._connect()
+                        with conn:
+                            conn.executemany(
+                                "INSERT OR REPLACE INTO models (path, mtime_ns, size_bytes, data) VALUES (?, ?, ?, ?)",
+                                batch,
+                            )
+                    except sqlite3.Error as e:
+                        logger.warning(
+                            "Couldn't write shared model cache %s: %s", self.path, e
+                        )
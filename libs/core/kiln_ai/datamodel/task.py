@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Dict, List, Union
+from typing import TYPE_CHECKING, Dict, Iterator, List, Union
 
 from pydantic import BaseModel, Field, ValidationInfo, model_validator
 from typing_extensions import Self
@@ -217,8 +217,13 @@ class Task(
         return schema_from_json_str(self.input_json_schema)
 
     # These wrappers help for typechecking. TODO P2: fix this in KilnParentModel
-    def runs(self, readonly: bool = False) -> list[TaskRun]:
-        return super().runs(readonly=readonly)  # type: ignore
+    def runs(self, readonly: bool = False, trusted: bool = False) -> list[TaskRun]:
+        return super().runs(readonly=readonly, trusted=trusted)  # type: ignore
+
+    def iter_runs(
+        self, readonly: bool = False, trusted: bool = False
+    ) -> Iterator[TaskRun]:
+        return super().iter_runs(readonly=readonly, trusted=trusted)  # type: ignore
 
     def dataset_splits(self, readonly: bool = False) -> list[DatasetSplit]:
         return super().dataset_splits(readonly=readonly)  # type: ignore
@@ -1,6 +1,6 @@
 import json
 from enum import Enum
-from typing import TYPE_CHECKING, Dict, List, Type, Union
+from typing import TYPE_CHECKING, ClassVar, Dict, List, Type, Union
 
 import jsonschema
 import jsonschema.exceptions
@@ -202,7 +202,8 @@ class DataSource(BaseModel):
         description="Properties describing the data source. For synthetic things like model. For human, the human's name.",
     )
 
-    _data_source_properties = [
+    # A ClassVar, not a private attribute: pydantic deep copies private attributes into every instance
+    _data_source_properties: ClassVar[List[DataSourceProperty]] = [
         DataSourceProperty(
             name="created_by",
             type=str,
@@ -1,15 +1,26 @@
 import json
-from typing import TYPE_CHECKING, Dict, List, Union
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Union
 
 import jsonschema
 import jsonschema.exceptions
 from pydantic import BaseModel, Field, ValidationInfo, model_validator
 from typing_extensions import Self
 
-from kiln_ai.datamodel.basemodel import KilnParentedModel
+from kiln_ai.datamodel.basemodel import ID_TYPE, KilnParentedModel
 from kiln_ai.datamodel.json_schema import validate_schema_with_value_error
+from kiln_ai.datamodel.model_cache import ModelCache
+from kiln_ai.datamodel.serialization import model_serializer
 from kiln_ai.datamodel.strict_mode import strict_mode
-from kiln_ai.datamodel.task_output import DataSource, TaskOutput
+from kiln_ai.datamodel.task_output import (
+    DataSource,
+    DataSourceType,
+    TaskOutput,
+    TaskOutputRating,
+)
+from kiln_ai.utils.config import Config
 
 if TYPE_CHECKING:
     from kiln_ai.datamodel.task import Task
@@ -38,6 +49,95 @@ class Usage(BaseModel):
     )
 
 
+# Long enough that list views can build their own (shorter) previews from it
+SUMMARY_PREVIEW_LENGTH = 1000
+
+
+class TaskRunSummary(BaseModel):
+    """
+    A lightweight projection of a TaskRun for list views.
+
+    Loaded with `TaskRun.load_summary`, which only parses the keys needed here and skips validating the run's input, outputs and intermediate outputs.
+    """
+
+    id: ID_TYPE
+    path: Path | None = None
+    created_at: datetime
+    tags: List[str] = []
+    input_preview: str = ""
+    output_preview: str | None = None
+    rating: TaskOutputRating | None = None
+    has_repair_instructions: bool = False
+    repaired: bool = False
+    model_name: str | None = None
+    input_source_type: DataSourceType | None = None
+
+    @classmethod
+    def from_run(cls, run: "TaskRun") -> "TaskRunSummary":
+        model_name = (
+            run.output.source.properties.get("model_name")
+            if run.output and run.output.source
+            else None
+        )
+        return cls(
+            id=run.id,
+            path=run.path,
+            created_at=run.created_at,
+            tags=run.tags,
+            input_preview=run.input[:SUMMARY_PREVIEW_LENGTH],
+            output_preview=run.output.output[:SUMMARY_PREVIEW_LENGTH]
+            if run.output
+            else None,
+            rating=run.output.rating if run.output else None,
+            has_repair_instructions=bool(run.repair_instructions),
+            repaired=run.repaired_output is not None,
+            model_name=model_name if isinstance(model_name, str) else None,
+            input_source_type=run.input_source.type if run.input_source else None,
+        )
+
+    @classmethod
+    def from_file_data(cls, path: Path, data: Dict[str, Any]) -> "TaskRunSummary":
+        output = data.get("output") or {}
+        output_text = output.get("output")
+        output_source = output.get("source") or {}
+        model_name = (output_source.get("properties") or {}).get("model_name")
+        rating = output.get("rating")
+        input_source = data.get("input_source") or {}
+        return cls(
+            id=data.get("id"),
+            path=path,
+            created_at=data["created_at"],
+            tags=data.get("tags") or [],
+            input_preview=(data.get("input") or "")[:SUMMARY_PREVIEW_LENGTH],
+            output_preview=output_text[:SUMMARY_PREVIEW_LENGTH]
+            if isinstance(output_text, str)
+            else None,
+            # Ratings are small and have a legacy format upgrade, so these are fully validated
+            rating=TaskOutputRating.model_validate(rating) if rating else None,
+            has_repair_instructions=bool(data.get("repair_instructions")),
+            repaired=data.get("repaired_output") is not None,
+            model_name=model_name if isinstance(model_name, str) else None,
+            input_source_type=input_source.get("type"),
+        )
+
+
+_summary_cache: ModelCache | None = None
+
+
+def summary_cache() -> ModelCache:
+    """Cache of TaskRunSummary objects, separate from the full model cache (which is keyed by the same paths)."""
+    global _summary_cache
+    if _summary_cache is None:
+        config = Config.shared()
+        _summary_cache = ModelCache(
+            max_entries=config.model_cache_max_entries,
+            max_bytes=config.model_cache_max_bytes,
+        )
+        if config.enable_file_watcher is True:
+            _summary_cache.enable_file_watcher()
+    return _summary_cache
+
+
 class TaskRun(KilnParentedModel):
     """
     Represents a single execution of a Task.
@@ -75,6 +175,87 @@ class TaskRun(KilnParentedModel):
         description="Usage information for the task run. This includes the number of input tokens, output tokens, and total tokens used.",
     )
 
+    @classmethod
+    def after_save(cls, models: list["TaskRun"]) -> None:
+        super().after_save(models)
+        # Inline import to avoid circular import
+        from kiln_ai.datamodel.run_index import TaskRunIndex, task_run_index_enabled
+
+        if not task_run_index_enabled():
+            return
+        runs_by_task_path: Dict[Path, List[TaskRun]] = {}
+        for run in models:
+            task_path = run._task_path()
+            if task_path is not None:
+                runs_by_task_path.setdefault(task_path, []).append(run)
+        for task_path, runs in runs_by_task_path.items():
+            index = TaskRunIndex.for_task_path(task_path)
+            if index is not None:
+                index.update_runs(runs)
+
+    @classmethod
+    def after_delete(cls, paths: list[Path]) -> None:
+        super().after_delete(paths)
+        # Inline import to avoid circular import
+        from kiln_ai.datamodel.run_index import TaskRunIndex, task_run_index_enabled
+
+        if not task_run_index_enabled():
+            return
+        paths_by_task_path: Dict[Path, List[Path]] = {}
+        for path in paths:
+            # runs/{id}/task_run.kiln -> task.kiln
+            task_path = path.parent.parent.parent / cls.parent_type().base_filename()
+            paths_by_task_path.setdefault(task_path, []).append(path)
+        for task_path, run_paths in paths_by_task_path.items():
+            index = TaskRunIndex.for_task_path(task_path)
+            if index is not None:
+                index.remove_paths(run_paths)
+
+    @classmethod
+    def load_summary(cls, path: Path) -> TaskRunSummary:
+        """
+        Load a lightweight summary of the run at path, for list views.
+
+        Uses the fully loaded run if it's already cached. Otherwise only the keys needed for the summary are parsed, skipping validation of the rest of the run.
+        """
+        cached_run = ModelCache.shared().get_model(
+            path, cls, readonly=True, trusted=True
+        )
+        if cached_run is not None:
+            return TaskRunSummary.from_run(cached_run)
+        cached_summary = summary_cache().get_model(path, TaskRunSummary, readonly=True)
+        if cached_summary is not None:
+            return cached_summary
+
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            # Not a file: may be in a segment store
+            return TaskRunSummary.from_run(cls.load_from_file(path, readonly=True))
+        with file:
+            file_stat = os.fstat(file.fileno())
+            data = model_serializer().loads(file.read())
+        # The projection only understands the current schema. Let the full loader handle (and report) anything else.
+        if (
+            data.get("model_type") != cls.type_name()
+            or data.get("v", 1) != cls.max_schema_version()
+        ):
+            return TaskRunSummary.from_run(cls.load_from_file(path, readonly=True))
+        summary = TaskRunSummary.from_file_data(path, data)
+        # Estimated size: the previews dominate
+        size_bytes = len(summary.input_preview) + len(summary.output_preview or "")
+        summary_cache().set_model(path, summary, file_stat.st_mtime_ns, size_bytes)
+        return summary
+
+    def _task_path(self) -> Path | None:
+        # runs/{id}/task_run.kiln -> task.kiln. Doesn't load the parent.
+        if self.path is None:
+            return None
+        return (
+            self.path.parent.parent.parent
+            / self.__class__.parent_type().base_filename()
+        )
+
     def thinking_training_data(self) -> str | None:
         """
         Get the thinking training data from the task run.
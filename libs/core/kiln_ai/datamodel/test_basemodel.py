@@ -14,6 +14,7 @@ from kiln_ai.datamodel.basemodel import (
     KilnParentedModel,
     string_to_valid_name,
 )
+from kiln_ai.datamodel.child_listing_cache import ChildListingCache
 from kiln_ai.datamodel.model_cache import ModelCache
 from kiln_ai.datamodel.task import RunConfig
 
@@ -255,6 +256,53 @@ def test_load_children(test_base_parented_file):
     assert all(child.model_type == "default_parented_model" for child in children)
 
 
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_load_children_parallel(test_base_parented_file, tmp_model_cache, max_workers):
+    parent = BaseParentExample.load_from_file(test_base_parented_file)
+    for i in range(10):
+        DefaultParentedModel(parent=parent, name=f"Child{i}").save_to_file()
+    serial = DefaultParentedModel.all_children_of_parent_path(
+        test_base_parented_file, max_workers=1
+    )
+
+    tmp_model_cache.clear()
+    misses = tmp_model_cache.stats().misses
+    children = DefaultParentedModel.all_children_of_parent_path(
+        test_base_parented_file, max_workers=max_workers
+    )
+
+    # Same order as a serial load, and the cache is populated for warm reads. Only the children: listing them doesn't load the parent.
+    assert [c.id for c in children] == [c.id for c in serial]
+    assert tmp_model_cache.stats().entries == 10
+    # Each child checks the cache once
+    assert tmp_model_cache.stats().misses == misses + 10
+    for child in children:
+        cached = tmp_model_cache.get_model(child.path, DefaultParentedModel)
+        assert cached is not None
+        assert cached.id == child.id
+
+
+def test_load_children_workers_from_config(test_base_parented_file):
+    parent = BaseParentExample.load_from_file(test_base_parented_file)
+    for i in range(3):
+        DefaultParentedModel(parent=parent, name=f"Child{i}").save_to_file()
+
+    with (
+        patch("kiln_ai.datamodel.basemodel.Config.shared") as mock_config,
+        patch("kiln_ai.datamodel.basemodel.ThreadPoolExecutor") as mock_executor,
+    ):
+        mock_config.return_value.child_load_workers = None
+        DefaultParentedModel.all_children_of_parent_path(test_base_parented_file)
+        mock_executor.assert_not_called()
+
+        mock_config.return_value.child_load_workers = 8
+        mock_executor.return_value.__enter__.return_value.map.return_value = []
+        DefaultParentedModel.all_children_of_parent_path(test_base_parented_file)
+        mock_executor.assert_called_once_with(
+            max_workers=3, thread_name_prefix="kiln_child_load"
+        )
+
+
 def test_base_filename():
     model = DefaultParentedModel(name="Test")
     assert model.base_filename() == "default_parented_model.kiln"
@@ -361,7 +409,7 @@ def test_load_from_file_with_cache(test_base_file, tmp_model_cache):
 
     # Check that the cache was checked and set
     tmp_model_cache.get_model.assert_called_once_with(
-        test_base_file, KilnBaseModel, readonly=False
+        test_base_file, KilnBaseModel, readonly=False, trusted=False
     )
     tmp_model_cache.set_model.assert_called_once()
 
@@ -414,7 +462,7 @@ def test_load_from_file_with_cached_model(test_base_file, tmp_model_cache):
 
         # Check that the cache was checked and the cached model was returned
         tmp_model_cache.get_model.assert_called_once_with(
-            test_base_file, KilnBaseModel, readonly=False
+            test_base_file, KilnBaseModel, readonly=False, trusted=False
         )
         assert model is cached_model
 
@@ -463,16 +511,72 @@ def test_from_id_and_parent_path_with_cache(test_base_parented_file, tmp_model_c
     # Mock cache to verify it's used
     tmp_model_cache.get_model_id = MagicMock(return_value=child.id)
 
-    # Load again - should use cache
-    found_child = DefaultParentedModel.from_id_and_parent_path(
-        child.id, test_base_parented_file
-    )
+    # Load again, skipping the folder name lookup - the file scan should use cache
+    with patch.object(ChildListingCache, "child_folder", return_value=None):
+        found_child = DefaultParentedModel.from_id_and_parent_path(
+            child.id, test_base_parented_file
+        )
 
     assert found_child is not None
     assert found_child.id == child.id
     tmp_model_cache.get_model_id.assert_called()
 
 
+def test_from_id_and_parent_path_uses_folder_names(test_base_parented_file):
+    parent = BaseParentExample.load_from_file(test_base_parented_file)
+    children = [DefaultParentedModel(parent=parent, name=f"Child{i}") for i in range(5)]
+    for child in children:
+        child.save_to_file()
+
+    with (
+        patch.object(
+            DefaultParentedModel, "iterate_children_paths_of_parent_path"
+        ) as mock_iterate,
+        patch.object(
+            DefaultParentedModel,
+            "load_from_file",
+            wraps=DefaultParentedModel.load_from_file,
+        ) as mock_load,
+    ):
+        found_child = DefaultParentedModel.from_id_and_parent_path(
+            children[3].id, test_base_parented_file
+        )
+        # Straight to the right file, no scan
+        mock_iterate.assert_not_called()
+        mock_load.assert_called_once_with(children[3].path)
+    assert found_child is not None
+    assert found_child.name == "Child3"
+
+
+def test_from_id_and_parent_path_renamed_folder(test_base_parented_file):
+    parent = BaseParentExample.load_from_file(test_base_parented_file)
+    child = DefaultParentedModel(parent=parent, name="Child")
+    child.save_to_file()
+    other = DefaultParentedModel(parent=parent, name="Other")
+    other.save_to_file()
+    assert child.path is not None and other.path is not None
+
+    # Folder name no longer matches the ID in the file
+    child.path.parent.rename(child.path.parent.parent / "renamed by hand")
+    # Folder name claims the ID of a different model
+    other.path.parent.rename(other.path.parent.parent / f"{child.id} - Other")
+    ChildListingCache.shared().clear()
+
+    found_child = DefaultParentedModel.from_id_and_parent_path(
+        child.id, test_base_parented_file
+    )
+    assert found_child is not None
+    assert found_child.name == "Child"
+    assert found_child.path is not None
+    assert found_child.path.parent.name == "renamed by hand"
+
+    found_other = DefaultParentedModel.from_id_and_parent_path(
+        other.id, test_base_parented_file
+    )
+    assert found_other is not None
+    assert found_other.name == "Other"
+
+
 def test_from_id_and_parent_path_without_parent():
     # Test with None parent_path
     not_found = DefaultParentedModel.from_id_and_parent_path("any-id", None)
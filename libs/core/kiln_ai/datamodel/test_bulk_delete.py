@@ -0,0 +1,150 @@
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from kiln_ai.datamodel import (
+    DataSource,
+    DataSourceType,
+    Project,
+    Task,
+    TaskOutput,
+    TaskRun,
+)
+from kiln_ai.datamodel.bulk_delete import (
+    TRASH_FOLDER,
+    delete_children,
+    wait_for_reclaim,
+)
+from kiln_ai.datamodel.run_index import TaskRunIndex
+from kiln_ai.datamodel.segment_store import SEGMENT_FOLDER, SegmentStore
+
+
+@pytest.fixture
+def task(tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    return task
+
+
+def save_run(task, input="test input", tags=None) -> TaskRun:
+    source = DataSource(type=DataSourceType.human, properties={"created_by": "tester"})
+    run = TaskRun(
+        parent=task,
+        input=input,
+        input_source=source,
+        output=TaskOutput(output="test output", source=source),
+        tags=tags or [],
+    )
+    run.save_to_file()
+    return run
+
+
+def trash_folder(task):
+    return TaskRun.relationship_folder(task.path) / TRASH_FOLDER
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_delete_children(task, max_workers):
+    runs = [save_run(task, input=f"input {i}") for i in range(5)]
+    ids = [run.id for run in runs[:3]]
+
+    with patch(
+        "kiln_ai.datamodel.basemodel.child_load_workers", return_value=max_workers
+    ):
+        result = delete_children(TaskRun, task.path, ids)
+
+    assert result.deleted == ids
+    assert result.missing == []
+    assert result.failed == {}
+    assert sorted(run.id for run in task.runs()) == sorted(run.id for run in runs[3:])
+    for run in runs[:3]:
+        assert not run.path.parent.exists()
+        assert TaskRun.from_id_and_parent_path(run.id, task.path) is None
+
+    wait_for_reclaim()
+    assert list(trash_folder(task).iterdir()) == []
+
+
+def test_delete_children_missing_ids(task):
+    run = save_run(task)
+    result = delete_children(TaskRun, task.path, ["missing", run.id, run.id])
+    assert result.deleted == [run.id]
+    assert result.missing == ["missing"]
+    assert task.runs() == []
+
+
+def test_delete_children_folder_name_mismatch(task):
+    runs = [save_run(task, input=f"input {i}") for i in range(2)]
+    # Folder names start with the ID, but a copied folder may not match the ID in its file
+    renamed = runs[0].path.parent.with_name("renamed")
+    shutil.move(runs[0].path.parent, renamed)
+
+    result = delete_children(TaskRun, task.path, [runs[0].id, runs[1].id])
+    assert result.deleted == [runs[0].id, runs[1].id]
+    assert not renamed.exists()
+    assert task.runs() == []
+
+
+def test_delete_children_reports_failures(task):
+    runs = [save_run(task, input=f"input {i}") for i in range(2)]
+    real_rename = os.rename
+
+    def rename(src, dst):
+        if str(src) == str(runs[0].path.parent):
+            raise PermissionError("Permission denied")
+        return real_rename(src, dst)
+
+    with patch("kiln_ai.datamodel.bulk_delete.os.rename", side_effect=rename):
+        result = delete_children(TaskRun, task.path, [runs[0].id, runs[1].id])
+
+    assert result.deleted == [runs[1].id]
+    assert isinstance(result.failed[runs[0].id], PermissionError)
+    assert [run.id for run in task.runs()] == [runs[0].id]
+
+
+def test_delete_children_updates_run_index(task):
+    runs = [save_run(task, input=f"input {i}", tags=["a"]) for i in range(3)]
+    with patch("kiln_ai.datamodel.run_index.task_run_index_enabled", return_value=True):
+        index = TaskRunIndex(task.path)
+        index.refresh()
+        assert index.tag_counts(refresh=False) == {"a": 3}
+
+        with patch.object(
+            TaskRunIndex, "remove_paths", wraps=index.remove_paths
+        ) as remove_paths:
+            delete_children(TaskRun, task.path, [runs[0].id, runs[1].id])
+        # One index update for the whole batch
+        remove_paths.assert_called_once()
+        assert index.tag_counts(refresh=False) == {"a": 1}
+
+
+def test_delete_children_reclaims_leftover_trash(task):
+    run = save_run(task)
+    # Left by a process which exited before removing it
+    leftover = trash_folder(task) / "leftover"
+    (leftover / "old_run").mkdir(parents=True)
+    (leftover / "old_run" / "task_run.kiln").write_text("{}")
+
+    delete_children(TaskRun, task.path, [run.id])
+    wait_for_reclaim()
+    assert list(trash_folder(task).iterdir()) == []
+    # Trash is never listed as a child
+    assert task.runs() == []
+
+
+def test_delete_children_segment_store(task):
+    runs_folder = TaskRun.relationship_folder(task.path)
+    (runs_folder / SEGMENT_FOLDER).mkdir(parents=True)
+    store = SegmentStore.for_relationship_folder(runs_folder)
+    assert store is not None
+    runs = [save_run(task, input=f"input {i}") for i in range(3)]
+
+    result = delete_children(TaskRun, task.path, [runs[0].id, runs[1].id, "missing"])
+    assert result.deleted == [runs[0].id, runs[1].id]
+    assert result.missing == ["missing"]
+    assert [run.id for run in task.runs()] == [runs[2].id]
+    assert not (runs_folder / TRASH_FOLDER).exists()
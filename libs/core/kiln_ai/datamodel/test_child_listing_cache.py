@@ -0,0 +1,180 @@
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from kiln_ai.datamodel.child_listing_cache import ChildListingCache, id_from_dirname
+
+BASE_FILENAME = "task_run.kiln"
+
+
+def add_child(relationship_folder, name, with_file=True):
+    folder = relationship_folder / name
+    folder.mkdir()
+    if with_file:
+        (folder / BASE_FILENAME).write_text("{}")
+    return folder
+
+
+def age_folder(folder, seconds=10):
+    # Make the folder's last change older than the racy window, so its listing can be cached
+    mtime_ns = folder.stat().st_mtime_ns - seconds * 1_000_000_000
+    os.utime(folder, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def relationship_folder(tmp_path):
+    folder = tmp_path / "runs"
+    folder.mkdir()
+    for i in range(3):
+        add_child(folder, f"{i} - Run {i}")
+    add_child(folder, ".staging", with_file=True)
+    (folder / "stray_file.txt").write_text("")
+    add_child(folder, "no_file", with_file=False)
+    return folder
+
+
+def listed_names(files):
+    return sorted(path.parent.name for path in files)
+
+
+def test_lists_child_files(relationship_folder):
+    cache = ChildListingCache()
+    files = cache.child_files(relationship_folder, BASE_FILENAME)
+    assert listed_names(files) == ["0 - Run 0", "1 - Run 1", "2 - Run 2"]
+    assert all(path.name == BASE_FILENAME for path in files)
+    assert cache.child_files(relationship_folder / "missing", BASE_FILENAME) == ()
+    assert (
+        cache.child_files(relationship_folder / "stray_file.txt", BASE_FILENAME) == ()
+    )
+
+
+def test_warm_listing_skips_scan(relationship_folder):
+    cache = ChildListingCache()
+    age_folder(relationship_folder)
+    first = cache.child_files(relationship_folder, BASE_FILENAME)
+    with patch("kiln_ai.datamodel.child_listing_cache.os.scandir") as scandir:
+        assert cache.child_files(relationship_folder, BASE_FILENAME) == first
+        scandir.assert_not_called()
+
+
+def test_recently_changed_folders_not_cached(relationship_folder):
+    cache = ChildListingCache()
+    cache.child_files(relationship_folder, BASE_FILENAME)
+    with patch(
+        "kiln_ai.datamodel.child_listing_cache.os.scandir", wraps=os.scandir
+    ) as scandir:
+        cache.child_files(relationship_folder, BASE_FILENAME)
+        scandir.assert_called_once()
+
+
+def test_changes_invalidate_listing(relationship_folder):
+    cache = ChildListingCache()
+    age_folder(relationship_folder)
+    assert len(cache.child_files(relationship_folder, BASE_FILENAME)) == 3
+
+    add_child(relationship_folder, "3 - Run 3")
+    assert len(cache.child_files(relationship_folder, BASE_FILENAME)) == 4
+
+    (relationship_folder / "0 - Run 0" / BASE_FILENAME).unlink()
+    (relationship_folder / "0 - Run 0").rmdir()
+    assert listed_names(cache.child_files(relationship_folder, BASE_FILENAME)) == [
+        "1 - Run 1",
+        "2 - Run 2",
+        "3 - Run 3",
+    ]
+
+
+def test_file_written_into_existing_folder(relationship_folder):
+    cache = ChildListingCache()
+    age_folder(relationship_folder)
+    assert len(cache.child_files(relationship_folder, BASE_FILENAME)) == 3
+
+    # Writing the file doesn't change the relationship folder's mtime
+    mtime_ns = relationship_folder.stat().st_mtime_ns
+    (relationship_folder / "no_file" / BASE_FILENAME).write_text("{}")
+    assert relationship_folder.stat().st_mtime_ns == mtime_ns
+    files = cache.child_files(relationship_folder, BASE_FILENAME)
+    assert "no_file" in listed_names(files)
+
+
+def test_invalidate(relationship_folder):
+    cache = ChildListingCache()
+    age_folder(relationship_folder)
+    cache.child_files(relationship_folder, BASE_FILENAME)
+    cache.invalidate(relationship_folder)
+    assert cache._listings == {}
+    cache.child_files(relationship_folder, BASE_FILENAME)
+    cache.clear()
+    assert cache._listings == {}
+
+
+def test_id_from_dirname():
+    assert id_from_dirname("123456789012 - My Task") == "123456789012"
+    assert id_from_dirname("123456789012 - name - with dashes") == "123456789012"
+    assert id_from_dirname("123456789012") == "123456789012"
+
+
+def test_child_folder(relationship_folder):
+    cache = ChildListingCache()
+    assert (
+        cache.child_folder(relationship_folder, BASE_FILENAME, "1")
+        == relationship_folder / "1 - Run 1"
+    )
+    # Folders without their file yet are found too
+    assert (
+        cache.child_folder(relationship_folder, BASE_FILENAME, "no_file")
+        == relationship_folder / "no_file"
+    )
+    assert cache.child_folder(relationship_folder, BASE_FILENAME, ".staging") is None
+    assert (
+        cache.child_folder(relationship_folder, BASE_FILENAME, "stray_file.txt") is None
+    )
+    assert cache.child_folder(relationship_folder, BASE_FILENAME, "9") is None
+    assert (
+        cache.child_folder(relationship_folder / "missing", BASE_FILENAME, "1") is None
+    )
+
+
+def test_child_folder_shares_listing(relationship_folder):
+    cache = ChildListingCache()
+    age_folder(relationship_folder)
+    cache.child_files(relationship_folder, BASE_FILENAME)
+    with patch("kiln_ai.datamodel.child_listing_cache.os.scandir") as scandir:
+        assert (
+            cache.child_folder(relationship_folder, BASE_FILENAME, "2")
+            == relationship_folder / "2 - Run 2"
+        )
+        scandir.assert_not_called()
+
+    add_child(relationship_folder, "3 - Run 3")
+    assert (
+        cache.child_folder(relationship_folder, BASE_FILENAME, "3")
+        == relationship_folder / "3 - Run 3"
+    )
+
+
+@pytest.mark.benchmark
+def test_benchmark_warm_listing(tmp_path):
+    folder = tmp_path / "runs"
+    folder.mkdir()
+    for i in range(5000):
+        add_child(folder, f"{i:012d} - Run")
+    age_folder(folder)
+
+    cache = ChildListingCache()
+    start = time.perf_counter()
+    assert len(cache.child_files(folder, BASE_FILENAME)) == 5000
+    cold_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(100):
+        assert len(cache.child_files(folder, BASE_FILENAME)) == 5000
+    warm_time = (time.perf_counter() - start) / 100
+
+    # I get ~190ms cold, ~3µs warm
+    print(
+        f"5k children. Cold listing: {cold_time * 1000:.2f}ms, warm: {warm_time * 1000:.3f}ms"
+    )
+    assert warm_time * 10 < cold_time
@@ -0,0 +1,161 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from kiln_ai.datamodel import (
+    DataSource,
+    DataSourceType,
+    Project,
+    Task,
+    TaskOutput,
+    TaskRun,
+)
+from kiln_ai.datamodel.bulk_delete import delete_children
+from kiln_ai.datamodel.collection_version import (
+    bump_collection_generations,
+    collection_version,
+)
+from kiln_ai.datamodel.run_index import TaskRunIndex
+from kiln_ai.datamodel.segment_store import SEGMENT_FOLDER
+from kiln_ai.datamodel.write_batch import write_batch
+
+
+@pytest.fixture
+def task(tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    return task
+
+
+def make_run(task, input="test input") -> TaskRun:
+    source = DataSource(type=DataSourceType.human, properties={"created_by": "tester"})
+    return TaskRun(
+        parent=task,
+        input=input,
+        input_source=source,
+        output=TaskOutput(output="test output", source=source),
+    )
+
+
+@pytest.fixture
+def enable_index():
+    with patch("kiln_ai.datamodel.run_index.task_run_index_enabled", return_value=True):
+        yield
+
+
+def test_collection_version_missing_folder(tmp_path):
+    assert collection_version(tmp_path / "missing") == "none"
+
+
+def test_version_is_same_in_every_process(tmp_path):
+    # Saves in this process are counted, but versions are ETags, which other server processes must agree on
+    version = collection_version(tmp_path)
+    bump_collection_generations([tmp_path])
+    assert collection_version(tmp_path) == version
+
+
+@pytest.mark.parametrize("index_enabled", [False, True])
+def test_saves_and_deletes_change_version(task, index_enabled):
+    with patch(
+        "kiln_ai.datamodel.run_index.task_run_index_enabled",
+        return_value=index_enabled,
+    ):
+        check_saves_and_deletes_change_version(task)
+
+
+def check_saves_and_deletes_change_version(task):
+    runs_folder = TaskRun.relationship_folder(task.path)
+    versions = [collection_version(runs_folder)]
+
+    run = make_run(task)
+    run.save_to_file()
+    versions.append(collection_version(runs_folder))
+
+    # Edits don't change the folder's mtime, but do change the version
+    run.input = "edited"
+    run.save_to_file()
+    versions.append(collection_version(runs_folder))
+
+    with write_batch():
+        make_run(task).save_to_file()
+        make_run(task).save_to_file()
+    versions.append(collection_version(runs_folder))
+
+    delete_children(TaskRun, task.path, [run.id])
+    versions.append(collection_version(runs_folder))
+
+    task.runs()[0].delete()
+    versions.append(collection_version(runs_folder))
+
+    assert len(set(versions)) == len(versions)
+    # Unchanged without writes
+    assert collection_version(runs_folder) == versions[-1]
+    # Nothing is written to the project: the folder only holds child folders (and trash)
+    assert [p.name for p in runs_folder.iterdir() if not p.is_dir()] == []
+
+
+def test_version_from_run_index(enable_index, task):
+    runs_folder = TaskRun.relationship_folder(task.path)
+    make_run(task).save_to_file()
+    version = collection_version(runs_folder)
+    assert version == f"index:{TaskRunIndex(task.path).generation()}"
+
+    # No stat per run once the index is current
+    with patch(
+        "kiln_ai.datamodel.collection_version._child_file_stats"
+    ) as child_file_stats:
+        assert collection_version(runs_folder) == version
+        child_file_stats.assert_not_called()
+
+    # Writes by any process bump the generation in the index file
+    TaskRunIndex(task.path).remove_paths([])
+    assert collection_version(runs_folder) != version
+
+
+def test_rebuilt_index_has_new_versions(enable_index, task):
+    runs_folder = TaskRun.relationship_folder(task.path)
+    make_run(task).save_to_file()
+    version = collection_version(runs_folder)
+    TaskRunIndex(task.path).index_path.unlink()
+    assert collection_version(runs_folder) != version
+
+
+def test_eval_runs_folder_not_versioned_from_run_index(enable_index, tmp_path):
+    # Eval configs also have a runs folder, but no run index
+    runs_folder = tmp_path / "runs"
+    runs_folder.mkdir()
+    assert TaskRunIndex.for_runs_folder(runs_folder) is None
+    assert not collection_version(runs_folder).startswith("index:")
+
+
+def test_edits_outside_process_change_version(task):
+    runs_folder = TaskRun.relationship_folder(task.path)
+    run = make_run(task)
+    run.save_to_file()
+    version = collection_version(runs_folder)
+
+    # Eg. a git pull: the file changes, but not through Kiln, and the folder's mtime is unchanged
+    folder_mtime = runs_folder.stat().st_mtime_ns
+    contents = run.path.read_text().replace("test input", "pulled input")
+    run.path.write_text(contents)
+    assert runs_folder.stat().st_mtime_ns == folder_mtime
+    assert collection_version(runs_folder) != version
+
+    # Same size and content, only a new mtime
+    version = collection_version(runs_folder)
+    stat = run.path.stat()
+    os.utime(run.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert collection_version(runs_folder) != version
+
+
+def test_segment_store_changes_version(task):
+    runs_folder = TaskRun.relationship_folder(task.path)
+    (runs_folder / SEGMENT_FOLDER).mkdir(parents=True)
+    version = collection_version(runs_folder)
+    # Appends to a segment don't add folders, but change the segment's files
+    with patch("kiln_ai.datamodel.basemodel.bump_collection_generations"):
+        make_run(task).save_to_file()
+    assert collection_version(runs_folder) != version
@@ -1,11 +1,20 @@
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import pytest
 from pydantic import BaseModel
 
+from kiln_ai.datamodel import (
+    DataSource,
+    DataSourceType,
+    Project,
+    Task,
+    TaskOutput,
+    TaskOutputRating,
+)
 from kiln_ai.datamodel.dataset_filters import (
     AllDatasetFilter,
     DatasetFilterId,
+    DatasetFilterPlan,
     HighRatingDatasetFilter,
     MultiDatasetFilter,
     StaticDatasetFilters,
@@ -13,7 +22,11 @@ from kiln_ai.datamodel.dataset_filters import (
     ThinkingModelDatasetFilter,
     ThinkingModelHighRatedFilter,
     dataset_filter_from_id,
+    filtered_run_ids,
+    iter_filtered_runs,
+    plan_dataset_filter,
 )
+from kiln_ai.datamodel.run_index import TaskRunIndex
 from kiln_ai.datamodel.task_run import TaskRun
 
 # Note: Many more filter tests in test_dataset_split.py
@@ -151,3 +164,116 @@ class TestMultiDatasetFilter:
         assert any(
             isinstance(f, type(ThinkingModelDatasetFilter)) for f in filter.filters
         )
+
+
+def custom_filter(task_run: TaskRun) -> bool:
+    return task_run.input.startswith("keep")
+
+
+@pytest.mark.parametrize(
+    "filter,expected",
+    [
+        ("all", DatasetFilterPlan()),
+        ("high_rating", DatasetFilterPlan(flags=["high_quality"])),
+        ("tag::a", DatasetFilterPlan(tags=["a"])),
+        (
+            "multi_filter::thinking_model_high_rated&tag::a&high_rating&tag::b",
+            DatasetFilterPlan(tags=["a", "b"], flags=["has_thinking", "high_quality"]),
+        ),
+    ],
+)
+def test_plan_dataset_filter(filter, expected):
+    assert plan_dataset_filter(dataset_filter_from_id(filter)) == expected
+
+
+def test_plan_keeps_custom_filters_residual():
+    multi = MultiDatasetFilter("multi_filter::tag::a")
+    multi.filters.append(custom_filter)
+    assert plan_dataset_filter(multi) == DatasetFilterPlan(
+        tags=["a"], residual=[custom_filter]
+    )
+    assert plan_dataset_filter(custom_filter) == DatasetFilterPlan(
+        residual=[custom_filter]
+    )
+
+
+@pytest.fixture
+def task_with_runs(tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    source = DataSource(type=DataSourceType.human, properties={"created_by": "tester"})
+    for input, tags, rating in [
+        ("keep 1", ["a", "b"], 5.0),
+        ("keep 2", ["a"], 5.0),
+        ("drop 3", ["a", "b"], 5.0),
+        ("keep 4", ["a", "b"], 1.0),
+        ("keep 5", [], 5.0),
+    ]:
+        TaskRun(
+            parent=task,
+            input=input,
+            input_source=source,
+            output=TaskOutput(
+                output="output",
+                source=source,
+                rating=TaskOutputRating(value=rating),
+            ),
+            tags=tags,
+        ).save_to_file()
+    return task
+
+
+@pytest.mark.parametrize("index_enabled", [False, True])
+@pytest.mark.parametrize(
+    "filter,expected_inputs",
+    [
+        ("all", ["keep 1", "keep 2", "drop 3", "keep 4", "keep 5"]),
+        ("tag::b", ["keep 1", "drop 3", "keep 4"]),
+        ("multi_filter::tag::a&tag::b&high_rating", ["keep 1", "drop 3"]),
+        ("tag::missing", []),
+        ("thinking_model", []),
+    ],
+)
+def test_iter_filtered_runs(task_with_runs, index_enabled, filter, expected_inputs):
+    with patch(
+        "kiln_ai.datamodel.run_index.task_run_index_enabled",
+        return_value=index_enabled,
+    ):
+        dataset_filter = dataset_filter_from_id(filter)
+        runs = list(iter_filtered_runs(task_with_runs, dataset_filter))
+        assert sorted(run.input for run in runs) == sorted(expected_inputs)
+        assert filtered_run_ids(task_with_runs, dataset_filter) == {
+            run.id for run in runs
+        }
+
+
+@pytest.mark.parametrize("index_enabled", [False, True])
+def test_iter_filtered_runs_with_residual(task_with_runs, index_enabled):
+    multi = MultiDatasetFilter("multi_filter::tag::b&high_rating")
+    multi.filters.append(custom_filter)
+    with patch(
+        "kiln_ai.datamodel.run_index.task_run_index_enabled",
+        return_value=index_enabled,
+    ):
+        runs = list(iter_filtered_runs(task_with_runs, multi))
+        assert [run.input for run in runs] == ["keep 1"]
+        assert filtered_run_ids(task_with_runs, multi) == {runs[0].id}
+
+
+def test_indexed_filter_loads_only_matches(task_with_runs):
+    with patch("kiln_ai.datamodel.run_index.task_run_index_enabled", return_value=True):
+        # Built once, as a list view would
+        TaskRunIndex(task_with_runs.path).refresh()
+        dataset_filter = dataset_filter_from_id("multi_filter::tag::b&high_rating")
+        with patch.object(
+            TaskRun, "load_from_file", wraps=TaskRun.load_from_file
+        ) as load_from_file:
+            runs = list(iter_filtered_runs(task_with_runs, dataset_filter))
+            assert len(runs) == 2
+            assert load_from_file.call_count == 2
+
+            load_from_file.reset_mock()
+            assert len(filtered_run_ids(task_with_runs, dataset_filter)) == 2
+            load_from_file.assert_not_called()
@@ -1,5 +1,6 @@
 import json
 import sys
+from unittest.mock import patch
 
 import pytest
 from pydantic import ValidationError
@@ -16,8 +17,11 @@ from kiln_ai.datamodel import (
     TaskOutputRatingType,
     TaskRequirement,
     TaskRun,
+    TaskRunSummary,
     Usage,
 )
+from kiln_ai.datamodel.model_cache import ModelCache
+from kiln_ai.datamodel.task_run import SUMMARY_PREVIEW_LENGTH
 
 
 @pytest.fixture
@@ -797,3 +801,109 @@ def test_usage_model_in_task_run(valid_task_run):
     assert task_run.usage.output_tokens == 50
     assert task_run.usage.total_tokens == 150
     assert task_run.usage.cost == 0.002
+
+
+@pytest.fixture
+def saved_synthetic_run(tmp_path):
+    task = Task(
+        name="Test Task",
+        instruction="test instruction",
+        path=tmp_path / Task.base_filename(),
+    )
+    task.save_to_file()
+    task_run = TaskRun(
+        parent=task,
+        input="i" * 2000,
+        input_source=DataSource(
+            type=DataSourceType.human,
+            properties={"created_by": "John Doe"},
+        ),
+        output=TaskOutput(
+            output="Test output",
+            source=DataSource(
+                type=DataSourceType.synthetic,
+                properties={
+                    "model_name": "gpt_4o",
+                    "model_provider": "openai",
+                    "adapter_name": "langchain_adapter",
+                },
+            ),
+            rating=TaskOutputRating(value=4.0),
+        ),
+        repair_instructions="make it better",
+        repaired_output=TaskOutput(
+            output="Better output",
+            source=DataSource(
+                type=DataSourceType.human,
+                properties={"created_by": "John Doe"},
+            ),
+        ),
+        tags=["a", "b"],
+    )
+    task_run.save_to_file()
+    return task_run
+
+
+def test_load_summary_matches_full_run(saved_synthetic_run):
+    summary = TaskRun.load_summary(saved_synthetic_run.path)
+
+    assert summary == TaskRunSummary.from_run(saved_synthetic_run)
+    assert summary.id == saved_synthetic_run.id
+    assert summary.path == saved_synthetic_run.path
+    assert summary.created_at == saved_synthetic_run.created_at
+    assert summary.tags == ["a", "b"]
+    assert summary.input_preview == "i" * SUMMARY_PREVIEW_LENGTH
+    assert summary.output_preview == "Test output"
+    assert summary.rating is not None
+    assert summary.rating.value == 4.0
+    assert summary.has_repair_instructions is True
+    assert summary.repaired is True
+    assert summary.model_name == "gpt_4o"
+    assert summary.input_source_type == DataSourceType.human
+
+
+def test_load_summary_skips_full_validation(saved_synthetic_run):
+    with patch.object(TaskRun, "model_validate") as mock_validate:
+        TaskRun.load_summary(saved_synthetic_run.path)
+        mock_validate.assert_not_called()
+
+
+def test_load_summary_upgrades_legacy_rating(saved_synthetic_run):
+    data = json.loads(saved_synthetic_run.path.read_text())
+    data["output"]["rating"]["requirement_ratings"] = {"req_1": 5}
+    saved_synthetic_run.path.write_text(json.dumps(data))
+
+    summary = TaskRun.load_summary(saved_synthetic_run.path)
+    assert summary.rating is not None
+    assert summary.rating.requirement_ratings["req_1"].value == 5
+
+
+def test_load_summary_wrong_model_type(saved_synthetic_run):
+    data = json.loads(saved_synthetic_run.path.read_text())
+    data["model_type"] = "task"
+    saved_synthetic_run.path.write_text(json.dumps(data))
+
+    # Falls through to the full loader, which reports the error
+    with pytest.raises(ValueError, match="model type is incorrect"):
+        TaskRun.load_summary(saved_synthetic_run.path)
+
+
+def test_load_summary_cached(saved_synthetic_run):
+    cache = ModelCache()
+    cache._enabled = True
+    with patch("kiln_ai.datamodel.task_run.summary_cache", return_value=cache):
+        first = TaskRun.load_summary(saved_synthetic_run.path)
+        with patch.object(TaskRunSummary, "from_file_data") as mock_from_file_data:
+            assert TaskRun.load_summary(saved_synthetic_run.path) is first
+            mock_from_file_data.assert_not_called()
+
+
+def test_load_summary_after_schema_bump(saved_synthetic_run):
+    # Files from an older schema version go through the full loader
+    with (
+        patch.object(TaskRun, "max_schema_version", return_value=2),
+        patch.object(TaskRunSummary, "from_file_data") as mock_from_file_data,
+    ):
+        summary = TaskRun.load_summary(saved_synthetic_run.path)
+    mock_from_file_data.assert_not_called()
+    assert summary == TaskRunSummary.from_run(saved_synthetic_run)
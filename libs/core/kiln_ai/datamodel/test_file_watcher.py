@@ -0,0 +1,92 @@
+import struct
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+from kiln_ai.datamodel.file_watcher import InotifyWatcher
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is Linux only"
+)
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def changes():
+    return []
+
+
+@pytest.fixture
+def watcher(changes):
+    watcher = InotifyWatcher(changes.append)
+    yield watcher
+    watcher.close()
+
+
+def test_reports_file_changes(tmp_path, watcher, changes):
+    file_path = tmp_path / "model.kiln"
+    file_path.write_text("{}")
+    assert watcher.watch(tmp_path)
+    assert watcher.is_watching(tmp_path)
+
+    file_path.write_text('{"a": 1}')
+    assert wait_for(lambda: file_path in changes)
+
+
+def test_reports_deleted_directory(tmp_path, watcher, changes):
+    directory = tmp_path / "run"
+    directory.mkdir()
+    (directory / "model.kiln").write_text("{}")
+    assert watcher.watch(directory)
+
+    (directory / "model.kiln").unlink()
+    directory.rmdir()
+    assert wait_for(lambda: directory in changes)
+    assert not watcher.is_watching(directory)
+
+
+def test_unwatch_stops_reporting(tmp_path, watcher, changes):
+    assert watcher.watch(tmp_path)
+    watcher.unwatch(tmp_path)
+    assert not watcher.is_watching(tmp_path)
+
+    (tmp_path / "model.kiln").write_text("{}")
+    time.sleep(0.1)
+    assert changes == []
+
+
+def test_watch_missing_directory(tmp_path, watcher):
+    assert watcher.watch(tmp_path / "missing") is False
+
+
+def test_watch_after_close(tmp_path, watcher):
+    watcher.close()
+    assert watcher.watch(tmp_path) is False
+
+
+def test_not_available_off_linux():
+    with patch("kiln_ai.datamodel.file_watcher.sys.platform", "darwin"):
+        with pytest.raises(OSError, match="only available on Linux"):
+            InotifyWatcher(lambda path: None)
+
+
+def test_overflow_reports_none(watcher, changes):
+    # wd, mask (IN_Q_OVERFLOW), cookie, len
+    watcher._handle_events(struct.pack("iIII", -1, 0x4000, 0, 0))
+    assert changes == [None]
+
+
+def test_ignores_unknown_watch(watcher, changes):
+    name = b"model.kiln\0\0"
+    watcher._handle_events(struct.pack("iIII", 999, 0x2, 0, len(name)) + name)
+    assert changes == []
@@ -1,9 +1,16 @@
+import json
+import time
+from unittest.mock import patch
+
 import jsonschema
 import pytest
 from pydantic import BaseModel
 
 from kiln_ai.datamodel.json_schema import (
+    VALIDATOR_CACHE_SIZE,
     JsonObjectSchema,
+    compiled_validator,
+    generate_fast_validator,
     schema_from_json_str,
     string_to_json_key,
     validate_schema,
@@ -165,3 +172,155 @@ def test_triangle_schema():
 )
 def test_string_to_json_key(input_str: str, expected: str):
     assert string_to_json_key(input_str) == expected
+
+
+def test_compiled_validator_cached():
+    compiled_validator.cache_clear()
+    with patch(
+        "kiln_ai.datamodel.json_schema.jsonschema.Draft202012Validator",
+        wraps=jsonschema.Draft202012Validator,
+    ) as validator_class:
+        for _ in range(3):
+            validate_schema({"a": 1, "b": 2, "c": 3}, json_triangle_schema)
+        assert validator_class.call_count == 1
+
+    # Invalid schemas raise every time, and aren't cached
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            compiled_validator("{asdf")
+    assert compiled_validator.cache_info().currsize == 1
+
+
+def test_compiled_validator_cache_bounded():
+    compiled_validator.cache_clear()
+    for i in range(VALIDATOR_CACHE_SIZE + 10):
+        schema = {"type": "object", "properties": {f"p{i}": {"type": "string"}}}
+        validate_schema({f"p{i}": "x"}, json.dumps(schema))
+    assert compiled_validator.cache_info().currsize == VALIDATOR_CACHE_SIZE
+
+
+def test_generate_fast_validator_unsupported_schemas():
+    # anyOf isn't supported
+    assert generate_fast_validator(json.loads(json_joke_schema)) is None
+    assert (
+        generate_fast_validator(
+            {"type": "object", "properties": {"a": {"type": "string", "minLength": 2}}}
+        )
+        is None
+    )
+    assert (
+        generate_fast_validator(
+            {"type": "object", "properties": {"a": {"type": ["string", "null"]}}}
+        )
+        is None
+    )
+    assert (
+        generate_fast_validator(
+            {"type": "object", "properties": {"a": {"type": "array"}}}
+        )
+        is None
+    )
+    assert generate_fast_validator(json.loads(json_triangle_schema)) is not None
+
+
+fast_schema = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "description": "A name"},
+        "count": {"type": "integer"},
+        "score": {"type": "number"},
+        "flag": {"type": "boolean"},
+        "nothing": {"type": "null"},
+        "anything": {"title": "Anything"},
+    },
+    "required": ["name", "count"],
+}
+
+
+@pytest.mark.parametrize("additional_properties", [None, True, False])
+@pytest.mark.parametrize(
+    "instance",
+    [
+        {"name": "a", "count": 1},
+        {"name": "a", "count": 1.0},
+        {"name": "a", "count": 1.5},
+        {"name": "a", "count": True},
+        {"name": "a", "count": "1"},
+        {"name": 1, "count": 1},
+        {"name": "a"},
+        {"count": 1},
+        {"name": "a", "count": 1, "score": 1},
+        {"name": "a", "count": 1, "score": 0.5},
+        {"name": "a", "count": 1, "score": False},
+        {"name": "a", "count": 1, "score": "0.5"},
+        {"name": "a", "count": 1, "flag": True},
+        {"name": "a", "count": 1, "flag": 0},
+        {"name": "a", "count": 1, "nothing": None},
+        {"name": "a", "count": 1, "nothing": 0},
+        {"name": "a", "count": 1, "anything": [1, {"x": None}]},
+        {"name": "a", "count": 1, "extra": 1},
+        {"name": None, "count": None},
+        [],
+        "name",
+        None,
+    ],
+)
+def test_fast_validator_matches_jsonschema(instance, additional_properties):
+    schema = dict(fast_schema)
+    if additional_properties is not None:
+        schema["additionalProperties"] = additional_properties
+    fast_validator = generate_fast_validator(schema)
+    assert fast_validator is not None
+    jsonschema_valid = jsonschema.Draft202012Validator(schema).is_valid(instance)
+    assert fast_validator(instance) == jsonschema_valid
+
+    # Errors always come from jsonschema
+    if jsonschema_valid:
+        validate_schema(instance, json.dumps(schema))
+    else:
+        with pytest.raises(jsonschema.exceptions.ValidationError):
+            validate_schema(instance, json.dumps(schema))
+
+
+def test_fast_validator_quoted_property_names():
+    schema = {
+        "type": "object",
+        "properties": {'it\'s "quoted"\n': {"type": "string"}},
+        "required": ['it\'s "quoted"\n'],
+    }
+    fast_validator = generate_fast_validator(schema)
+    assert fast_validator is not None
+    assert fast_validator({'it\'s "quoted"\n': "x"})
+    assert not fast_validator({'it\'s "quoted"\n': 1})
+    assert not fast_validator({})
+
+
+@pytest.mark.benchmark
+def test_benchmark_validate_schema():
+    instances = [{"a": i, "b": i + 1, "c": i + 2} for i in range(1_000)]
+
+    # The previous implementation: parse the schema and build a validator for every call
+    start = time.perf_counter()
+    for instance in instances:
+        jsonschema.Draft202012Validator(
+            schema_from_json_str(json_triangle_schema)
+        ).validate(instance)
+    uncached_time = time.perf_counter() - start
+
+    validator, _ = compiled_validator(json_triangle_schema)
+    start = time.perf_counter()
+    for instance in instances:
+        validator.validate(instance)
+    cached_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for instance in instances:
+        validate_schema(instance, json_triangle_schema)
+    fast_time = time.perf_counter() - start
+
+    print(
+        f"1k validations. Uncached: {uncached_time:.3f}s, cached validator: {cached_time:.3f}s ({uncached_time / cached_time:.1f}x), "
+        f"fast validator: {fast_time:.3f}s ({uncached_time / fast_time:.1f}x)"
+    )
+    assert cached_time < uncached_time
+    assert fast_time < cached_time
@@ -1,10 +1,12 @@
+import sys
+import time
 from pathlib import Path
 from unittest import mock
 
 import pytest
 from pydantic import BaseModel
 
-from libs.core.kiln_ai.datamodel.model_cache import ModelCache
+from libs.core.kiln_ai.datamodel.model_cache import ModelCache, structural_copy
 
 
 # Define a simple Pydantic model for testing
@@ -13,6 +15,13 @@ class ModelTest(BaseModel):
     value: int
 
 
+class NestedModelTest(BaseModel):
+    name: str
+    child: ModelTest
+    tags: list[str]
+    properties: dict[str, ModelTest]
+
+
 @pytest.fixture
 def model_cache():
     return ModelCache()
@@ -180,6 +189,51 @@ def test_get_model_returns_copy(model_cache, test_path):
     assert updated_cached_model.value == 123
 
 
+def test_get_model_copy_isolates_nested_mutation(model_cache, test_path):
+    model_cache._enabled = True
+    model = NestedModelTest(
+        name="parent",
+        child=ModelTest(name="child", value=1),
+        tags=["a"],
+        properties={"p": ModelTest(name="prop", value=2)},
+    )
+    model_cache.set_model(test_path, model, test_path.stat().st_mtime_ns)
+
+    cached_model = model_cache.get_model(test_path, NestedModelTest)
+    assert cached_model is not None
+    assert cached_model == model
+
+    # In-place edits of nested models and containers don't reach the cache
+    cached_model.child.value = 100
+    cached_model.tags.append("b")
+    cached_model.properties["p"].name = "mutated"
+    cached_model.properties["q"] = ModelTest(name="new", value=3)
+
+    assert model.child.value == 1
+    assert model.tags == ["a"]
+    assert model.properties["p"].name == "prop"
+    assert "q" not in model.properties
+
+
+def test_structural_copy_shares_immutable_leaves():
+    model = NestedModelTest(
+        name="parent" * 100,
+        child=ModelTest(name="child", value=1),
+        tags=["a"],
+        properties={},
+    )
+    copy = structural_copy(model)
+
+    assert copy == model
+    assert copy.model_fields_set == model.model_fields_set
+    assert copy.child is not model.child
+    assert copy.tags is not model.tags
+    assert copy.properties is not model.properties
+    # Strings are immutable, so they're shared rather than copied
+    assert copy.name is model.name
+    assert copy.child.name is model.child.name
+
+
 def test_no_cache_when_no_fine_granularity(model_cache, test_path):
     model = ModelTest(name="test", value=123)
     mtime_ns = test_path.stat().st_mtime_ns
@@ -266,3 +320,219 @@ def test_get_model_readonly(model_cache, test_path):
 
     # Both should have the same data
     assert readonly_model == copied_model == model
+
+
+def make_test_files(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"model_{i}.kiln"
+        path.touch()
+        paths.append(path)
+    return paths
+
+
+def test_lru_eviction_max_entries(tmp_path):
+    cache = ModelCache(max_entries=2)
+    cache._enabled = True
+
+    paths = make_test_files(tmp_path, 3)
+    for i, path in enumerate(paths[:2]):
+        cache.set_model(path, ModelTest(name=f"m{i}", value=i), path.stat().st_mtime_ns)
+
+    # Touch the first entry, so the second is least recently used
+    assert cache.get_model(paths[0], ModelTest, readonly=True) is not None
+
+    cache.set_model(
+        paths[2], ModelTest(name="m2", value=2), paths[2].stat().st_mtime_ns
+    )
+
+    assert list(cache.model_cache.keys()) == [paths[0], paths[2]]
+    assert cache.get_model(paths[1], ModelTest) is None
+    assert cache.stats().evictions == 1
+
+
+def test_lru_eviction_max_bytes(tmp_path):
+    cache = ModelCache(max_bytes=250)
+    cache._enabled = True
+
+    paths = make_test_files(tmp_path, 3)
+    for i, path in enumerate(paths):
+        cache.set_model(
+            path, ModelTest(name=f"m{i}", value=i), path.stat().st_mtime_ns, 100
+        )
+
+    assert list(cache.model_cache.keys()) == [paths[1], paths[2]]
+    stats = cache.stats()
+    assert stats.entries == 2
+    assert stats.estimated_bytes == 200
+    assert stats.evictions == 1
+
+    # Invalidation and replacing entries keep the byte estimate accurate
+    cache.invalidate(paths[1])
+    cache.set_model(paths[2], ModelTest(name="m2", value=2), 0, 50)
+    assert cache.stats().estimated_bytes == 50
+    cache.clear()
+    assert cache.stats().estimated_bytes == 0
+
+
+def test_unbounded_by_default(tmp_path):
+    cache = ModelCache()
+    cache._enabled = True
+
+    paths = make_test_files(tmp_path, 50)
+    for i, path in enumerate(paths):
+        cache.set_model(path, ModelTest(name="m", value=i), 0, 10_000_000)
+    assert len(cache.model_cache) == 50
+    assert cache.stats().evictions == 0
+
+
+def test_hit_miss_counters(model_cache, test_path):
+    model_cache._enabled = True
+
+    assert model_cache.get_model(test_path, ModelTest) is None
+    model_cache.set_model(
+        test_path, ModelTest(name="test", value=1), test_path.stat().st_mtime_ns
+    )
+    assert model_cache.get_model(test_path, ModelTest) is not None
+    assert model_cache.get_model_id(test_path, ModelTest) is None
+
+    # Stale entries count as a miss
+    model_cache.set_model(test_path, ModelTest(name="test", value=1), 0)
+    assert model_cache.get_model(test_path, ModelTest) is None
+
+    stats = model_cache.stats()
+    assert stats.hits == 2
+    assert stats.misses == 2
+    assert stats.entries == 0
+
+
+def test_unvalidated_models_only_for_trusted_lookups(model_cache, test_path):
+    model_cache._enabled = True
+    mtime_ns = test_path.stat().st_mtime_ns
+    model_cache.set_model(
+        test_path, ModelTest(name="test", value=1), mtime_ns, validated=False
+    )
+
+    assert model_cache.get_model(test_path, ModelTest, trusted=True) is not None
+    assert model_cache.get_model_id(test_path, ModelTest) is None
+    # A normal lookup misses, but keeps the entry for trusted lookups
+    assert model_cache.get_model(test_path, ModelTest, readonly=True) is None
+    assert model_cache.get_model(test_path, ModelTest, trusted=True) is not None
+    assert model_cache.stats().misses == 1
+    # Not shared with later processes
+    model_cache.enable_snapshot(test_path.parent / "snapshot", save_at_exit=False)
+    assert model_cache.save_snapshot() == 0
+
+    # Replaced by a validated load
+    model_cache.set_model(test_path, ModelTest(name="test", value=2), mtime_ns)
+    cached = model_cache.get_model(test_path, ModelTest)
+    assert cached is not None and cached.value == 2
+
+
+def test_shared_uses_config_budget():
+    with (
+        mock.patch.object(ModelCache, "_shared_instance", None),
+        mock.patch("libs.core.kiln_ai.datamodel.model_cache.Config") as mock_config,
+    ):
+        mock_config.shared.return_value.model_cache_max_entries = 10
+        mock_config.shared.return_value.model_cache_max_bytes = 1000
+        cache = ModelCache.shared()
+        assert cache.max_entries == 10
+        assert cache.max_bytes == 1000
+        assert cache._watcher is None
+
+
+@pytest.fixture
+def watched_cache():
+    if not sys.platform.startswith("linux"):
+        pytest.skip("inotify is Linux only")
+    cache = ModelCache()
+    cache._enabled = True
+    assert cache.enable_file_watcher()
+    yield cache
+    cache.disable_file_watcher()
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_watched_cache_hit_skips_stat(watched_cache, test_path):
+    watched_cache.set_model(
+        test_path, ModelTest(name="test", value=1), test_path.stat().st_mtime_ns
+    )
+    with mock.patch.object(Path, "stat", side_effect=AssertionError("no stat")):
+        assert watched_cache.get_model(test_path, ModelTest) is not None
+
+
+def test_watched_cache_invalidated_on_change(watched_cache, test_path):
+    watched_cache.set_model(
+        test_path, ModelTest(name="test", value=1), test_path.stat().st_mtime_ns
+    )
+    test_path.write_text("changed")
+    assert wait_for(lambda: test_path not in watched_cache.model_cache)
+    assert watched_cache.get_model(test_path, ModelTest) is None
+    # No longer watched once nothing in the directory is cached
+    assert watched_cache._watched_dirs == {}
+
+
+def test_watched_cache_stale_on_set_is_not_trusted(watched_cache, test_path):
+    # Changed between the read (mtime 0) and the watch starting: keeps using mtime checks
+    watched_cache.set_model(test_path, ModelTest(name="test", value=1), 0)
+    assert test_path not in watched_cache._trusted_paths
+    assert watched_cache.get_model(test_path, ModelTest) is None
+
+
+def test_watched_cache_overflow_falls_back_to_mtime(watched_cache, test_path):
+    watched_cache.set_model(
+        test_path, ModelTest(name="test", value=1), test_path.stat().st_mtime_ns
+    )
+    watched_cache._on_file_change(None)
+    assert watched_cache._trusted_paths == set()
+    with mock.patch.object(Path, "stat", wraps=test_path.stat) as mock_stat:
+        assert watched_cache.get_model(test_path, ModelTest) is not None
+        mock_stat.assert_called()
+
+
+def test_watched_cache_eviction_unwatches(tmp_path):
+    if not sys.platform.startswith("linux"):
+        pytest.skip("inotify is Linux only")
+    cache = ModelCache(max_entries=1)
+    cache._enabled = True
+    assert cache.enable_file_watcher()
+    try:
+        paths = [tmp_path / "a" / "model.kiln", tmp_path / "b" / "model.kiln"]
+        for path in paths:
+            path.parent.mkdir()
+            path.write_text("{}")
+            cache.set_model(path, ModelTest(name="m", value=1), path.stat().st_mtime_ns)
+        assert set(cache._watched_dirs) == {paths[1].parent}
+        assert cache._trusted_paths == {paths[1]}
+        assert cache._watcher is not None
+        assert not cache._watcher.is_watching(paths[0].parent)
+    finally:
+        cache.disable_file_watcher()
+
+
+def test_file_watcher_unavailable(model_cache, test_path):
+    model_cache._enabled = True
+    with (
+        mock.patch(
+            "libs.core.kiln_ai.datamodel.model_cache.InotifyWatcher",
+            side_effect=OSError("not here"),
+        ),
+        pytest.warns(UserWarning, match="File watcher unavailable"),
+    ):
+        assert model_cache.enable_file_watcher() is False
+
+    # Falls back to the mtime check
+    model_cache.set_model(
+        test_path, ModelTest(name="test", value=1), test_path.stat().st_mtime_ns
+    )
+    assert model_cache._trusted_paths == set()
+    assert model_cache.get_model(test_path, ModelTest) is not None
@@ -0,0 +1,203 @@
+import os
+import pickle
+from unittest import mock
+
+import pytest
+from pydantic import BaseModel
+
+from kiln_ai.datamodel import Project, Task
+from kiln_ai.datamodel.model_cache import ModelCache
+from kiln_ai.datamodel.model_cache_snapshot import MAGIC, ModelCacheSnapshot
+
+
+class SnapshotModelTest(BaseModel):
+    name: str
+    value: int
+
+
+@pytest.fixture
+def new_cache():
+    # Force the cache on, even on filesystems with coarse timestamps: tests set distinct mtimes
+    with mock.patch.object(
+        ModelCache, "_check_timestamp_granularity", return_value=True
+    ):
+        yield ModelCache
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return tmp_path / "settings" / "model_cache.snapshot"
+
+
+def write_model_file(path, value: int):
+    path.write_text(f"contents {value}")
+    os.utime(path, ns=(1_000_000_000 * value, 1_000_000_000 * value))
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def test_restores_unchanged_models(new_cache, tmp_path, snapshot_path):
+    paths = [tmp_path / f"model_{i}.kiln" for i in range(3)]
+    cache = new_cache()
+    cache.enable_snapshot(snapshot_path, save_at_exit=False)
+    for i, path in enumerate(paths):
+        mtime_ns, size = write_model_file(path, i + 1)
+        cache.set_model(
+            path, SnapshotModelTest(name=path.name, value=i), mtime_ns, size
+        )
+    assert cache.save_snapshot() == 3
+    assert snapshot_path.read_bytes().startswith(MAGIC)
+
+    # One file changes while the process is down
+    write_model_file(paths[1], 10)
+
+    restarted = new_cache()
+    restarted.enable_snapshot(snapshot_path, save_at_exit=False)
+    restored = restarted.get_model(paths[0], SnapshotModelTest)
+    assert restored == SnapshotModelTest(name="model_0.kiln", value=0)
+    assert restarted.get_model(paths[1], SnapshotModelTest) is None
+    assert restarted.get_model(paths[2], SnapshotModelTest) is not None
+    stats = restarted.stats()
+    assert stats.snapshot_restores == 2
+    assert stats.entries == 2
+
+    # Restored once, then served from memory
+    assert restarted.get_model(paths[0], SnapshotModelTest) is not None
+    assert restarted.stats().snapshot_restores == 2
+
+
+def test_unused_entries_carried_over(new_cache, tmp_path, snapshot_path):
+    used, unused, deleted = (tmp_path / f"{name}.kiln" for name in ["a", "b", "c"])
+    cache = new_cache()
+    cache.enable_snapshot(snapshot_path, save_at_exit=False)
+    for i, path in enumerate([used, unused, deleted]):
+        mtime_ns, size = write_model_file(path, i + 1)
+        cache.set_model(
+            path, SnapshotModelTest(name=path.name, value=i), mtime_ns, size
+        )
+    cache.save_snapshot()
+    deleted.unlink()
+
+    restarted = new_cache()
+    restarted.enable_snapshot(snapshot_path, save_at_exit=False)
+    assert restarted.get_model(used, SnapshotModelTest) is not None
+    assert restarted.save_snapshot() == 2
+
+    third = new_cache()
+    third.enable_snapshot(snapshot_path, save_at_exit=False)
+    assert third.get_model(unused, SnapshotModelTest) is not None
+    assert third.get_model(used, SnapshotModelTest) is not None
+
+
+def test_invalidated_entries_not_restored(new_cache, tmp_path, snapshot_path):
+    path = tmp_path / "model.kiln"
+    cache = new_cache()
+    cache.enable_snapshot(snapshot_path, save_at_exit=False)
+    mtime_ns, size = write_model_file(path, 1)
+    cache.set_model(path, SnapshotModelTest(name="a", value=1), mtime_ns, size)
+    cache.save_snapshot()
+
+    restarted = new_cache()
+    restarted.enable_snapshot(snapshot_path, save_at_exit=False)
+    # eg. saved by this process, with the same mtime and size by chance
+    restarted.invalidate(path)
+    assert restarted.get_model(path, SnapshotModelTest) is None
+    assert restarted.save_snapshot() == 0
+
+
+def test_reads_models_by_offset(tmp_path, snapshot_path):
+    paths = [tmp_path / f"model_{i}.kiln" for i in range(3)]
+    models = []
+    for i, path in enumerate(paths):
+        mtime_ns, size = write_model_file(path, i + 1)
+        models.append(
+            (path, SnapshotModelTest(name=path.name, value=i), mtime_ns, size)
+        )
+    ModelCacheSnapshot(snapshot_path).write(models)
+
+    snapshot = ModelCacheSnapshot(snapshot_path)
+    with mock.patch("builtins.open", wraps=open) as mock_open:
+        restored = snapshot.take(paths[1])
+        assert restored is not None
+        assert restored[0] == models[1][1]
+        # Later entries are read from the open file
+        assert snapshot.take(paths[2]) is not None
+        assert mock_open.call_count == 1
+    assert snapshot._file is not None
+    assert not hasattr(snapshot, "_data")
+
+    # Closed once every entry is restored or invalidated
+    snapshot.discard(paths[0])
+    assert snapshot._file is None
+    assert snapshot.take(paths[0]) is None
+
+
+def test_max_entries_keeps_most_recent(new_cache, tmp_path, snapshot_path):
+    paths = [tmp_path / f"model_{i}.kiln" for i in range(4)]
+    cache = new_cache(max_entries=2)
+    cache.enable_snapshot(snapshot_path, save_at_exit=False)
+    for i, path in enumerate(paths):
+        mtime_ns, size = write_model_file(path, i + 1)
+        cache.set_model(
+            path, SnapshotModelTest(name=path.name, value=i), mtime_ns, size
+        )
+    assert cache.save_snapshot() == 2
+
+    restarted = new_cache()
+    restarted.enable_snapshot(snapshot_path, save_at_exit=False)
+    assert restarted.get_model(paths[3], SnapshotModelTest) is not None
+    assert restarted.get_model(paths[0], SnapshotModelTest) is None
+
+
+def test_ignores_snapshot_from_other_code(new_cache, tmp_path, snapshot_path):
+    path = tmp_path / "model.kiln"
+    cache = new_cache()
+    cache.enable_snapshot(snapshot_path, save_at_exit=False)
+    mtime_ns, size = write_model_file(path, 1)
+    cache.set_model(path, SnapshotModelTest(name="a", value=1), mtime_ns, size)
+    cache.save_snapshot()
+
+    restarted = new_cache()
+    restarted.enable_snapshot(snapshot_path, save_at_exit=False)
+    with mock.patch(
+        "kiln_ai.datamodel.model_cache_snapshot.code_fingerprint",
+        return_value="different",
+    ):
+        assert restarted.get_model(path, SnapshotModelTest) is None
+
+
+@pytest.mark.parametrize("contents", [b"", b"not a snapshot", MAGIC + b"\xff" * 20])
+def test_ignores_invalid_snapshot(snapshot_path, tmp_path, contents):
+    snapshot_path.parent.mkdir(parents=True)
+    snapshot_path.write_bytes(contents)
+    assert ModelCacheSnapshot(snapshot_path).take(tmp_path / "model.kiln") is None
+
+
+def test_missing_snapshot(snapshot_path, tmp_path):
+    snapshot = ModelCacheSnapshot(snapshot_path)
+    assert snapshot.take(tmp_path / "model.kiln") is None
+    assert snapshot.write([]) == 0
+    assert snapshot_path.exists()
+
+
+def test_parent_not_snapshotted(snapshot_path, tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    assert task.path is not None
+    stat = task.path.stat()
+
+    ModelCacheSnapshot(snapshot_path).write(
+        [(task.path, task, stat.st_mtime_ns, stat.st_size)]
+    )
+    restored = ModelCacheSnapshot(snapshot_path).take(task.path)
+    assert restored is not None
+    restored_task = restored[0]
+    assert isinstance(restored_task, Task)
+    assert restored_task.cached_parent() is None
+    assert restored_task.name == "Test Task"
+    # The original keeps its parent
+    assert task.cached_parent() is project
+    # Sanity check the restored model is a working model
+    assert pickle.loads(pickle.dumps(restored_task)) == restored_task
@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 from pydantic import Field, ValidationError
 
@@ -204,3 +206,104 @@ def test_validation_error_in_c_level_length():
         ModelA.validate_and_save_with_subrelations(data)
 
     assert "String should match pattern" in str(exc_info.value)
+
+
+def test_iter_children_is_lazy(tmp_path):
+    root_path = tmp_path / "model_a.kiln"
+    data = {
+        "name": "Root",
+        "bs": [{"value": 10}, {"value": 20}, {"value": 30}],
+    }
+    instance = ModelA.validate_and_save_with_subrelations(data, path=root_path)
+
+    # Same children, in the same order, as the list accessor
+    assert [b.id for b in instance.iter_bs()] == [b.id for b in instance.bs()]
+
+    # Children are only loaded as the iterator is consumed
+    with patch.object(
+        ModelB, "load_from_file", wraps=ModelB.load_from_file
+    ) as mock_load:
+        iterator = instance.iter_bs(readonly=True)
+        mock_load.assert_not_called()
+        first = next(iterator)
+        assert first.value in (10, 20, 30)
+        assert mock_load.call_count == 1
+
+
+def test_iter_children_unsaved_parent():
+    instance = ModelA(name="Root")
+    assert list(instance.iter_bs()) == []
+
+
+def test_validates_each_model_once(tmp_path):
+    data = {
+        "name": "Root",
+        "bs": [{"value": 10, "cs": [{"code": "ABC"}, {"code": "DEF"}]}],
+    }
+    with (
+        patch.object(
+            ModelA, "model_validate", wraps=ModelA.model_validate
+        ) as mock_validate_a,
+        patch.object(
+            ModelC, "model_validate", wraps=ModelC.model_validate
+        ) as mock_validate_c,
+    ):
+        ModelA.validate_and_save_with_subrelations(
+            data, path=tmp_path / "root" / "model_a.kiln"
+        )
+    assert mock_validate_a.call_count == 1
+    assert mock_validate_c.call_count == 2
+
+
+def test_save_leaves_no_staging_folder(tmp_path):
+    root_path = tmp_path / "root" / "model_a.kiln"
+    data = {"name": "Root", "bs": [{"value": 10, "cs": [{"code": "ABC"}]}]}
+    ModelA.validate_and_save_with_subrelations(data, path=root_path)
+    assert [p.name for p in tmp_path.iterdir()] == ["root"]
+
+    # Saving into an existing folder merges into it
+    data = {"name": "Root", "bs": [{"value": 20}]}
+    instance = ModelA.validate_and_save_with_subrelations(data, path=root_path)
+    assert [p.name for p in tmp_path.iterdir()] == ["root"]
+    assert sorted(b.value for b in instance.bs()) == [10, 20]
+
+
+def test_failed_save_persists_nothing(tmp_path):
+    root_path = tmp_path / "root" / "model_a.kiln"
+    data = {
+        "name": "Root",
+        "bs": [{"value": 10, "cs": [{"code": "ABC"}, {"code": "DEF"}]}],
+    }
+
+    original_open = open
+    writes = 0
+
+    def failing_open(file, mode="r", *args, **kwargs):
+        nonlocal writes
+        if "w" in mode:
+            writes += 1
+            if writes == 3:
+                raise OSError("disk full")
+        return original_open(file, mode, *args, **kwargs)
+
+    with patch("builtins.open", side_effect=failing_open):
+        with pytest.raises(OSError, match="disk full"):
+            ModelA.validate_and_save_with_subrelations(data, path=root_path)
+
+    assert not root_path.exists()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_children_skip_dot_folders(tmp_path):
+    root_path = tmp_path / "model_a.kiln"
+    data = {"name": "Root", "bs": [{"value": 10}]}
+    instance = ModelA.validate_and_save_with_subrelations(data, path=root_path)
+
+    # Simulate a staging folder left behind by a crash
+    child_path = instance.bs()[0].path
+    assert child_path is not None
+    staging = child_path.parent.parent / f".{child_path.parent.name}.abc.tmp"
+    staging.mkdir()
+    (staging / child_path.name).write_text(child_path.read_text())
+
+    assert len(list(ModelB.iterate_children_paths_of_parent_path(root_path))) == 1
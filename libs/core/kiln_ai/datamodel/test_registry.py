@@ -1,9 +1,21 @@
+import os
 from unittest.mock import Mock, patch
 
 import pytest
 
 from kiln_ai.datamodel import Project
-from kiln_ai.datamodel.registry import all_projects, project_from_id
+from kiln_ai.datamodel.registry import (
+    ProjectRegistryIndex,
+    all_projects,
+    project_from_id,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_registry_index():
+    ProjectRegistryIndex.shared().clear()
+    yield
+    ProjectRegistryIndex.shared().clear()
 
 
 @pytest.fixture
@@ -94,3 +106,56 @@ def test_project_from_id_with_errors(mock_config, mock_project):
         result = project_from_id("target-id")
 
         assert result == project3
+
+
+@pytest.fixture
+def real_projects(tmp_path, mock_config):
+    projects = []
+    for i in range(3):
+        project = Project(
+            name=f"Project {i}", path=tmp_path / f"project_{i}" / "project.kiln"
+        )
+        project.save_to_file()
+        projects.append(project)
+    mock_config.projects = [str(project.path) for project in projects]
+    return projects
+
+
+def test_project_from_id_indexed(real_projects):
+    target = real_projects[2]
+    assert project_from_id(target.id).id == target.id
+
+    # Later lookups load only the matching project
+    with patch(
+        "kiln_ai.datamodel.Project.load_from_file", wraps=Project.load_from_file
+    ) as mock_load:
+        for project in real_projects:
+            assert project_from_id(project.id).id == project.id
+        assert mock_load.call_count == len(real_projects)
+        mock_load.reset_mock()
+
+        assert project_from_id("unknown-id") is None
+        assert mock_load.call_count == len(real_projects)
+
+
+def test_project_from_id_revalidates(real_projects, mock_config):
+    target = real_projects[1]
+    assert project_from_id(target.id) is not None
+
+    # Edited: its file's mtime changed. Rebuilt, finding the new version.
+    target.description = "Edited"
+    target.save_to_file()
+    mtime_ns = target.path.stat().st_mtime_ns + 1_000_000_000
+    os.utime(target.path, ns=(mtime_ns, mtime_ns))
+    assert project_from_id(target.id).description == "Edited"
+
+    # Removed from the projects setting
+    mock_config.projects = [str(real_projects[0].path)]
+    assert project_from_id(target.id) is None
+    assert project_from_id(real_projects[0].id) is not None
+
+    # Deleted
+    mock_config.projects = [str(project.path) for project in real_projects]
+    real_projects[0].path.unlink()
+    assert project_from_id(real_projects[0].id) is None
+    assert project_from_id(real_projects[2].id) is not None
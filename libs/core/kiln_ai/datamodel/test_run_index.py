@@ -0,0 +1,294 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from kiln_ai.datamodel import (
+    DataSource,
+    DataSourceType,
+    Project,
+    Task,
+    TaskOutput,
+    TaskOutputRating,
+    TaskRun,
+    Usage,
+)
+from kiln_ai.datamodel.run_index import INDEX_FILENAME, TaskRunIndex
+from kiln_ai.datamodel.segment_store import migrate_to_segment_store
+
+
+@pytest.fixture
+def enable_index():
+    with patch("kiln_ai.datamodel.run_index.task_run_index_enabled", return_value=True):
+        yield
+
+
+@pytest.fixture
+def task(tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    return task
+
+
+def make_run(
+    task, tags=None, rating=None, reasoning=None, usage=None, **kwargs
+) -> TaskRun:
+    return TaskRun(
+        parent=task,
+        input="test input",
+        input_source=DataSource(
+            type=DataSourceType.human, properties={"created_by": "tester"}
+        ),
+        output=TaskOutput(
+            output="test output",
+            source=DataSource(
+                type=DataSourceType.human, properties={"created_by": "tester"}
+            ),
+            rating=rating,
+        ),
+        intermediate_outputs={"reasoning": reasoning} if reasoning else None,
+        tags=tags or [],
+        usage=usage,
+        **kwargs,
+    )
+
+
+def test_for_task_path_disabled_by_default(task):
+    assert TaskRunIndex.for_task_path(task.path) is None
+
+
+def test_for_task_path_unsaved(enable_index):
+    assert TaskRunIndex.for_task_path(None) is None
+
+
+def test_for_task_path_segment_store(enable_index, task):
+    # Runs in a segment store have no files for the index to stat
+    for _ in range(3):
+        make_run(task).save_to_file()
+    migrate_to_segment_store(task.path, TaskRun)
+    assert TaskRunIndex.for_task_path(task.path) is None
+
+    # Saves to the store skip the index
+    with patch.object(TaskRunIndex, "update_runs") as mock_update_runs:
+        make_run(task).save_to_file()
+        mock_update_runs.assert_not_called()
+
+
+def test_index_next_to_task(enable_index, task):
+    index = TaskRunIndex.for_task_path(task.path)
+    assert index is not None
+    assert index.index_path == task.path.parent / INDEX_FILENAME
+
+
+def test_refresh_indexes_existing_runs(task):
+    # Saved before the index was enabled, so only picked up by refresh
+    run = make_run(
+        task,
+        tags=["fine_tune_a", "golden"],
+        rating=TaskOutputRating(value=5.0),
+        reasoning="thinking...",
+        usage=Usage(input_tokens=10, output_tokens=20, total_tokens=30, cost=0.1),
+    )
+    run.save_to_file()
+
+    index = TaskRunIndex(task.path)
+    entries = index.entries()
+    assert len(entries) == 1
+    entry = entries[0]
+    assert entry.id == run.id
+    assert entry.path == run.path
+    assert entry.created_at == run.created_at
+    assert entry.tags == ["fine_tune_a", "golden"]
+    assert entry.rating_type == "five_star"
+    assert entry.rating_value == 5.0
+    assert entry.high_quality is True
+    assert entry.has_thinking is True
+    assert entry.repaired is False
+    assert entry.usage == run.usage
+    assert entry.mtime_ns == run.path.stat().st_mtime_ns
+
+
+def test_save_and_delete_keep_index_current(enable_index, task):
+    index = TaskRunIndex(task.path)
+    run = make_run(task, tags=["a"])
+    run.save_to_file()
+    assert [e.id for e in index.entries(refresh=False)] == [run.id]
+
+    run.tags = ["b"]
+    run.save_to_file()
+    assert index.tag_counts(refresh=False) == {"b": 1}
+
+    run.delete()
+    assert index.entries(refresh=False) == []
+    assert index.tag_counts(refresh=False) == {}
+
+
+def test_refresh_picks_up_external_changes(task):
+    index = TaskRunIndex(task.path)
+    run1 = make_run(task, tags=["a"])
+    run1.save_to_file()
+    run2 = make_run(task, tags=["a", "b"])
+    run2.save_to_file()
+    assert index.tag_counts() == {"a": 2, "b": 1}
+
+    # Edit a file outside of Kiln
+    assert run1.path is not None
+    data = json.loads(run1.path.read_text())
+    data["tags"] = ["c", "extra_long_tag_so_size_changes"]
+    run1.path.write_text(json.dumps(data))
+    # And remove another
+    assert run2.path is not None
+    run2.path.unlink()
+
+    index.refresh()
+    assert index.tag_counts() == {"c": 1, "extra_long_tag_so_size_changes": 1}
+    assert [e.id for e in index.entries()] == [run1.id]
+
+
+def test_reads_skip_refresh_when_unchanged(task):
+    index = TaskRunIndex(task.path)
+    run = make_run(task, tags=["a"])
+    run.save_to_file()
+    assert index.tag_counts() == {"a": 1}
+
+    with patch.object(
+        TaskRun,
+        "iterate_children_paths_of_parent_path",
+        wraps=TaskRun.iterate_children_paths_of_parent_path,
+    ) as mock_scan:
+        # Nothing changed: no stat of every run
+        assert index.tag_counts() == {"a": 1}
+        assert len(index.query(["a"], [])) == 1
+        mock_scan.assert_not_called()
+
+        # Saved through Kiln
+        other = make_run(task, tags=["b"])
+        other.save_to_file()
+        assert index.tag_counts() == {"a": 1, "b": 1}
+        assert mock_scan.call_count == 1
+
+        # Added outside of Kiln: changes the runs folder
+        assert run.path is not None
+        copied = run.path.parent.parent / "copied" / run.path.name
+        copied.parent.mkdir()
+        copied.write_text(run.path.read_text().replace('"a"', '"c"'))
+        assert index.tag_counts() == {"a": 1, "b": 1, "c": 1}
+        assert mock_scan.call_count == 2
+
+        # Edited outside of Kiln: only picked up once the last refresh is old enough
+        run.path.write_text(run.path.read_text().replace('"a"', '"d"'))
+        assert index.tag_counts() == {"a": 1, "b": 1, "c": 1}
+        with patch("kiln_ai.datamodel.run_index.REFRESH_MAX_AGE_SECONDS", 0):
+            assert index.tag_counts() == {"b": 1, "c": 1, "d": 1}
+        assert mock_scan.call_count == 3
+
+
+def test_refresh_only_parses_changed_files(task):
+    index = TaskRunIndex(task.path)
+    for _ in range(3):
+        make_run(task).save_to_file()
+    assert len(index.entries()) == 3
+
+    with patch.object(TaskRun, "load_from_file") as mock_load:
+        assert len(index.entries()) == 3
+        mock_load.assert_not_called()
+
+
+def test_deleted_index_is_rebuilt(enable_index, task):
+    index = TaskRunIndex(task.path)
+    run = make_run(task, tags=["a"])
+    run.save_to_file()
+    index.index_path.unlink()
+    assert index.tag_counts() == {"a": 1}
+
+
+def test_repaired_run_is_high_quality(task):
+    run = make_run(
+        task,
+        rating=TaskOutputRating(value=1.0),
+        repair_instructions="fix it",
+        repaired_output=TaskOutput(
+            output="fixed output",
+            source=DataSource(
+                type=DataSourceType.human, properties={"created_by": "tester"}
+            ),
+        ),
+    )
+    run.save_to_file()
+
+    entry = TaskRunIndex(task.path).entries()[0]
+    assert entry.repaired is True
+    assert entry.high_quality is True
+    assert entry.has_thinking is False
+
+
+def test_batched_saves_update_index(enable_index, task):
+    index = TaskRunIndex(task.path)
+    runs = [make_run(task, tags=["a"]) for _ in range(3)]
+    with patch.object(
+        TaskRunIndex, "_connect", autospec=True, side_effect=TaskRunIndex._connect
+    ) as mock_connect:
+        TaskRun.save_many(runs)
+        # One index transaction for the whole batch
+        assert mock_connect.call_count == 1
+    assert index.tag_counts(refresh=False) == {"a": 3}
+
+
+def test_tag_counts_prefix_and_flags(task):
+    runs = [
+        make_run(
+            task, tags=["fine_tune_a", "other"], rating=TaskOutputRating(value=5.0)
+        ),
+        make_run(task, tags=["fine_tune_a"], reasoning="thinking..."),
+        make_run(
+            task,
+            tags=["fine_tune_b", "fineXtune"],
+            reasoning="thinking...",
+            rating=TaskOutputRating(value=5.0),
+        ),
+    ]
+    for run in runs:
+        run.save_to_file()
+
+    index = TaskRunIndex(task.path)
+    assert index.tag_counts() == {
+        "fine_tune_a": 2,
+        "other": 1,
+        "fine_tune_b": 1,
+        "fineXtune": 1,
+    }
+    # Prefixes are literal: "_" is not a wildcard
+    assert index.tag_counts("fine_tune") == {"fine_tune_a": 2, "fine_tune_b": 1}
+    assert index.tag_counts("fine_tune", ["has_thinking"]) == {
+        "fine_tune_a": 1,
+        "fine_tune_b": 1,
+    }
+    assert index.tag_counts("fine_tune", ["has_thinking", "high_quality"]) == {
+        "fine_tune_b": 1
+    }
+    with pytest.raises(ValueError, match="Not an indexed flag"):
+        index.tag_counts(flags=["tags"])
+
+
+def test_query(task):
+    runs = [
+        make_run(task, tags=["a", "b"], rating=TaskOutputRating(value=5.0)),
+        make_run(task, tags=["a"], rating=TaskOutputRating(value=5.0)),
+        make_run(task, tags=["a", "b"], rating=TaskOutputRating(value=1.0)),
+        make_run(task, reasoning="thinking...", rating=TaskOutputRating(value=5.0)),
+    ]
+    for run in runs:
+        run.save_to_file()
+
+    index = TaskRunIndex(task.path)
+    assert [e.id for e in index.query(["a"], [])] == [r.id for r in runs[:3]]
+    assert [e.id for e in index.query(["b", "a"], ["high_quality"])] == [runs[0].id]
+    assert [e.id for e in index.query([], ["high_quality", "has_thinking"])] == [
+        runs[3].id
+    ]
+    assert index.query(["a", "missing"], []) == []
+    assert len(index.query([], [])) == 4
+    with pytest.raises(ValueError, match="Not an indexed flag"):
+        index.query([], ["1; DROP TABLE runs"])
@@ -0,0 +1,437 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from kiln_ai.datamodel import (
+    DataSource,
+    DataSourceType,
+    Project,
+    Task,
+    TaskOutput,
+    TaskRun,
+)
+from kiln_ai.datamodel.model_cache import ModelCache
+from kiln_ai.datamodel.segment_store import (
+    SEGMENT_FOLDER,
+    SegmentStore,
+    migrate_to_files,
+    migrate_to_segment_store,
+)
+
+
+@pytest.fixture
+def task(tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    return task
+
+
+def make_run(task, input="test input", tags=None) -> TaskRun:
+    source = DataSource(type=DataSourceType.human, properties={"created_by": "tester"})
+    return TaskRun(
+        parent=task,
+        input=input,
+        input_source=source,
+        output=TaskOutput(output="test output", source=source),
+        tags=tags or [],
+    )
+
+
+@pytest.fixture
+def store(task):
+    runs_folder = TaskRun.relationship_folder(task.path)
+    (runs_folder / SEGMENT_FOLDER).mkdir(parents=True)
+    store = SegmentStore.for_relationship_folder(runs_folder)
+    assert store is not None
+    return store
+
+
+@pytest.fixture
+def model_cache():
+    cache = ModelCache()
+    cache._enabled = True
+    with patch("kiln_ai.datamodel.segment_store.ModelCache.shared", return_value=cache):
+        yield cache
+
+
+def reopen(store: SegmentStore) -> SegmentStore:
+    # A fresh instance, loaded from disk. Also stands in for another process using the store.
+    return SegmentStore(store.relationship_folder)
+
+
+def segment_files(store: SegmentStore):
+    # Skipping lock files
+    return [
+        p.name for p in sorted(store.folder.iterdir()) if p.suffix in (".idx", ".jsonl")
+    ]
+
+
+def test_no_store_by_default(task):
+    make_run(task).save_to_file()
+    assert TaskRun.segment_store(task.path) is None
+
+
+def test_save_and_load(task, store):
+    runs = [make_run(task, input=f"input {i}") for i in range(3)]
+    for run in runs:
+        run.save_to_file()
+
+    # No folders or files per run
+    runs_folder = TaskRun.relationship_folder(task.path)
+    assert [p.name for p in runs_folder.iterdir()] == [SEGMENT_FOLDER]
+    assert runs[0].path == runs_folder / runs[0].id / "task_run.kiln"
+
+    for loaded_store in [store, reopen(store)]:
+        assert len(loaded_store) == 3
+        loaded = list(loaded_store.iter_models(TaskRun))
+        assert [run.input for run in loaded] == ["input 0", "input 1", "input 2"]
+        assert [run.path for run in loaded] == [run.path for run in runs]
+
+    # Through the model APIs
+    assert [run.id for run in task.runs()] == [run.id for run in runs]
+    assert [run.id for run in task.iter_runs()] == [run.id for run in runs]
+    assert list(TaskRun.iterate_children_paths_of_parent_path(task.path)) == [
+        run.path for run in runs
+    ]
+    found = TaskRun.from_id_and_parent_path(runs[1].id, task.path)
+    assert found is not None and found.input == "input 1"
+    assert runs[1].path is not None
+    loaded_run = TaskRun.load_from_file(runs[1].path)
+    assert loaded_run.input == "input 1"
+    # Parent lookups work from the path
+    assert loaded_run.parent_task() is not None
+    assert loaded_run.parent_task().id == task.id
+    assert TaskRun.load_summary(runs[1].path).input_preview == "input 1"
+
+
+def test_overwrite_keeps_latest(task, store):
+    run = make_run(task, tags=["a"])
+    run.save_to_file()
+    run.tags = ["b"]
+    run.save_to_file()
+
+    for loaded_store in [store, reopen(store)]:
+        assert len(loaded_store) == 1
+        loaded = loaded_store.load(TaskRun, run.id)
+        assert loaded is not None
+        assert loaded.tags == ["b"]
+
+
+def test_delete_writes_tombstone(task, store):
+    keep = make_run(task)
+    keep.save_to_file()
+    run = make_run(task)
+    run.save_to_file()
+    path = run.path
+
+    run.delete()
+    assert run.path is None
+    assert path is not None
+    with pytest.raises(FileNotFoundError):
+        TaskRun.load_from_file(path)
+    assert not store.delete(run.id)
+
+    for loaded_store in [store, reopen(store)]:
+        assert [r.id for r in loaded_store.iter_models(TaskRun)] == [keep.id]
+        assert loaded_store.load(TaskRun, run.id) is None
+
+
+def test_write_batch_saves_to_store(task, store):
+    runs = [make_run(task) for _ in range(3)]
+    TaskRun.save_many(runs)
+    assert len(store) == 3
+
+
+def test_rollover_to_new_segment(task, store):
+    with patch("kiln_ai.datamodel.segment_store.SEGMENT_MAX_BYTES", 1):
+        runs = [make_run(task, input=f"input {i}") for i in range(3)]
+        for run in runs:
+            run.save_to_file()
+    assert len(list(store.folder.glob("*.jsonl"))) == 3
+    assert [r.input for r in reopen(store).iter_models(TaskRun)] == [
+        "input 0",
+        "input 1",
+        "input 2",
+    ]
+
+
+def test_compact(task, store):
+    with patch("kiln_ai.datamodel.segment_store.SEGMENT_MAX_BYTES", 1):
+        runs = [make_run(task, input=f"input {i}") for i in range(4)]
+        for run in runs:
+            run.save_to_file()
+        runs[0].input = "updated"
+        runs[0].save_to_file()
+        runs[1].delete()
+
+    store.compact()
+    assert segment_files(store) == ["000007.idx", "000007.jsonl"]
+    assert not store.needs_compaction()
+    for loaded_store in [store, reopen(store)]:
+        assert [r.input for r in loaded_store.iter_models(TaskRun)] == [
+            "updated",
+            "input 2",
+            "input 3",
+        ]
+
+
+def test_loads_cached(task, store, model_cache):
+    runs = [make_run(task, input=f"input {i}") for i in range(3)]
+    for run in runs:
+        run.save_to_file()
+    assert runs[0].path is not None
+
+    first = store.load(TaskRun, runs[0].id, readonly=True)
+    assert first is not None
+    with patch.object(
+        TaskRun, "validate_loaded_data", wraps=TaskRun.validate_loaded_data
+    ) as mock_validate:
+        # Same record: served from the cache by every load path
+        assert store.load(TaskRun, runs[0].id, readonly=True) is first
+        assert TaskRun.load_from_file(runs[0].path, readonly=True) is first
+        assert TaskRun.load_summary(runs[0].path).input_preview == "input 0"
+        assert next(store.iter_models(TaskRun, readonly=True)) is first
+        # Not readonly: a copy
+        copy = store.load(TaskRun, runs[0].id)
+        assert copy is not first and copy == first
+        assert mock_validate.call_count == 0
+
+        # Saving writes a new record, so the cached model is stale
+        runs[0].input = "updated"
+        runs[0].save_to_file()
+        updated = store.load(TaskRun, runs[0].id, readonly=True)
+        assert updated is not None and updated.input == "updated"
+        assert mock_validate.call_count == 1
+
+    # Records are kept out of the snapshot
+    model_cache.enable_snapshot(task.path.parent / "snapshot", save_at_exit=False)
+    assert model_cache.save_snapshot() == 0
+
+
+def test_compaction_changes_cache_versions(task, store, model_cache):
+    runs = [make_run(task, input=f"input {i}") for i in range(2)]
+    for run in runs:
+        run.save_to_file()
+    runs[0].save_to_file()
+    first = store.load(TaskRun, runs[1].id, readonly=True)
+    store.compact()
+    # Moved to the compacted segment: loaded again, same contents
+    loaded = store.load(TaskRun, runs[1].id, readonly=True)
+    assert loaded is not first
+    assert loaded == first
+
+
+def test_trusted_loads(task, store, model_cache):
+    run = make_run(task)
+    run.save_to_file()
+
+    trusted = store.load(TaskRun, run.id, readonly=True, trusted=True)
+    assert store.load(TaskRun, run.id, readonly=True, trusted=True) is trusted
+    # Validated lookups don't get the trusted model
+    validated = store.load(TaskRun, run.id, readonly=True)
+    assert validated is not trusted and validated == trusted
+    assert store.load(TaskRun, run.id, readonly=True, trusted=True) is validated
+
+
+def test_background_compaction(task, store):
+    with patch("kiln_ai.datamodel.segment_store.COMPACT_MIN_DEAD_BYTES", 1):
+        run = make_run(task)
+        run.save_to_file()
+        assert not store.needs_compaction()
+        # Overwritten record is dead, and as large as the live one
+        run.save_to_file()
+        run.save_to_file()
+        store.wait_for_compaction()
+
+    assert len(list(store.folder.glob("*.jsonl"))) == 1
+    assert store.load(TaskRun, run.id) is not None
+
+
+def test_compaction_mid_iteration(task, store):
+    runs = [make_run(task) for _ in range(3)]
+    for run in runs:
+        run.save_to_file()
+    loaded_ids = []
+    for i, run in enumerate(store.iter_models(TaskRun)):
+        loaded_ids.append(run.id)
+        if i == 0:
+            store.compact()
+    assert loaded_ids == [run.id for run in runs]
+
+
+def test_saves_during_compaction(task, store):
+    runs = [make_run(task, input=f"input {i}") for i in range(3)]
+    for run in runs:
+        run.save_to_file()
+    runs[0].save_to_file()
+    new_run = make_run(task, input="new")
+
+    def save_and_delete():
+        runs[1].input = "updated"
+        runs[1].save_to_file()
+        runs[2].delete()
+        new_run.save_to_file()
+
+    write_compacted = store._write_compacted
+
+    def write_compacted_with_saves(*args):
+        # Records are copied without the store's lock: saves from another thread aren't blocked
+        saver = threading.Thread(target=save_and_delete)
+        saver.start()
+        saver.join(timeout=10)
+        assert not saver.is_alive()
+        return write_compacted(*args)
+
+    with patch.object(store, "_write_compacted", write_compacted_with_saves):
+        store.compact()
+
+    # The compacted segment, then the saves made during compaction
+    assert segment_files(store) == [
+        "000002.idx",
+        "000002.jsonl",
+        "000003.idx",
+        "000003.jsonl",
+    ]
+    for loaded_store in [store, reopen(store)]:
+        assert [r.input for r in loaded_store.iter_models(TaskRun)] == [
+            "input 0",
+            "updated",
+            "new",
+        ]
+    # Appends carry on in the last segment
+    runs[0].save_to_file()
+    assert segment_files(reopen(store))[-1] == "000003.jsonl"
+
+
+def test_appends_from_two_processes(task, store):
+    other = reopen(store)
+    runs = [make_run(task, input=f"input {i}") for i in range(40)]
+
+    def save(target, batch):
+        for run in batch:
+            target.put_many([run])
+
+    savers = [
+        threading.Thread(target=save, args=(target, runs[i::2]))
+        for i, target in enumerate([store, other])
+    ]
+    for saver in savers:
+        saver.start()
+    for saver in savers:
+        saver.join()
+
+    # Offsets come from the file, so neither store overwrote the other's records
+    for loaded_store in [store, other, reopen(store)]:
+        assert sorted(r.input for r in loaded_store.iter_models(TaskRun)) == sorted(
+            run.input for run in runs
+        )
+    # A lookup of a record saved by the other process
+    loaded = other.load(TaskRun, runs[0].id)
+    assert loaded is not None and loaded.input == "input 0"
+
+
+def test_compaction_by_another_process(task, store):
+    runs = [make_run(task, input=f"input {i}") for i in range(3)]
+    for run in runs:
+        run.save_to_file()
+    runs[0].save_to_file()
+    other = reopen(store)
+    other.compact()
+
+    # The store's segments are gone: it catches up from disk
+    loaded = store.load(TaskRun, runs[1].id)
+    assert loaded is not None and loaded.input == "input 1"
+    assert [r.input for r in store.iter_models(TaskRun)] == [
+        "input 0",
+        "input 1",
+        "input 2",
+    ]
+    store.delete(runs[2].id)
+    assert [r.input for r in other.iter_models(TaskRun)] == ["input 0", "input 1"]
+
+
+def test_recovers_from_torn_write(task, store):
+    runs = [make_run(task) for _ in range(2)]
+    for run in runs:
+        run.save_to_file()
+    data_path = store.folder / "000001.jsonl"
+    index_path = store.folder / "000001.idx"
+    good_size = data_path.stat().st_size
+    # A crash part way through a third append: partial record, no index line
+    with open(data_path, "ab") as file:
+        file.write(b'{"v":1,"id":"partial')
+
+    recovered = reopen(store)
+    assert [r.id for r in recovered.iter_models(TaskRun)] == [r.id for r in runs]
+    assert data_path.stat().st_size == good_size
+    assert len(index_path.read_text().splitlines()) == 2
+
+    # Appends continue after the recovered records
+    run = make_run(task)
+    recovered.put_many([run])
+    assert len(reopen(recovered)) == 3
+
+
+def test_rebuilds_missing_index(task, store):
+    run = make_run(task)
+    run.save_to_file()
+    run.delete()
+    kept = make_run(task)
+    kept.save_to_file()
+    (store.folder / "000001.idx").unlink()
+
+    recovered = reopen(store)
+    assert [r.id for r in recovered.iter_models(TaskRun)] == [kept.id]
+
+
+def test_migrate_both_ways(task):
+    runs = [make_run(task, input=f"input {i}") for i in range(3)]
+    for run in runs:
+        run.save_to_file()
+    runs_folder = TaskRun.relationship_folder(task.path)
+
+    assert migrate_to_segment_store(task.path, TaskRun) == 3
+    assert [p.name for p in runs_folder.iterdir()] == [SEGMENT_FOLDER]
+    assert sorted(r.input for r in task.runs()) == ["input 0", "input 1", "input 2"]
+
+    # New runs go to the store
+    new_run = make_run(task, input="new")
+    new_run.save_to_file()
+    assert [p.name for p in runs_folder.iterdir()] == [SEGMENT_FOLDER]
+    assert len(task.runs()) == 4
+
+    assert migrate_to_files(task.path, TaskRun) == 4
+    assert TaskRun.segment_store(task.path) is None
+    assert not (runs_folder / SEGMENT_FOLDER).exists()
+    assert len(list(runs_folder.iterdir())) == 4
+    loaded = TaskRun.from_id_and_parent_path(new_run.id, task.path)
+    assert loaded is not None
+    assert loaded.input == "new"
+    assert sorted(r.input for r in task.runs()) == [
+        "input 0",
+        "input 1",
+        "input 2",
+        "new",
+    ]
+
+
+def test_migrate_resumes_interrupted(task):
+    runs = [make_run(task) for _ in range(2)]
+    for run in runs:
+        run.save_to_file()
+    migrate_to_segment_store(task.path, TaskRun)
+
+    # A run folder left behind by an interrupted migration
+    leftover = make_run(task)
+    leftover.path = (
+        TaskRun.relationship_folder(task.path) / leftover.id / "task_run.kiln"
+    )
+    leftover.path.parent.mkdir()
+    leftover.path.write_text(leftover.model_dump_json(exclude={"path"}))
+
+    assert migrate_to_segment_store(task.path, TaskRun) == 1
+    assert len(task.runs()) == 3
+    assert not leftover.path.parent.exists()
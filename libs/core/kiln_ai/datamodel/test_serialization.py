@@ -0,0 +1,148 @@
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from kiln_ai.datamodel import (
+    DataSource,
+    DataSourceType,
+    Project,
+    Task,
+    TaskOutput,
+    TaskOutputRating,
+    TaskRun,
+    Usage,
+)
+from kiln_ai.datamodel.serialization import (
+    ModelSerializer,
+    OrjsonModelSerializer,
+    compact_model_files,
+    model_serializer,
+    set_model_serializer,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson is optional: the standard library serializer is used without it
+requires_orjson = pytest.mark.skipif(orjson is None, reason="orjson not installed")
+
+
+@pytest.fixture
+def task(tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    return task
+
+
+@pytest.fixture
+def use_serializer():
+    original = model_serializer()
+    yield set_model_serializer
+    set_model_serializer(original)
+
+
+def make_run(task) -> TaskRun:
+    source = DataSource(
+        type=DataSourceType.synthetic,
+        properties={
+            "model_name": "test-model",
+            "model_provider": "test-provider",
+            "adapter_name": "test-adapter",
+        },
+    )
+    return TaskRun(
+        parent=task,
+        input='Unicode: café ✓ 你好 \U0001f600, escapes: "quoted" \\ \n\t\x01',
+        input_source=source,
+        output=TaskOutput(
+            output="{}",
+            source=source,
+            rating=TaskOutputRating(value=4.0, requirement_ratings={}),
+        ),
+        intermediate_outputs={"reasoning": "thinking"},
+        tags=["a", "b"],
+        usage=Usage(input_tokens=10, output_tokens=20, total_tokens=30, cost=1e-07),
+        created_at=datetime(2024, 1, 2, 3, 4, 5, 678901),
+    )
+
+
+@requires_orjson
+@pytest.mark.parametrize("compact", [False, True])
+def test_orjson_output_matches_pydantic(task, compact):
+    for model in [task, task.parent, make_run(task)]:
+        assert OrjsonModelSerializer().dumps(
+            model, exclude={"path"}, compact=compact
+        ) == ModelSerializer().dumps(model, exclude={"path"}, compact=compact)
+
+
+def test_default_output_unchanged(task):
+    # Same bytes as before serializers were pluggable
+    run = make_run(task)
+    assert model_serializer().dumps(run, exclude={"path"}) == run.model_dump_json(
+        indent=2, exclude={"path"}
+    )
+
+
+@requires_orjson
+def test_orjson_falls_back_for_unsupported_values(task):
+    run = make_run(task)
+    run.output.source.properties["big"] = 2**70
+    assert OrjsonModelSerializer().dumps(run, exclude=set()) == run.model_dump_json(
+        indent=2
+    )
+
+
+def test_orjson_is_default_when_installed():
+    assert model_serializer().name == ("orjson" if orjson is not None else "json")
+
+
+def test_orjson_serializer_requires_orjson():
+    with patch("kiln_ai.datamodel.serialization.orjson", None):
+        with pytest.raises(ImportError, match="orjson is not installed"):
+            OrjsonModelSerializer()
+
+
+@pytest.mark.parametrize(
+    "serializer_class",
+    [ModelSerializer, pytest.param(OrjsonModelSerializer, marks=requires_orjson)],
+)
+def test_loads_bytes(serializer_class):
+    serializer = serializer_class()
+    assert serializer.loads('{"a": "café"}'.encode("utf-8")) == {"a": "café"}
+
+
+@pytest.mark.parametrize(
+    "serializer_class",
+    [ModelSerializer, pytest.param(OrjsonModelSerializer, marks=requires_orjson)],
+)
+def test_round_trip(task, use_serializer, serializer_class):
+    use_serializer(serializer_class())
+    run = make_run(task)
+    run.save_to_file()
+    loaded = TaskRun.load_from_file(run.path)
+    assert loaded.model_dump(exclude={"path"}) == run.model_dump(exclude={"path"})
+
+
+def test_compact_model_files(task):
+    run = make_run(task)
+    with patch("kiln_ai.datamodel.serialization.Config.shared") as mock_shared:
+        mock_shared.return_value.compact_model_files = True
+        assert compact_model_files()
+        run.save_to_file()
+    assert run.path is not None
+    contents = run.path.read_text()
+    assert "\n" not in contents
+    assert json.loads(contents)["id"] == run.id
+    assert TaskRun.load_from_file(run.path).id == run.id
+
+
+def test_compact_model_files_off_by_default():
+    with patch("kiln_ai.datamodel.serialization.Config.shared") as mock_shared:
+        mock_shared.return_value.compact_model_files = None
+        assert not compact_model_files()
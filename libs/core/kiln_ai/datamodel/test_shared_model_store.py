@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+import threading
+from unittest import mock
+
+import pytest
+from pydantic import BaseModel
+
+from kiln_ai.datamodel import Project
+from kiln_ai.datamodel.model_cache import ModelCache
+from kiln_ai.datamodel.model_cache_snapshot import pickle_model
+from kiln_ai.datamodel.shared_model_store import SharedModelStore
+
+
+class SharedModelTest(BaseModel):
+    name: str
+    value: int
+
+
+@pytest.fixture
+def new_cache():
+    # Force the cache on, even on filesystems with coarse timestamps: tests set distinct mtimes
+    with mock.patch.object(
+        ModelCache, "_check_timestamp_granularity", return_value=True
+    ):
+        yield ModelCache
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return tmp_path / "settings" / "model_cache.sqlite"
+
+
+def write_model_file(path, value: int):
+    path.write_text(f"contents {value}")
+    os.utime(path, ns=(1_000_000_000 * value, 1_000_000_000 * value))
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def worker_caches(new_cache, store_path, count=2):
+    # Separate caches sharing a store, like separate worker processes
+    caches = [new_cache() for _ in range(count)]
+    for cache in caches:
+        assert cache.enable_shared_store(store_path)
+    return caches
+
+
+def test_loads_are_shared(new_cache, tmp_path, store_path):
+    first, second = worker_caches(new_cache, store_path)
+    path = tmp_path / "model.kiln"
+    mtime_ns, size = write_model_file(path, 1)
+
+    first.set_model(path, SharedModelTest(name="a", value=1), mtime_ns, size)
+    first._shared_store.flush()
+
+    restored = second.get_model(path, SharedModelTest)
+    assert restored == SharedModelTest(name="a", value=1)
+    stats = second.stats()
+    assert stats.shared_restores == 1
+    assert stats.hits == 1
+    assert stats.entries == 1
+
+    # Now in the second process's own cache
+    assert second.get_model(path, SharedModelTest) is not None
+    assert second.stats().shared_restores == 1
+
+
+def test_changed_files_not_restored(new_cache, tmp_path, store_path):
+    first, second = worker_caches(new_cache, store_path)
+    path = tmp_path / "model.kiln"
+    mtime_ns, size = write_model_file(path, 1)
+    first.set_model(path, SharedModelTest(name="a", value=1), mtime_ns, size)
+    first._shared_store.flush()
+
+    write_model_file(path, 2)
+    assert second.get_model(path, SharedModelTest) is None
+    assert second.stats().shared_restores == 0
+    assert second.get_model(tmp_path / "missing.kiln", SharedModelTest) is None
+
+
+def test_invalidate_removes_shared_entries(new_cache, tmp_path, store_path):
+    first, second = worker_caches(new_cache, store_path)
+    paths = [tmp_path / f"model_{i}.kiln" for i in range(3)]
+    for i, path in enumerate(paths):
+        mtime_ns, size = write_model_file(path, i + 1)
+        first.set_model(path, SharedModelTest(name=path.name, value=i), mtime_ns, size)
+    first._shared_store.flush()
+
+    first.invalidate(paths[0])
+    first.invalidate_many(paths[1:])
+    for path in paths:
+        assert second.get_model(path, SharedModelTest) is None
+
+    # Pending writes for an invalidated path are dropped
+    store = first._shared_store
+    with mock.patch.object(store, "_start_writer"):
+        store.put(paths[0], SharedModelTest(name="a", value=1), 1, 1)
+    assert str(paths[0]) in store._pending
+    first.invalidate(paths[0])
+    assert str(paths[0]) not in store._pending
+
+
+def test_pickled_by_writer_thread(new_cache, tmp_path, store_path):
+    (cache,) = worker_caches(new_cache, store_path, count=1)
+    paths = [tmp_path / f"model_{i}.kiln" for i in range(2)]
+    store = cache._shared_store
+    pickled_on = []
+
+    def pickle_and_remove(model):
+        pickled_on.append(threading.current_thread().name)
+        if model.value == 0:
+            # Saved while the writer is pickling: not written
+            store.remove_many([paths[0]])
+        return pickle_model(model)
+
+    with mock.patch(
+        "kiln_ai.datamodel.shared_model_store.pickle_model", pickle_and_remove
+    ):
+        for i, path in enumerate(paths):
+            mtime_ns, size = write_model_file(path, i + 1)
+            cache.set_model(path, SharedModelTest(name="a", value=i), mtime_ns, size)
+        store.flush()
+
+    assert pickled_on and all(name == "kiln_shared_model_store" for name in pickled_on)
+    assert store.get(paths[0]) is None
+    assert store.get(paths[1]) is not None
+
+
+def test_restored_without_cache_lock(new_cache, tmp_path, store_path):
+    first, second = worker_caches(new_cache, store_path)
+    path = tmp_path / "model.kiln"
+    mtime_ns, size = write_model_file(path, 1)
+    first.set_model(path, SharedModelTest(name="a", value=1), mtime_ns, size)
+    first._shared_store.flush()
+
+    store = second._shared_store
+    get = store.get
+    lock_free = []
+
+    def get_checking_lock(path):
+        # Other threads can use the cache while this one unpickles
+        def try_lock():
+            if second._lock.acquire(timeout=5):
+                second._lock.release()
+                lock_free.append(True)
+
+        other = threading.Thread(target=try_lock)
+        other.start()
+        other.join()
+        return get(path)
+
+    with mock.patch.object(store, "get", get_checking_lock):
+        assert second.get_model(path, SharedModelTest) is not None
+    assert lock_free == [True]
+    assert second.stats().shared_restores == 1
+
+
+def test_store_from_other_code_is_cleared(new_cache, tmp_path, store_path):
+    (cache,) = worker_caches(new_cache, store_path, count=1)
+    path = tmp_path / "model.kiln"
+    mtime_ns, size = write_model_file(path, 1)
+    cache.set_model(path, SharedModelTest(name="a", value=1), mtime_ns, size)
+    cache._shared_store.flush()
+
+    with mock.patch(
+        "kiln_ai.datamodel.shared_model_store.code_fingerprint",
+        return_value="other",
+    ):
+        assert SharedModelStore(store_path).get(path) is None
+    with sqlite3.connect(store_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM models").fetchone()[0] == 0
+
+
+def test_unpicklable_models_skipped(new_cache, tmp_path, store_path):
+    first, second = worker_caches(new_cache, store_path)
+
+    class LocalModel(BaseModel):
+        value: int
+
+    path = tmp_path / "model.kiln"
+    mtime_ns, size = write_model_file(path, 1)
+    first.set_model(path, LocalModel(value=1), mtime_ns, size)
+    first._shared_store.flush()
+    assert second.get_model(path, LocalModel) is None
+
+
+def test_shared_between_processes(new_cache, tmp_path, store_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+
+    # Another process loads the project
+    script = textwrap.dedent(
+        f"""
+        from pathlib import Path
+        from unittest import mock
+        from kiln_ai.datamodel import Project
+        from kiln_ai.datamodel.model_cache import ModelCache
+
+        with mock.patch.object(ModelCache, "_check_timestamp_granularity", return_value=True):
+            cache = ModelCache()
+        cache.enable_shared_store(Path({str(store_path)!r}))
+        ModelCache._shared_instance = cache
+        Project.load_from_file(Path({str(project.path)!r}))
+        cache._shared_store.flush()
+        """
+    )
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=60)
+
+    (cache,) = worker_caches(new_cache, store_path, count=1)
+    with mock.patch.object(ModelCache, "_shared_instance", cache):
+        loaded = Project.load_from_file(project.path)
+    assert loaded.id == project.id
+    assert loaded.path == project.path
+    assert cache.stats().shared_restores == 1
+
+    # Saving removes the shared entry
+    with mock.patch.object(ModelCache, "_shared_instance", cache):
+        loaded.description = "changed"
+        loaded.save_to_file()
+    assert SharedModelStore(store_path).get(project.path) is None
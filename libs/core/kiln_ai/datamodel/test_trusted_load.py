@@ -0,0 +1,244 @@
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+
+from kiln_ai.datamodel import (
+    DataSource,
+    DataSourceType,
+    Project,
+    RequirementRating,
+    Task,
+    TaskOutput,
+    TaskOutputRating,
+    TaskOutputRatingType,
+    TaskRequirement,
+    TaskRun,
+)
+from kiln_ai.datamodel.model_cache import ModelCache
+from kiln_ai.datamodel.trusted_load import TrustedLoadSampler, construct_trusted
+
+
+@pytest.fixture
+def sampler():
+    # A fresh sampler per test, checking every trusted load
+    sampler = TrustedLoadSampler(sample_rate=1.0)
+    with patch.object(TrustedLoadSampler, "_shared_instance", sampler):
+        yield sampler
+
+
+@pytest.fixture
+def task(tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(
+        name="Test Task",
+        instruction="Test Instruction",
+        parent=project,
+        requirements=[
+            TaskRequirement(name="Funny", instruction="Be funny"),
+        ],
+    )
+    task.save_to_file()
+    return task
+
+
+def save_run(task: Task, **kwargs) -> TaskRun:
+    source = DataSource(
+        type=DataSourceType.synthetic,
+        properties={
+            "model_name": "test-model",
+            "model_provider": "test-provider",
+            "adapter_name": "test-adapter",
+        },
+    )
+    run = TaskRun(
+        parent=task,
+        input="Tell me a joke",
+        input_source=DataSource(
+            type=DataSourceType.human, properties={"created_by": "Jane"}
+        ),
+        output=TaskOutput(
+            output="A joke",
+            source=source,
+            rating=TaskOutputRating(
+                value=4,
+                requirement_ratings={
+                    task.requirements[0].id: RequirementRating(
+                        value=1.0, type=TaskOutputRatingType.pass_fail
+                    )
+                },
+            ),
+        ),
+        intermediate_outputs={"chain_of_thought": "Thinking"},
+        tags=["a", "b"],
+        **kwargs,
+    )
+    run.save_to_file()
+    return run
+
+
+def test_trusted_load_matches_validated(task, sampler):
+    run = save_run(task)
+
+    validated = TaskRun.load_from_file(run.path)
+    trusted = TaskRun.load_from_file(run.path, trusted=True)
+
+    assert trusted.model_dump() == validated.model_dump()
+    assert trusted.model_fields_set == validated.model_fields_set
+    assert trusted.output.model_fields_set == validated.output.model_fields_set
+    assert trusted.created_at == validated.created_at
+    assert trusted.output.source.type == DataSourceType.synthetic
+    assert isinstance(trusted.output.rating, TaskOutputRating)
+    rating = trusted.output.rating.requirement_ratings[task.requirements[0].id]
+    assert rating.type == TaskOutputRatingType.pass_fail
+    assert trusted.path == run.path
+    assert trusted.loaded_from_file()
+    assert trusted.parent_task().id == task.id
+    # Edits to trusted models are still validated
+    with pytest.raises(ValueError):
+        trusted.tags = ["with space"]
+
+    sampler.wait_idle()
+    assert sampler.sampled == 1
+    assert sampler.failures == 0
+
+
+def test_trusted_load_not_served_to_validated_loads(task, sampler):
+    run = save_run(task)
+    cache = ModelCache()
+    cache._enabled = True
+    with patch("kiln_ai.datamodel.basemodel.ModelCache.shared", return_value=cache):
+        trusted = TaskRun.load_from_file(run.path, readonly=True, trusted=True)
+        assert TaskRun.load_from_file(run.path, readonly=True, trusted=True) is trusted
+
+        with patch.object(
+            TaskRun, "validate_loaded_data", wraps=TaskRun.validate_loaded_data
+        ) as mock_validate:
+            validated = TaskRun.load_from_file(run.path, readonly=True)
+            mock_validate.assert_called_once()
+        assert validated is not trusted
+        # The validated model replaces the trusted one for every caller
+        assert TaskRun.load_from_file(run.path, readonly=True) is validated
+        assert (
+            TaskRun.load_from_file(run.path, readonly=True, trusted=True) is validated
+        )
+    sampler.wait_idle()
+
+
+def test_trusted_load_parent_methods(task, sampler):
+    runs = [save_run(task) for _ in range(3)]
+    loaded = task.runs(readonly=True, trusted=True)
+    assert sorted(run.id for run in loaded) == sorted(run.id for run in runs)
+    assert [run.id for run in task.iter_runs(trusted=True)] == [
+        run.id for run in loaded
+    ]
+
+    loaded_task = Task.load_from_file(task.path, trusted=True)
+    assert loaded_task.model_dump() == Task.load_from_file(task.path).model_dump()
+    sampler.wait_idle()
+    assert sampler.failures == 0
+
+
+def test_trusted_load_falls_back_on_old_format(task, sampler):
+    run = save_run(task)
+    data = json.loads(run.path.read_text())
+    # The previous format for requirement ratings, upgraded by a "before" validator
+    data["output"]["rating"]["requirement_ratings"] = {task.requirements[0].id: 4}
+    run.path.write_text(json.dumps(data))
+
+    assert construct_trusted(TaskRun, data, run.path) is None
+    loaded = TaskRun.load_from_file(run.path, trusted=True)
+    rating = loaded.output.rating.requirement_ratings[task.requirements[0].id]
+    assert isinstance(rating, RequirementRating)
+    assert rating.value == 4
+    # Validated loads aren't sampled
+    assert sampler.sampled == 0
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"v": 0},
+        {"tags": "not a list"},
+        {"input": None},
+        {"created_at": 12345},
+    ],
+)
+def test_trusted_load_falls_back_on_mismatch(task, sampler, change):
+    run = save_run(task)
+    data = json.loads(run.path.read_text())
+    data.update(change)
+    assert construct_trusted(TaskRun, data, run.path) is None
+
+    data.pop("input")
+    assert construct_trusted(TaskRun, data, run.path) is None
+
+
+def test_trusted_load_still_rejects_bad_files(task, sampler):
+    run = save_run(task)
+    data = json.loads(run.path.read_text())
+
+    data["v"] = 99
+    run.path.write_text(json.dumps(data))
+    with pytest.raises(ValueError, match="schema version is higher"):
+        TaskRun.load_from_file(run.path, trusted=True)
+
+    data["v"] = 1
+    data["model_type"] = "task"
+    run.path.write_text(json.dumps(data))
+    with pytest.raises(ValueError):
+        TaskRun.load_from_file(run.path, trusted=True)
+
+
+def test_sampler_catches_invalid_trusted_load(task, sampler):
+    run = save_run(task)
+    data = json.loads(run.path.read_text())
+    # Right type, but fails the rating validator, which trusted loads skip
+    data["output"]["rating"]["value"] = 7
+    run.path.write_text(json.dumps(data))
+
+    with patch("kiln_ai.datamodel.model_cache.ModelCache.invalidate") as invalidate:
+        loaded = TaskRun.load_from_file(run.path, trusted=True)
+        assert loaded.output.rating.value == 7
+        sampler.wait_idle()
+        invalidate.assert_called_with(run.path)
+    assert sampler.failures == 1
+    assert TaskRun in sampler.distrusted
+
+    # Later trusted loads of the class are validated
+    with pytest.raises(ValueError):
+        TaskRun.load_from_file(run.path, trusted=True)
+
+
+def test_sampler_samples_fraction(task):
+    run = save_run(task)
+    sampler = TrustedLoadSampler(sample_rate=0.0)
+    with patch.object(TrustedLoadSampler, "_shared_instance", sampler):
+        TaskRun.load_from_file(run.path, trusted=True)
+    assert sampler._thread is None
+    assert sampler.sampled == 0
+
+
+@pytest.mark.benchmark
+def test_benchmark_trusted_load(task):
+    run = save_run(task)
+    data = json.loads(run.path.read_text())
+    iterations = 2000
+    sampler = TrustedLoadSampler(sample_rate=0.0)
+    with patch.object(TrustedLoadSampler, "_shared_instance", sampler):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            TaskRun.validate_loaded_data(data, run.path)
+        validated_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            assert construct_trusted(TaskRun, data, run.path) is not None
+        trusted_time = time.perf_counter() - start
+
+    print(
+        f"{iterations} runs. Validated: {validated_time:.3f}s, trusted: {trusted_time:.3f}s ({validated_time / trusted_time:.2f}x)"
+    )
+    assert trusted_time < validated_time
@@ -0,0 +1,156 @@
+from unittest.mock import patch
+
+import pytest
+
+from kiln_ai.datamodel import Project, Task, TaskRun
+from kiln_ai.datamodel.basemodel import KilnBaseModel
+from kiln_ai.datamodel.model_cache import ModelCache
+from kiln_ai.datamodel.write_batch import WriteBatch, current_write_batch, write_batch
+
+
+@pytest.fixture
+def task(tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    return task
+
+
+def make_runs(task, count: int) -> list[TaskRun]:
+    return [
+        TaskRun(
+            parent=task,
+            input=f"input {i}",
+            output={
+                "output": f"output {i}",
+                "source": {"type": "human", "properties": {"created_by": "tester"}},
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def test_saves_staged_until_batch_exits(task):
+    runs = make_runs(task, 3)
+    with write_batch() as batch:
+        assert current_write_batch() is batch
+        for run in runs:
+            run.save_to_file()
+        assert len(batch) == 3
+        # Paths are resolved when staged, but nothing is written yet
+        assert all(run.path is not None and not run.path.exists() for run in runs)
+
+    assert current_write_batch() is None
+    for run in runs:
+        assert run.path is not None
+        loaded = TaskRun.load_from_file(run.path)
+        assert loaded.id == run.id
+        assert loaded.input == run.input
+    # No temp files left behind
+    assert list(task.path.parent.rglob("*.tmp")) == []
+    assert len(task.runs()) == 3
+
+
+def test_save_many(task):
+    runs = make_runs(task, 5)
+    with patch.object(TaskRun, "after_save") as mock_after_save:
+        TaskRun.save_many(runs)
+    assert len(task.runs()) == 5
+    # Post-save hooks run once for the whole batch
+    mock_after_save.assert_called_once_with(runs)
+
+
+def test_nested_batches_join_outer(task):
+    runs = make_runs(task, 2)
+    with write_batch() as outer:
+        runs[0].save_to_file()
+        with write_batch() as inner:
+            assert inner is outer
+            runs[1].save_to_file()
+        assert task.runs() == []
+    assert len(task.runs()) == 2
+
+
+def test_staged_saves_written_on_exception(task):
+    runs = make_runs(task, 2)
+    with pytest.raises(ValueError, match="boom"):
+        with write_batch():
+            runs[0].save_to_file()
+            raise ValueError("boom")
+    assert [run.id for run in task.runs()] == [runs[0].id]
+
+
+def test_max_pending_commits_early(task):
+    batch = WriteBatch(max_pending=2)
+    runs = make_runs(task, 3)
+    for run in runs:
+        batch.save(run)
+    assert len(batch) == 1
+    assert len(task.runs()) == 2
+    batch.commit()
+    assert len(batch) == 0
+    assert len(task.runs()) == 3
+
+
+def test_same_path_saved_twice_keeps_last(task):
+    run = make_runs(task, 1)[0]
+    with write_batch() as batch:
+        run.save_to_file()
+        run.input = "updated"
+        run.save_to_file()
+        assert len(batch) == 1
+    assert run.path is not None
+    assert TaskRun.load_from_file(run.path).input == "updated"
+
+
+def test_fsync_directories_once(task):
+    runs = make_runs(task, 3)
+    with (
+        patch("kiln_ai.datamodel.write_batch.os.fsync") as mock_fsync,
+        patch("kiln_ai.datamodel.write_batch.fsync_directory") as mock_fsync_dir,
+    ):
+        TaskRun.save_many(runs, fsync=True)
+
+    assert mock_fsync.call_count == 3
+    synced = [call.args[0] for call in mock_fsync_dir.call_args_list]
+    assert len(synced) == len(set(synced))
+    # Each run folder, and the runs folder they were created in
+    expected = {run.path.parent for run in runs if run.path is not None}
+    expected.add(task.path.parent / "runs")
+    assert set(synced) == expected
+
+
+def test_no_fsync_by_default(task):
+    with (
+        patch("kiln_ai.datamodel.write_batch.os.fsync") as mock_fsync,
+        patch("kiln_ai.datamodel.write_batch.fsync_directory") as mock_fsync_dir,
+    ):
+        TaskRun.save_many(make_runs(task, 2))
+    mock_fsync.assert_not_called()
+    mock_fsync_dir.assert_not_called()
+
+
+def test_cache_invalidated_in_bulk(task):
+    runs = make_runs(task, 2)
+    cache = ModelCache.shared()
+    with patch.object(cache, "invalidate_many") as mock_invalidate_many:
+        TaskRun.save_many(runs)
+    mock_invalidate_many.assert_called_once_with([run.path for run in runs])
+
+
+def test_failed_write_cleans_up_temp_files(task):
+    runs = make_runs(task, 2)
+    with patch(
+        "kiln_ai.datamodel.write_batch.os.replace", side_effect=OSError("disk full")
+    ):
+        with pytest.raises(OSError, match="disk full"):
+            TaskRun.save_many(runs)
+    assert list(task.path.parent.rglob("*.tmp")) == []
+    assert task.runs() == []
+
+
+def test_save_without_path_fails_when_staged():
+    with write_batch():
+        with pytest.raises(ValueError, match="'path' is not set"):
+            KilnBaseModel().save_to_file()
@@ -0,0 +1,408 @@
+"""
+Trusted loading: build models from files Kiln wrote itself, without running pydantic validation.
+
+Bulk reads of thousands of runs pay for full `model_validate`, including every custom validator, on data which was validated when it was saved. A trusted load instead builds the model directly, `model_construct` style, converting only what JSON can't represent (nested models, enums, datetimes, paths).
+
+The fast path is only taken when it's safe, and falls back to normal validation otherwise:
+ - The file's schema version `v` must be the current version, and its model_type must match. Older files may need upgrading by validators.
+ - Every value must already have the exact type of its field. Anything else (missing required fields, old formats, hand edited files) falls back. "before" validators upgrade old formats, which fail this check, so they aren't needed on the fast path.
+ - Classes with aliases, non-default `extra` handling, field validators which transform values, or field types this module doesn't understand are always validated.
+
+Constraints and "after" validators are skipped: the data was checked when it was saved. To catch corrupted or hand edited files, a background sampler re-validates a fraction of trusted loads. If the validated model differs, the cached copy is dropped and the class is no longer trusted for the rest of the process.
+"""
+
+import copy
+import logging
+import queue
+import random
+import threading
+import types
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Annotated,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+
+if TYPE_CHECKING:
+    from kiln_ai.datamodel.basemodel import KilnBaseModel
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound="KilnBaseModel")
+Converter = Callable[[Any], Any]
+
+# Fraction of trusted loads re-validated in the background
+DEFAULT_SAMPLE_RATE = 0.01
+
+
+class _Mismatch(Exception):
+    """A value doesn't have the exact type expected by the fast path."""
+
+
+class _Unsupported(Exception):
+    """A class or field type which the fast path can't build."""
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _check_type(expected: type) -> Converter:
+    def convert(value: Any) -> Any:
+        if type(value) is not expected:
+            raise _Mismatch()
+        return value
+
+    return convert
+
+
+def _convert_float(value: Any) -> float:
+    if type(value) is float:
+        return value
+    if type(value) is int:
+        return float(value)
+    raise _Mismatch()
+
+
+def _convert_datetime(value: Any) -> datetime:
+    if type(value) is not str:
+        raise _Mismatch()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise _Mismatch()
+
+
+def _convert_path(value: Any) -> Path:
+    if type(value) is not str:
+        raise _Mismatch()
+    return Path(value)
+
+
+_SIMPLE_CONVERTERS: Dict[Any, Converter] = {
+    Any: _identity,
+    str: _check_type(str),
+    int: _check_type(int),
+    bool: _check_type(bool),
+    float: _convert_float,
+    datetime: _convert_datetime,
+    Path: _convert_path,
+    dict: _check_type(dict),
+    list: _check_type(list),
+}
+
+
+def _optional_converter(inner: Converter) -> Converter:
+    def convert(value: Any) -> Any:
+        return None if value is None else inner(value)
+
+    return convert
+
+
+def _simple_union_converter(members: Set[type]) -> Converter:
+    # Matches pydantic's smart unions: values keep their own type if it's a member
+    def convert(value: Any) -> Any:
+        if type(value) in members:
+            return value
+        if type(value) is int and float in members:
+            return float(value)
+        raise _Mismatch()
+
+    return convert
+
+
+def _literal_converter(values: tuple) -> Converter:
+    def convert(value: Any) -> Any:
+        if value not in values:
+            raise _Mismatch()
+        return value
+
+    return convert
+
+
+def _enum_converter(enum_class: Type[Enum]) -> Converter:
+    def convert(value: Any) -> Any:
+        try:
+            return enum_class(value)
+        except ValueError:
+            raise _Mismatch()
+
+    return convert
+
+
+def _list_converter(inner: Converter) -> Converter:
+    def convert(value: Any) -> Any:
+        if type(value) is not list:
+            raise _Mismatch()
+        if inner is _identity:
+            return list(value)
+        return [inner(item) for item in value]
+
+    return convert
+
+
+def _dict_converter(key: Converter, inner: Converter) -> Converter:
+    def convert(value: Any) -> Any:
+        if type(value) is not dict:
+            raise _Mismatch()
+        return {key(k): inner(v) for k, v in value.items()}
+
+    return convert
+
+
+def _model_converter(model_class: Type[BaseModel]) -> Converter:
+    def convert(value: Any) -> Any:
+        if type(value) is not dict:
+            raise _Mismatch()
+        # Looked up on use, so self referencing models don't recurse while building
+        plan = _model_plan(model_class)
+        if plan is None:
+            raise _Mismatch()
+        return _construct(model_class, plan, value)
+
+    return convert
+
+
+def _build_converter(annotation: Any) -> Converter:
+    try:
+        simple = _SIMPLE_CONVERTERS.get(annotation)
+    except TypeError:
+        # Unhashable annotation metadata
+        simple = None
+    if simple is not None:
+        return simple
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Annotated:
+        # Constraints are skipped: trusted data was checked when saved
+        return _build_converter(args[0])
+    if origin is Union or origin is types.UnionType:
+        members = [arg for arg in args if arg is not type(None)]
+        if len(members) == 1:
+            return _optional_converter(_build_converter(members[0]))
+        if all(arg in (str, int, float, bool, type(None)) for arg in args):
+            return _simple_union_converter(set(args))
+        # Which member pydantic would pick depends on the value. Not worth duplicating.
+        raise _Unsupported(annotation)
+    if origin is Literal:
+        return _literal_converter(args)
+    if origin in (list, List):
+        return _list_converter(_build_converter(args[0]) if args else _identity)
+    if origin in (dict, Dict):
+        if not args:
+            return _SIMPLE_CONVERTERS[dict]
+        return _dict_converter(_build_converter(args[0]), _build_converter(args[1]))
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            return _model_converter(annotation)
+        if issubclass(annotation, Enum):
+            return _enum_converter(annotation)
+    raise _Unsupported(annotation)
+
+
+class _ModelPlan:
+    """How to build one model class: for each field in order, its converter, and its FieldInfo (None if required)."""
+
+    def __init__(self, fields: List[Tuple[str, Converter, FieldInfo | None]]):
+        self.fields = fields
+
+
+# None for classes which can't be built on the fast path
+_plans: Dict[type, _ModelPlan | None] = {}
+_plans_lock = threading.Lock()
+
+
+def _model_plan(model_class: Type[BaseModel]) -> _ModelPlan | None:
+    if model_class in _plans:
+        return _plans[model_class]
+    try:
+        plan: _ModelPlan | None = _build_plan(model_class)
+    except _Unsupported as e:
+        logger.debug("Trusted loading not supported for %s: %s", model_class, e)
+        plan = None
+    with _plans_lock:
+        _plans[model_class] = plan
+    return plan
+
+
+def _build_plan(model_class: Type[BaseModel]) -> _ModelPlan:
+    if model_class.model_config.get("extra") not in (None, "ignore"):
+        raise _Unsupported("extra")
+    decorators = model_class.__pydantic_decorators__
+    for field_validator in decorators.field_validators.values():
+        if field_validator.info.mode != "after":
+            raise _Unsupported(f"{field_validator.info.mode} field validator")
+    for model_validator in decorators.model_validators.values():
+        if model_validator.info.mode == "wrap":
+            raise _Unsupported("wrap model validator")
+
+    fields: List[Tuple[str, Converter, FieldInfo | None]] = []
+    for name, field in model_class.model_fields.items():
+        if field.alias is not None or field.validation_alias is not None:
+            raise _Unsupported("alias")
+        converter = _build_converter(field.annotation)
+        fields.append((name, converter, None if field.is_required() else field))
+    return _ModelPlan(fields)
+
+
+def _construct(
+    model_class: Type[BaseModel], plan: _ModelPlan, data: dict, **extra_values: Any
+) -> Any:
+    """The equivalent of `model_construct`, minus the alias and extra handling the plan rules out."""
+    values: Dict[str, Any] = {}
+    fields_set: Set[str] = set()
+    for name, converter, field in plan.fields:
+        if name in extra_values:
+            # Set directly: assigning them after would run validate_assignment, and with it every model validator
+            values[name] = extra_values[name]
+            fields_set.add(name)
+        elif name in data:
+            values[name] = converter(data[name])
+            fields_set.add(name)
+        elif field is None:
+            # Missing required field
+            raise _Mismatch()
+        else:
+            values[name] = field.get_default(call_default_factory=True)
+    # Unknown keys (like model_type) are ignored, as they are by validation
+    model = model_class.__new__(model_class)
+    object.__setattr__(model, "__dict__", values)
+    object.__setattr__(model, "__pydantic_fields_set__", fields_set)
+    object.__setattr__(model, "__pydantic_extra__", None)
+    if model_class.__pydantic_post_init__:
+        # Initializes private attributes, as validation does
+        model.model_post_init(None)
+    else:
+        object.__setattr__(model, "__pydantic_private__", None)
+    return model
+
+
+def construct_trusted(
+    cls: Type[T], parsed_json: Dict[str, Any], path: Path
+) -> T | None:
+    """
+    Build a model from a file's parsed JSON without validation, if it's safe to.
+
+    Returns None if the data has to be validated: callers fall back to `validate_loaded_data`.
+    """
+    sampler = TrustedLoadSampler.shared()
+    if cls in sampler.distrusted:
+        return None
+    plan = _model_plan(cls)
+    if plan is None:
+        return None
+    if parsed_json.get("model_type") != cls.type_name():
+        return None
+    try:
+        model = _construct(cls, plan, parsed_json, path=path)
+    except _Mismatch:
+        return None
+    if model.v != model.max_schema_version():
+        return None
+    model._loaded_from_file = True
+    sampler.submit(cls, parsed_json, path, model)
+    return model
+
+
+class TrustedLoadSampler:
+    """Re-validates a random sample of trusted loads in a background thread, to catch files which shouldn't have been trusted."""
+
+    _shared_instance = None
+
+    def __init__(self, sample_rate: float = DEFAULT_SAMPLE_RATE, max_queue: int = 1000):
+        self.sample_rate = sample_rate
+        self.distrusted: Set[type] = set()
+        self.sampled = 0
+        self.failures = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def shared(cls) -> "TrustedLoadSampler":
+        if cls._shared_instance is None:
+            cls._shared_instance = cls()
+        return cls._shared_instance
+
+    def submit(
+        self,
+        cls: Type["KilnBaseModel"],
+        parsed_json: Dict[str, Any],
+        path: Path,
+        model: "KilnBaseModel",
+    ) -> None:
+        if random.random() >= self.sample_rate:
+            return
+        try:
+            # Copies, as validation may upgrade the data in place, and callers may edit the model before it's checked
+            self._queue.put_nowait(
+                (cls, copy.deepcopy(parsed_json), path, model.model_dump())
+            )
+        except queue.Full:
+            # Sampling is best effort. Never slow down loading for it.
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="kiln_trusted_load_sampler", daemon=True
+                )
+                self._thread.start()
+
+    def wait_idle(self) -> None:
+        """Block until every submitted sample is checked."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            cls, parsed_json, path, dumped_model = self._queue.get()
+            try:
+                self._check(cls, parsed_json, path, dumped_model)
+            finally:
+                self._queue.task_done()
+
+    def _check(
+        self,
+        cls: Type["KilnBaseModel"],
+        parsed_json: Dict[str, Any],
+        path: Path,
+        dumped_model: Dict[str, Any],
+    ) -> None:
+        # Inline import to avoid circular import
+        from kiln_ai.datamodel.model_cache import ModelCache
+
+        with self._lock:
+            self.sampled += 1
+        try:
+            validated = cls.validate_loaded_data(parsed_json, path)
+            matches = validated.model_dump() == dumped_model
+        except Exception as e:
+            logger.warning("Trusted load of %s failed validation: %s", path, e)
+            matches = False
+        if matches:
+            return
+        logger.warning(
+            "Trusted load of %s didn't match validation. Validating all %s loads from now on.",
+            path,
+            cls.__name__,
+        )
+        with self._lock:
+            self.failures += 1
+            self.distrusted.add(cls)
+        ModelCache.shared().invalidate(path)
@@ -0,0 +1,190 @@
+"""
+Batched saving of many models at once.
+
+Inside a `write_batch()` block, `save_to_file` stages the serialized model instead of writing it. When the batch commits:
+ - Each file is written to a temp file next to its destination, then renamed into place (atomic: readers never see a partially written file).
+ - Optionally (fsync=True) each file is fsynced before the rename, and each directory touched is fsynced once for the whole batch.
+ - The model cache is invalidated for all paths under a single lock, and post-save hooks (like the run index) run once per model class.
+
+A batch is not a transaction: if one file fails to write, files already renamed into place stay. For all-or-nothing saves of a model and its children, see `save_tree`.
+"""
+
+import os
+import shutil
+import sys
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Set, Tuple
+
+from kiln_ai.datamodel.model_cache import ModelCache
+
+if TYPE_CHECKING:
+    from kiln_ai.datamodel.basemodel import KilnBaseModel
+
+_current_batch: ContextVar["WriteBatch | None"] = ContextVar(
+    "kiln_write_batch", default=None
+)
+
+
+class WriteBatch:
+    def __init__(self, fsync: bool = False, max_pending: int | None = None):
+        """
+        Args:
+            fsync: fsync files and directories before the batch is considered committed. Slower, but durable across power loss.
+            max_pending: commit automatically once this many models are staged. None to only commit when the batch exits.
+        """
+        self.fsync = fsync
+        self.max_pending = max_pending
+        # path -> (model, json). Saving the same path twice in a batch keeps the last version.
+        self._pending: Dict[Path, Tuple["KilnBaseModel", str]] = {}
+
+    def save(self, model: "KilnBaseModel") -> None:
+        """Stage a model to be saved when the batch commits."""
+        # Segment store appends are already cheap, so aren't batched
+        if model._save_to_segment_store():
+            return
+        path, json_data = model.prepare_save()
+        self.add(model, path, json_data)
+
+    def add(self, model: "KilnBaseModel", path: Path, json_data: str) -> None:
+        self._pending.pop(path, None)
+        self._pending[path] = (model, json_data)
+        if self.max_pending is not None and len(self._pending) >= self.max_pending:
+            self.commit()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def commit(self) -> None:
+        """Write all staged models to disk."""
+        pending = self._pending
+        self._pending = {}
+        if not pending:
+            return
+
+        # Directories to fsync: each file's folder, plus the parent of any folder we create
+        sync_dirs: Set[Path] = set()
+        staged: List[Tuple[Path, Path]] = []
+        try:
+            for path, (_, json_data) in pending.items():
+                if not path.parent.exists():
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    sync_dirs.add(path.parent.parent)
+                sync_dirs.add(path.parent)
+                # Dot prefixed, so never mistaken for a model file
+                temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+                with open(temp_path, "w", encoding="utf-8") as file:
+                    file.write(json_data)
+                    if self.fsync:
+                        file.flush()
+                        os.fsync(file.fileno())
+                staged.append((temp_path, path))
+
+            for temp_path, path in staged:
+                os.replace(temp_path, path)
+            staged = []
+        finally:
+            # Only non-empty if we failed part way
+            for temp_path, _ in staged:
+                temp_path.unlink(missing_ok=True)
+
+        if self.fsync:
+            for directory in sync_dirs:
+                fsync_directory(directory)
+
+        finish_saves(list(pending.keys()), [model for model, _ in pending.values()])
+
+
+def finish_saves(paths: List[Path], models: List["KilnBaseModel"]) -> None:
+    """Invalidate the cache for written paths, and run post-save hooks once per model class."""
+    ModelCache.shared().invalidate_many(paths)
+
+    models_by_class: Dict[type, List["KilnBaseModel"]] = defaultdict(list)
+    for model in models:
+        models_by_class[type(model)].append(model)
+    for model_class, class_models in models_by_class.items():
+        model_class.after_save(class_models)
+
+
+def save_tree(models: List["KilnBaseModel"]) -> None:
+    """
+    Save a model and its descendants all-or-nothing.
+
+    models[0] is the root, and every other model must be saved inside the root's folder. Models must be ordered parents before children, so child paths can be built from their parent's.
+
+    The whole tree is written to a dot-prefixed staging folder next to the root folder, then merged into place with renames. If the root folder is new (the usual case), that's a single atomic rename. Otherwise existing folders are merged file by file, replacing files atomically. A crash while staging leaves only the (ignored) staging folder behind.
+    """
+    if not models:
+        return
+    prepared = [(model, *model.prepare_save()) for model in models]
+    root_folder = prepared[0][1].parent
+    root_folder.parent.mkdir(parents=True, exist_ok=True)
+    staging_folder = root_folder.parent / f".{root_folder.name}.{uuid.uuid4().hex}.tmp"
+    try:
+        for _, path, json_data in prepared:
+            staged_path = staging_folder / path.relative_to(root_folder)
+            staged_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(staged_path, "w", encoding="utf-8") as file:
+                file.write(json_data)
+        _merge_folder(staging_folder, root_folder)
+    finally:
+        # Empty unless something failed, or the root folder already existed
+        shutil.rmtree(staging_folder, ignore_errors=True)
+
+    finish_saves([path for _, path, _ in prepared], models)
+
+
+def _merge_folder(source: Path, destination: Path) -> None:
+    if not destination.exists():
+        os.rename(source, destination)
+        return
+    with os.scandir(source) as entries:
+        for entry in entries:
+            entry_destination = destination / entry.name
+            if entry.is_dir():
+                _merge_folder(Path(entry.path), entry_destination)
+            else:
+                os.replace(entry.path, entry_destination)
+
+
+def fsync_directory(directory: Path) -> None:
+    # Windows can't open directories, and NTFS journals metadata anyway
+    if sys.platform == "win32":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def current_write_batch() -> WriteBatch | None:
+    return _current_batch.get()
+
+
+@contextmanager
+def write_batch(
+    fsync: bool = False, max_pending: int | None = None
+) -> Iterator[WriteBatch]:
+    """
+    Batch all model saves inside the block, committing them together when it exits.
+
+    Nested blocks join the outermost batch. Models staged before an exception are still written, just as they would have been without the batch.
+
+    Uses a context variable, so don't hold a batch open across `yield` in an async generator. Use a WriteBatch directly (`batch.save(model)`, `batch.commit()`) there.
+    """
+    existing = _current_batch.get()
+    if existing is not None:
+        yield existing
+        return
+
+    batch = WriteBatch(fsync=fsync, max_pending=max_pending)
+    token = _current_batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _current_batch.reset(token)
+        batch.commit()
@@ -40,6 +40,67 @@ class Config:
                 env_var="KILN_AUTOSAVE_RUNS",
                 default=True,
             ),
+            "enable_task_run_index": ConfigProperty(
+                bool,
+                env_var="KILN_ENABLE_TASK_RUN_INDEX",
+                default=False,
+            ),
+            # Budget for the in-memory model cache. Unbounded if not set.
+            "model_cache_max_entries": ConfigProperty(
+                int,
+                env_var="KILN_MODEL_CACHE_MAX_ENTRIES",
+            ),
+            "model_cache_max_bytes": ConfigProperty(
+                int,
+                env_var="KILN_MODEL_CACHE_MAX_BYTES",
+            ),
+            # Linux only: use inotify to detect changed files, instead of checking mtimes on every cache hit
+            "enable_file_watcher": ConfigProperty(
+                bool,
+                env_var="KILN_ENABLE_FILE_WATCHER",
+                default=False,
+            ),
+            # Load projects into the model cache in the background when the server starts: "off", "projects" (projects, tasks, prompts and evals) or "runs" (also task and eval runs)
+            "cache_warmup": ConfigProperty(
+                str,
+                env_var="KILN_CACHE_WARMUP",
+                default="off",
+            ),
+            # Snapshot the model cache to the settings folder on exit, and restore it on the next start
+            "model_cache_snapshot": ConfigProperty(
+                bool,
+                env_var="KILN_MODEL_CACHE_SNAPSHOT",
+                default=False,
+            ),
+            # Share loaded models between processes on this host (eg. API workers), through a store in the settings folder
+            "shared_model_cache": ConfigProperty(
+                bool,
+                env_var="KILN_SHARED_MODEL_CACHE",
+                default=False,
+            ),
+            # Write .kiln files without indentation. Smaller and faster, but harder to read and diff.
+            "compact_model_files": ConfigProperty(
+                bool,
+                env_var="KILN_COMPACT_MODEL_FILES",
+                default=False,
+            ),
+            # Threads used to load the children of a model (eg. task runs) on a cold cache. Serial if not set.
+            "child_load_workers": ConfigProperty(
+                int,
+                env_var="KILN_CHILD_LOAD_WORKERS",
+            ),
+            # Threads the server uses for blocking datamodel IO (loading, saving and deleting models), off the event loop
+            "storage_workers": ConfigProperty(
+                int,
+                env_var="KILN_STORAGE_WORKERS",
+                default=8,
+            ),
+            # Most storage calls the server runs at once for one project, so one project's heavy listings can't take every storage worker
+            "storage_project_concurrency": ConfigProperty(
+                int,
+                env_var="KILN_STORAGE_PROJECT_CONCURRENCY",
+                default=4,
+            ),
             "open_ai_api_key": ConfigProperty(
                 str,
                 env_var="OPENAI_API_KEY",
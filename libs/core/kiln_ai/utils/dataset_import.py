@@ -266,9 +266,8 @@ def import_csv(
 
     add_tag_splits(rows, tag_splits)
 
-    # now that we know all rows are valid, we can save them
-    for run in rows:
-        run.save_to_file()
+    # now that we know all rows are valid, we can save them (as one batch, avoiding per-file overhead)
+    TaskRun.save_many(rows)
 
     return len(rows)
 
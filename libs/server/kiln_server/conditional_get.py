@@ -0,0 +1,42 @@
+"""
+Conditional GET for list endpoints, using collection versions as ETags.
+
+List views poll endpoints which rebuild the whole list from disk. The ETag is derived from the versions of the collections a response is built from (see `kiln_ai.datamodel.collection_version`): the run index's generation when enabled, otherwise a stat per child file. Versions are the same in every server process. If the client already has the current version, we return 304 without loading any models.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Sequence
+
+from fastapi import Request, Response
+from kiln_ai.datamodel.collection_version import collection_version
+
+
+def collection_etag(relationship_folders: Sequence[Path], *extra: str) -> str:
+    """A weak ETag for a response built from these collections. Pass anything else the response depends on (eg. query parameters) as extra."""
+    parts = [collection_version(folder) for folder in relationship_folders]
+    digest = hashlib.sha256("\n".join(parts + list(extra)).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # Weak comparison: ignore W/ prefixes
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def not_modified_response(
+    request: Request, response: Response, etag: str
+) -> Response | None:
+    """
+    Set the ETag on the response. Returns a 304 response to return instead, if the client already has this version.
+    """
+    # no-cache: clients may cache, but must check the ETag before each use
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
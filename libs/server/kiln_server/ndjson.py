@@ -0,0 +1,50 @@
+"""
+Streaming responses for large collections, as newline delimited JSON (one model per line).
+
+Returning `list[Model]` builds, validates and serializes the whole list in memory before sending anything. Streaming loads and serializes one model at a time from a child iterator, so memory stays flat and the first records arrive right away, however large the collection.
+
+Records are sent in chunks of about CHUNK_BYTES rather than one write per record. Each chunk is loaded with `run_storage`, in the storage pool and counted against the project's limit, so loading from disk never blocks the event loop. The project's slot is only held while a chunk is loaded, not while the client reads it. An error part way through aborts the response: the connection is closed without the final empty chunk of the chunked transfer encoding, so HTTP clients report an incomplete body (eg. httpx raises RemoteProtocolError). Every chunk ends on a record boundary, so clients must rely on that error, not a missing trailing newline, to detect a truncated stream.
+"""
+
+from typing import AsyncIterator, Iterable, Iterator
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from kiln_server.storage_executor import run_storage
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CHUNK_BYTES = 64 * 1024
+
+
+def ndjson_chunks(models: Iterable[BaseModel]) -> Iterator[bytes]:
+    buffer = bytearray()
+    for model in models:
+        buffer += model.model_dump_json().encode("utf-8")
+        buffer += b"\n"
+        if len(buffer) >= CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def storage_chunks(
+    project_id: str | None, chunks: Iterator[bytes]
+) -> AsyncIterator[bytes]:
+    """Advance a blocking iterator one item at a time in the storage pool. See `run_storage` for project_id."""
+    while True:
+        chunk = await run_storage(project_id, next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def ndjson_response(
+    project_id: str | None, models: Iterable[BaseModel]
+) -> StreamingResponse:
+    """Stream models as NDJSON. Pass a lazy iterator: models are loaded as they're sent, by the storage pool for the project."""
+    return StreamingResponse(
+        storage_chunks(project_id, ndjson_chunks(models)),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
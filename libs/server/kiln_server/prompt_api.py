@@ -1,9 +1,12 @@
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException
-from kiln_ai.datamodel import BasePrompt, Prompt, PromptId
+from fastapi import FastAPI, HTTPException, Request, Response
+from kiln_ai.datamodel import BasePrompt, Prompt, PromptId, Task
+from kiln_ai.datamodel.task import TaskRunConfig
 from pydantic import BaseModel
 
+from kiln_server.conditional_get import collection_etag, not_modified_response
+from kiln_server.storage_executor import run_storage
 from kiln_server.task_api import task_from_id
 
 
@@ -56,43 +59,84 @@ class PromptUpdateRequest(BaseModel):
     description: str | None = None
 
 
+def load_api_prompts(
+    parent_task: Task, project_id: str, task_id: str
+) -> list[ApiPrompt]:
+    """The task's custom prompts, and the prompts of its run configs."""
+    prompts: list[ApiPrompt] = []
+    for prompt in parent_task.prompts():
+        properties = prompt.model_dump(exclude={"id"})
+        prompts.append(ApiPrompt(id=f"id::{prompt.id}", **properties))
+
+    # Add any task run config prompts to the list
+    task_run_configs = parent_task.run_configs()
+    for task_run_config in task_run_configs:
+        if task_run_config.prompt:
+            properties = task_run_config.prompt.model_dump(exclude={"id"})
+            prompts.append(
+                ApiPrompt(
+                    id=f"task_run_config::{project_id}::{task_id}::{task_run_config.id}",
+                    **properties,
+                )
+            )
+    return prompts
+
+
+def create_prompt_sync(
+    project_id: str, task_id: str, prompt_data: PromptCreateRequest
+) -> Prompt:
+    parent_task = task_from_id(project_id, task_id)
+    prompt = Prompt(
+        parent=parent_task,
+        name=prompt_data.name,
+        description=prompt_data.description,
+        prompt=prompt_data.prompt,
+        chain_of_thought_instructions=prompt_data.chain_of_thought_instructions,
+    )
+    prompt.save_to_file()
+    return prompt
+
+
+def update_prompt_sync(
+    project_id: str, task_id: str, prompt_id: str, prompt_data: PromptUpdateRequest
+) -> Prompt:
+    prompt = editable_prompt_from_id(project_id, task_id, prompt_id)
+    prompt.name = prompt_data.name
+    prompt.description = prompt_data.description
+    prompt.save_to_file()
+    return prompt
+
+
 def connect_prompt_api(app: FastAPI):
     @app.post("/api/projects/{project_id}/task/{task_id}/prompt")
     async def create_prompt(
         project_id: str, task_id: str, prompt_data: PromptCreateRequest
     ) -> Prompt:
-        parent_task = task_from_id(project_id, task_id)
-        prompt = Prompt(
-            parent=parent_task,
-            name=prompt_data.name,
-            description=prompt_data.description,
-            prompt=prompt_data.prompt,
-            chain_of_thought_instructions=prompt_data.chain_of_thought_instructions,
+        return await run_storage(
+            project_id, create_prompt_sync, project_id, task_id, prompt_data
         )
-        prompt.save_to_file()
-        return prompt
 
     @app.get("/api/projects/{project_id}/task/{task_id}/prompts")
-    async def get_prompts(project_id: str, task_id: str) -> PromptResponse:
-        parent_task = task_from_id(project_id, task_id)
-
-        prompts: list[ApiPrompt] = []
-        for prompt in parent_task.prompts():
-            properties = prompt.model_dump(exclude={"id"})
-            prompts.append(ApiPrompt(id=f"id::{prompt.id}", **properties))
-
-        # Add any task run config prompts to the list
-        task_run_configs = parent_task.run_configs()
-        for task_run_config in task_run_configs:
-            if task_run_config.prompt:
-                properties = task_run_config.prompt.model_dump(exclude={"id"})
-                prompts.append(
-                    ApiPrompt(
-                        id=f"task_run_config::{project_id}::{task_id}::{task_run_config.id}",
-                        **properties,
-                    )
-                )
-
+    async def get_prompts(
+        project_id: str, task_id: str, request: Request, response: Response
+    ) -> PromptResponse:
+        parent_task = await run_storage(project_id, task_from_id, project_id, task_id)
+        if parent_task.path is not None:
+            etag = await run_storage(
+                project_id,
+                collection_etag,
+                [
+                    Prompt.relationship_folder(parent_task.path),
+                    TaskRunConfig.relationship_folder(parent_task.path),
+                ],
+            )
+            not_modified = not_modified_response(request, response, etag)
+            if not_modified is not None:
+                return not_modified  # type: ignore
+
+        prompts = await run_storage(
+            project_id, load_api_prompts, parent_task, project_id, task_id
+        )
         return PromptResponse(
             generators=_prompt_generators,
             prompts=prompts,
@@ -102,16 +146,17 @@ def connect_prompt_api(app: FastAPI):
     async def update_prompt(
         project_id: str, task_id: str, prompt_id: str, prompt_data: PromptUpdateRequest
     ) -> Prompt:
-        prompt = editable_prompt_from_id(project_id, task_id, prompt_id)
-        prompt.name = prompt_data.name
-        prompt.description = prompt_data.description
-        prompt.save_to_file()
-        return prompt
+        return await run_storage(
+            project_id, update_prompt_sync, project_id, task_id, prompt_id, prompt_data
+        )
 
     @app.delete("/api/projects/{project_id}/tasks/{task_id}/prompts/{prompt_id}")
     async def delete_prompt(project_id: str, task_id: str, prompt_id: str) -> None:
-        prompt = editable_prompt_from_id(project_id, task_id, prompt_id)
-        prompt.delete()
+        def delete() -> None:
+            prompt = editable_prompt_from_id(project_id, task_id, prompt_id)
+            prompt.delete()
+
+        await run_storage(project_id, delete)
 
 
 # User friendly descriptions of the prompt generators
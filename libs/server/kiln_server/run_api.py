@@ -1,12 +1,25 @@
+import base64
+import binascii
+import bisect
 import json
 import logging
 import os
 import tempfile
 from asyncio import Lock
 from datetime import datetime
-from typing import Any, Dict
-
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from typing import Any, Dict, List, Literal
+
+from fastapi import (
+    FastAPI,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
 from kiln_ai.adapters.adapter_registry import adapter_for_task
 from kiln_ai.adapters.ml_model_list import ModelProviderName
 from kiln_ai.adapters.model_adapters.base_adapter import AdapterConfig
@@ -15,9 +28,18 @@ from kiln_ai.datamodel import (
     TaskOutputRating,
     TaskOutputRatingType,
     TaskRun,
+    TaskRunSummary,
 )
 from kiln_ai.datamodel.basemodel import ID_TYPE
+from kiln_ai.datamodel.bulk_delete import delete_children
+from kiln_ai.datamodel.dataset_filters import (
+    DatasetFilter,
+    dataset_filter_from_id,
+    filtered_run_ids,
+)
+from kiln_ai.datamodel.run_index import TaskRunIndex, TaskRunIndexEntry
 from kiln_ai.datamodel.task import RunConfigProperties
+from kiln_ai.datamodel.write_batch import WriteBatch
 from kiln_ai.utils.dataset_import import (
     DatasetFileImporter,
     DatasetImportFormat,
@@ -26,6 +48,9 @@ from kiln_ai.utils.dataset_import import (
 )
 from pydantic import BaseModel, ConfigDict
 
+from kiln_server.conditional_get import collection_etag, not_modified_response
+from kiln_server.ndjson import ndjson_response
+from kiln_server.storage_executor import run_storage, run_storage_json
 from kiln_server.task_api import task_from_id
 
 logger = logging.getLogger(__name__)
@@ -84,50 +109,250 @@ class RunSummary(BaseModel):
 
     @classmethod
     def repair_status_display_name(cls, run: TaskRun) -> str:
-        if run.repair_instructions:
+        return cls.repair_status(
+            has_repair_instructions=bool(run.repair_instructions),
+            has_output=bool(run.output),
+            has_output_text=bool(run.output and run.output.output),
+            rating=run.output.rating if run.output else None,
+        )
+
+    @classmethod
+    def repair_status(
+        cls,
+        has_repair_instructions: bool,
+        has_output: bool,
+        has_output_text: bool,
+        rating: TaskOutputRating | None,
+    ) -> str:
+        if has_repair_instructions:
             return "Repaired"
-        elif run.output and not run.output.rating:
+        elif has_output and not rating:
             # A repair isn't requested until rated < 5 stars
             return "NA"
-        elif not run.output or not run.output.output:
+        elif not has_output_text:
             return "No output"
         elif (
-            run.output.rating
-            and run.output.rating.value == 5.0
-            and run.output.rating.type == TaskOutputRatingType.five_star
+            rating
+            and rating.value == 5.0
+            and rating.type == TaskOutputRatingType.five_star
         ):
             return "No repair needed"
-        elif (
-            run.output.rating
-            and run.output.rating.type != TaskOutputRatingType.five_star
-        ):
+        elif rating and rating.type != TaskOutputRatingType.five_star:
             return "Unknown"
-        elif run.output.output:
+        elif has_output_text:
             return "Repair needed"
         return "Unknown"
 
     @classmethod
     def from_run(cls, run: TaskRun) -> "RunSummary":
-        model_name = (
-            run.output.source.properties.get("model_name")
-            if run.output and run.output.source and run.output.source.properties
-            else None
-        )
-        if not isinstance(model_name, str):
-            model_name = None
-        output = run.output.output if run.output and run.output.output else None
+        return cls.from_task_run_summary(TaskRunSummary.from_run(run))
 
+    @classmethod
+    def from_task_run_summary(cls, summary: TaskRunSummary) -> "RunSummary":
         return RunSummary(
-            id=run.id,
-            rating=run.output.rating,
-            tags=run.tags,
-            input_preview=RunSummary.format_preview(run.input),
-            output_preview=RunSummary.format_preview(output),
-            created_at=run.created_at,
-            repair_state=RunSummary.repair_status_display_name(run),
-            model_name=model_name,
-            input_source=run.input_source.type if run.input_source else None,
+            id=summary.id,
+            rating=summary.rating,
+            tags=summary.tags,
+            input_preview=RunSummary.format_preview(summary.input_preview),
+            output_preview=RunSummary.format_preview(summary.output_preview or None),
+            created_at=summary.created_at,
+            repair_state=RunSummary.repair_status(
+                has_repair_instructions=summary.has_repair_instructions,
+                has_output=summary.output_preview is not None,
+                has_output_text=bool(summary.output_preview),
+                rating=summary.rating,
+            ),
+            model_name=summary.model_name,
+            input_source=summary.input_source_type,
+        )
+
+
+RunSummarySort = Literal["created_at", "rating", "model"]
+# Response headers for paged run summaries
+TOTAL_COUNT_HEADER = "X-Total-Count"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def run_summary_sort_key(summary: RunSummary, sort: RunSummarySort) -> List[Any]:
+    """A JSON serializable sort key. Ties are broken by creation time, then by ID so every run has a distinct position."""
+    if sort == "rating":
+        # Unrated runs sort below rated runs
+        rating = summary.rating.value if summary.rating else None
+        primary: List[Any] = [rating is not None, rating or 0.0]
+    elif sort == "model":
+        primary = [summary.model_name or ""]
+    else:
+        primary = []
+    return primary + [summary.created_at.timestamp(), summary.id or ""]
+
+
+def encode_cursor(sort: RunSummarySort, descending: bool, sort_key: List[Any]) -> str:
+    cursor = {"sort": sort, "descending": descending, "after": sort_key}
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+
+def decode_cursor(cursor: str, sort: RunSummarySort, descending: bool) -> List[Any]:
+    """The sort key in a cursor. The cursor must be from a page with the same sort and direction."""
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(decoded, dict) or not isinstance(decoded.get("after"), list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if decoded.get("sort") != sort or decoded.get("descending") != descending:
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor is from a different sort. Start again from the first page.",
         )
+    return decoded["after"]
+
+
+def page_sorted(
+    keyed: List[tuple[List[Any], Any]],
+    sort: RunSummarySort,
+    descending: bool,
+    limit: int | None,
+    cursor: str | None,
+) -> tuple[List[Any], str | None]:
+    """
+    Sort (sort key, item) pairs and return the items on the page after the cursor, with the cursor for the next page (None on the last page).
+
+    Cursors hold the sort key of the last run on the page, so pages stay consistent while runs are added or deleted, and the sort they're for.
+    """
+    keyed = sorted(keyed, key=lambda item: item[0])
+    keys = [key for key, _ in keyed]
+    if cursor is None:
+        page = keyed[::-1] if descending else keyed
+    else:
+        after = decode_cursor(cursor, sort, descending)
+        try:
+            if descending:
+                page = keyed[: bisect.bisect_left(keys, after)][::-1]
+            else:
+                page = keyed[bisect.bisect_right(keys, after) :]
+        except TypeError:
+            # A sort key which doesn't match the sort: not a cursor we issued
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    if limit is None or len(page) <= limit:
+        return [item for _, item in page], None
+    page = page[:limit]
+    return [item for _, item in page], encode_cursor(sort, descending, page[-1][0])
+
+
+def page_run_summaries(
+    summaries: List[RunSummary],
+    sort: RunSummarySort,
+    descending: bool,
+    limit: int | None,
+    cursor: str | None,
+) -> tuple[List[RunSummary], str | None]:
+    """Sort summaries and return the page after the cursor, with the cursor for the next page (see `page_sorted`)."""
+    return page_sorted(
+        [(run_summary_sort_key(summary, sort), summary) for summary in summaries],
+        sort,
+        descending,
+        limit,
+        cursor,
+    )
+
+
+def index_sort_key(entry: TaskRunIndexEntry, sort: RunSummarySort) -> List[Any]:
+    """The sort key of `run_summary_sort_key`, from a run's index entry. The index has no model names, so not for the model sort."""
+    if sort == "rating":
+        primary: List[Any] = [
+            entry.rating_value is not None,
+            entry.rating_value or 0.0,
+        ]
+    else:
+        primary = []
+    return primary + [entry.created_at.timestamp(), entry.id or ""]
+
+
+def index_run_summaries_page(
+    task: Task,
+    dataset_filter: DatasetFilter | None,
+    sort: RunSummarySort,
+    descending: bool,
+    limit: int | None,
+    cursor: str | None,
+) -> tuple[List[RunSummary], str | None, int] | None:
+    """
+    A page of summaries, its next cursor and the total count, answered from the run index. Only the runs on the page are loaded.
+
+    Returns None if the index can't answer: it's disabled, or the sort is by model (which the index doesn't hold).
+    """
+    if sort == "model" or task.path is None:
+        return None
+    index = TaskRunIndex.for_task_path(task.path)
+    if index is None:
+        return None
+    entries = index.entries()
+    if dataset_filter is not None:
+        matching_ids = filtered_run_ids(task, dataset_filter)
+        entries = [entry for entry in entries if entry.id in matching_ids]
+    page, next_cursor = page_sorted(
+        [(index_sort_key(entry, sort), entry) for entry in entries],
+        sort,
+        descending,
+        limit,
+        cursor,
+    )
+    summaries = [
+        RunSummary.from_task_run_summary(TaskRun.load_summary(entry.path))
+        for entry in page
+    ]
+    return summaries, next_cursor, len(entries)
+
+
+def run_summaries_page(
+    task: Task,
+    dataset_filter: DatasetFilter | None,
+    sort: RunSummarySort,
+    descending: bool,
+    limit: int | None,
+    cursor: str | None,
+) -> tuple[List[RunSummary], str | None, int]:
+    """A page of summaries, its next cursor and the total count. From the run index if it can answer, otherwise by loading every summary."""
+    from_index = index_run_summaries_page(
+        task, dataset_filter, sort, descending, limit, cursor
+    )
+    if from_index is not None:
+        return from_index
+    run_summaries = load_run_summaries(task, dataset_filter)
+    page, next_cursor = page_run_summaries(
+        run_summaries, sort, descending, limit, cursor
+    )
+    return page, next_cursor, len(run_summaries)
+
+
+def load_run_summaries(
+    task: Task, dataset_filter: DatasetFilter | None
+) -> list[RunSummary]:
+    """Summaries of the task's runs, optionally only those matching the filter."""
+    matching_ids = None
+    if dataset_filter is not None:
+        matching_ids = filtered_run_ids(task, dataset_filter)
+
+    # Summaries only parse the fields we need, skipping full validation of each run
+    run_summaries: list[RunSummary] = []
+    for run_path in TaskRun.iterate_children_paths_of_parent_path(task.path):
+        summary = TaskRun.load_summary(run_path)
+        if matching_ids is not None and summary.id not in matching_ids:
+            continue
+        run_summaries.append(RunSummary.from_task_run_summary(summary))
+    return run_summaries
+
+
+def run_tag_counts(task: Task) -> Dict[str, int]:
+    """The number of the task's runs with each tag. Answered from the run index's tag table when enabled, so no runs are loaded."""
+    index = TaskRunIndex.for_task_path(task.path)
+    if index is not None:
+        return index.tag_counts()
+    tag_counts: Dict[str, int] = {}
+    for run_path in TaskRun.iterate_children_paths_of_parent_path(task.path):
+        for tag in TaskRun.load_summary(run_path).tags:
+            tag_counts[tag] = tag_counts.get(tag, 0) + 1
+    return tag_counts
 
 
 class BulkUploadResponse(BaseModel):
@@ -158,45 +383,121 @@ def task_and_run_from_id(
 def connect_run_api(app: FastAPI):
     @app.get("/api/projects/{project_id}/tasks/{task_id}/runs/{run_id}")
     async def get_run(project_id: str, task_id: str, run_id: str) -> TaskRun:
-        return run_from_id(project_id, task_id, run_id)
+        return await run_storage(project_id, run_from_id, project_id, task_id, run_id)
 
     @app.delete("/api/projects/{project_id}/tasks/{task_id}/runs/{run_id}")
     async def delete_run(project_id: str, task_id: str, run_id: str):
-        run = run_from_id(project_id, task_id, run_id)
-        run.delete()
+        def delete() -> None:
+            run = run_from_id(project_id, task_id, run_id)
+            run.delete()
+
+        await run_storage(project_id, delete)
 
     @app.get("/api/projects/{project_id}/tasks/{task_id}/runs")
     async def get_runs(project_id: str, task_id: str) -> list[TaskRun]:
-        task = task_from_id(project_id, task_id)
-        return list(task.runs(readonly=True))
+        def load_runs() -> list[TaskRun]:
+            task = task_from_id(project_id, task_id)
+            return list(task.runs(readonly=True, trusted=True))
+
+        return await run_storage_json(project_id, list[TaskRun], load_runs)  # type: ignore
+
+    @app.get("/api/projects/{project_id}/tasks/{task_id}/runs_stream")
+    async def get_runs_stream(project_id: str, task_id: str) -> StreamingResponse:
+        """Every run of the task, streamed as NDJSON (one run per line)."""
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
+        return ndjson_response(project_id, task.iter_runs(readonly=True, trusted=True))
 
     @app.get("/api/projects/{project_id}/tasks/{task_id}/runs_summaries")
-    async def get_runs_summary(project_id: str, task_id: str) -> list[RunSummary]:
-        task = task_from_id(project_id, task_id)
-        # Readonly since we are not mutating the runs. Faster as we don't need to copy them.
-        runs = task.runs(readonly=True)
-        run_summaries: list[RunSummary] = []
-        for run in runs:
-            summary = RunSummary.from_run(run)
-            run_summaries.append(summary)
-        return run_summaries
+    async def get_runs_summary(
+        project_id: str,
+        task_id: str,
+        request: Request,
+        response: Response,
+        sort: RunSummarySort | None = None,
+        descending: bool = False,
+        filter_id: str | None = None,
+        limit: int | None = Query(None, ge=1),
+        cursor: str | None = None,
+    ) -> list[RunSummary]:
+        """
+        Summaries of a task's runs, for list views.
+
+        Without parameters, returns every run. Optionally filtered by a dataset filter ID, sorted, and paged: pass the X-Next-Cursor header of one page as the cursor for the next. The X-Total-Count header has the number of runs matching the filter, across all pages.
+
+        Supports conditional requests: returns 304 if the If-None-Match header matches the current ETag.
+        """
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
+        if task.path is not None:
+            etag = await run_storage(
+                project_id,
+                collection_etag,
+                [TaskRun.relationship_folder(task.path)],
+                str(request.query_params),
+            )
+            not_modified = not_modified_response(request, response, etag)
+            if not_modified is not None:
+                return not_modified  # type: ignore
+        dataset_filter = None
+        if filter_id is not None:
+            try:
+                dataset_filter = dataset_filter_from_id(filter_id)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        headers: Dict[str, str] = {}
+
+        def load_page() -> list[RunSummary]:
+            if sort is None and limit is None and cursor is None:
+                page = load_run_summaries(task, dataset_filter)
+                total = len(page)
+            else:
+                page, next_cursor, total = run_summaries_page(
+                    task,
+                    dataset_filter,
+                    sort or "created_at",
+                    descending,
+                    limit,
+                    cursor,
+                )
+                if next_cursor is not None:
+                    headers[NEXT_CURSOR_HEADER] = next_cursor
+            headers[TOTAL_COUNT_HEADER] = str(total)
+            return page
+
+        json_response = await run_storage_json(project_id, list[RunSummary], load_page)
+        # A returned response doesn't get the headers set on the injected one (eg. the ETag)
+        for name in ("ETag", "Cache-Control"):
+            if name in response.headers:
+                json_response.headers[name] = response.headers[name]
+        json_response.headers.update(headers)
+        return json_response  # type: ignore
+
+    @app.get("/api/projects/{project_id}/tasks/{task_id}/tag_counts")
+    async def get_tag_counts(project_id: str, task_id: str) -> Dict[str, int]:
+        """The number of runs with each tag, for tag pickers."""
+
+        def load_tag_counts() -> Dict[str, int]:
+            return run_tag_counts(task_from_id(project_id, task_id))
+
+        return await run_storage(project_id, load_tag_counts)
 
     @app.post("/api/projects/{project_id}/tasks/{task_id}/runs/delete")
     async def delete_runs(project_id: str, task_id: str, run_ids: list[str]):
-        task = task_from_id(project_id, task_id)
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
+        if task.path is None:
+            raise HTTPException(status_code=400, detail="Task has no path")
+        result = await run_storage(
+            project_id, delete_children, TaskRun, task.path, run_ids
+        )
         failed_runs: list[str] = []
         last_error: Exception | None = None
-        for run_id in run_ids:
-            try:
-                run = TaskRun.from_id_and_parent_path(run_id, task.path)
-                if run:
-                    run.delete()
-                else:
-                    failed_runs.append(run_id)
-                    last_error = Exception("Run not found")
-            except Exception as e:
-                last_error = e
+        for run_id in dict.fromkeys(run_ids):
+            if run_id in result.missing:
                 failed_runs.append(run_id)
+                last_error = Exception("Run not found")
+            elif run_id in result.failed:
+                failed_runs.append(run_id)
+                last_error = result.failed[run_id]
         if failed_runs:
             raise HTTPException(
                 status_code=500,
@@ -211,7 +512,7 @@ def connect_run_api(app: FastAPI):
     async def run_task(
         project_id: str, task_id: str, request: RunTaskRequest
     ) -> TaskRun:
-        task = task_from_id(project_id, task_id)
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
 
         run_config_properties = request.run_config_properties
 
@@ -247,24 +548,15 @@ def connect_run_api(app: FastAPI):
         add_tags: list[str] | None = None,
         remove_tags: list[str] | None = None,
     ):
-        task = task_from_id(project_id, task_id)
-        failed_runs: list[str] = []
-        for run_id in run_ids:
-            run = TaskRun.from_id_and_parent_path(run_id, task.path)
-            if not run:
-                failed_runs.append(run_id)
-            else:
-                modified = False
-                if remove_tags and any(tag in (run.tags or []) for tag in remove_tags):
-                    run.tags = list(
-                        set(tag for tag in (run.tags or []) if tag not in remove_tags)
-                    )
-                    modified = True
-                if add_tags and any(tag not in (run.tags or []) for tag in add_tags):
-                    run.tags = list(set((run.tags or []) + add_tags))
-                    modified = True
-                if modified:
-                    run.save_to_file()
+        failed_runs = await run_storage(
+            project_id,
+            edit_run_tags,
+            project_id,
+            task_id,
+            run_ids,
+            add_tags,
+            remove_tags,
+        )
 
         if failed_runs:
             raise HTTPException(
@@ -284,7 +576,7 @@ def connect_run_api(app: FastAPI):
         # JSON string since multipart/form-data doesn't support dictionary types
         splits: str | None = Form(None),
     ) -> BulkUploadResponse:
-        task = task_from_id(project_id, task_id)
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
 
         # Parse splits from json form data
         splits_dict = parse_splits(splits)
@@ -295,12 +587,11 @@ def connect_run_api(app: FastAPI):
             tempfile.gettempdir(),
             file_name,
         )
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        content = await file.read()
 
-        imported_count = 0
-        try:
+        def import_file() -> int:
+            with open(file_path, "wb") as f:
+                f.write(content)
             importer = DatasetFileImporter(
                 task,
                 ImportConfig(
@@ -310,7 +601,11 @@ def connect_run_api(app: FastAPI):
                     tag_splits=splits_dict,
                 ),
             )
-            imported_count = importer.create_runs_from_file()
+            return importer.create_runs_from_file()
+
+        imported_count = 0
+        try:
+            imported_count = await run_storage(project_id, import_file)
         except KilnInvalidImportFormat as e:
             logger.error(
                 f"Invalid import format in {file_name}: {str(e)}",
@@ -333,22 +628,62 @@ async def update_run_util(
 ) -> TaskRun:
     # Lock to prevent overwriting concurrent updates
     async with update_run_lock:
-        task = task_from_id(project_id, task_id)
+        return await run_storage(
+            project_id, update_run_sync, project_id, task_id, run_id, run_data
+        )
 
-        run = TaskRun.from_id_and_parent_path(run_id, task.path)
-        if run is None:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Run not found. ID: {run_id}",
-            )
 
-        # Update and save
-        old_run_dumped = run.model_dump()
-        merged = deep_update(old_run_dumped, run_data)
-        updated_run = TaskRun.model_validate(merged)
-        updated_run.path = run.path
-        updated_run.save_to_file()
-        return updated_run
+def update_run_sync(
+    project_id: str, task_id: str, run_id: str, run_data: Dict[str, Any]
+) -> TaskRun:
+    task = task_from_id(project_id, task_id)
+
+    run = TaskRun.from_id_and_parent_path(run_id, task.path)
+    if run is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Run not found. ID: {run_id}",
+        )
+
+    # Update and save
+    old_run_dumped = run.model_dump()
+    merged = deep_update(old_run_dumped, run_data)
+    updated_run = TaskRun.model_validate(merged)
+    updated_run.path = run.path
+    updated_run.save_to_file()
+    return updated_run
+
+
+def edit_run_tags(
+    project_id: str,
+    task_id: str,
+    run_ids: list[str],
+    add_tags: list[str] | None,
+    remove_tags: list[str] | None,
+) -> list[str]:
+    """Add and remove tags on runs. Returns the IDs of runs not found."""
+    task = task_from_id(project_id, task_id)
+    failed_runs: list[str] = []
+    # Write all modified runs together, rather than one file at a time
+    batch = WriteBatch()
+    for run_id in run_ids:
+        run = TaskRun.from_id_and_parent_path(run_id, task.path)
+        if not run:
+            failed_runs.append(run_id)
+        else:
+            modified = False
+            if remove_tags and any(tag in (run.tags or []) for tag in remove_tags):
+                run.tags = list(
+                    set(tag for tag in (run.tags or []) if tag not in remove_tags)
+                )
+                modified = True
+            if add_tags and any(tag not in (run.tags or []) for tag in add_tags):
+                run.tags = list(set((run.tags or []) + add_tags))
+                modified = True
+            if modified:
+                batch.save(run)
+    batch.commit()
+    return failed_runs
 
 
 def model_provider_from_string(provider: str) -> ModelProviderName:
@@ -0,0 +1,127 @@
+"""
+Runs blocking datamodel IO off the event loop.
+
+Route handlers are async, so blocking disk work done directly in a handler (listing runs, saving or deleting models, importing files) stalls every other request until it finishes, including event streams like eval progress. Handlers pass that work to `run_storage` instead, which runs it in a bounded thread pool:
+ - `storage_workers` threads in total (see Config), so a burst of requests can't start unbounded threads or thrash the disk.
+ - At most `storage_project_concurrency` calls at once per project, so heavy work in one project can't take every worker from the others. Calls wait for a slot on the event loop, without holding a worker.
+
+FastAPI validates and serializes the results of async routes on the event loop, which for thousands of models takes as long as loading them. Routes returning large collections use `run_storage_json` to serialize in the worker too.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, TypeVar
+
+from fastapi import Response
+from kiln_ai.utils.config import Config
+from pydantic import TypeAdapter
+
+T = TypeVar("T")
+
+_executor_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+_limits_lock = threading.Lock()
+
+
+class _ProjectLimit:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        # Calls running or waiting. The limit is dropped when none are left, so project IDs don't accumulate (including invalid ones from bad requests).
+        self.users = 0
+
+
+# Event loop -> project ID -> limit. Semaphores belong to the loop they're used on, and a process may run several loops (eg. tests).
+_project_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _ProjectLimit]]" = weakref.WeakKeyDictionary()
+
+
+def storage_workers() -> int:
+    workers = Config.shared().storage_workers
+    return workers if isinstance(workers, int) and workers > 0 else 1
+
+
+def storage_project_concurrency() -> int:
+    limit = Config.shared().storage_project_concurrency
+    return limit if isinstance(limit, int) and limit > 0 else 1
+
+
+def storage_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=storage_workers(), thread_name_prefix="kiln_storage"
+            )
+        return _executor
+
+
+def shutdown_storage_executor() -> None:
+    """Wait for running storage calls, and stop the workers. A later call starts a new pool."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+async def run_storage(
+    project_id: str | None, func: Callable[..., T], /, *args, **kwargs
+) -> T:
+    """
+    Run blocking storage work in the storage pool, like `asyncio.to_thread`.
+
+    Pass the ID of the project the work reads or writes, to count it against that project's limit. None for work outside any one project (eg. listing projects).
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    if project_id is None:
+        return await loop.run_in_executor(storage_executor(), call)
+    async with _project_limit(loop, project_id):
+        return await loop.run_in_executor(storage_executor(), call)
+
+
+async def run_storage_json(
+    project_id: str | None,
+    response_type: Any,
+    func: Callable[..., Any],
+    /,
+    *args,
+    **kwargs,
+) -> Response:
+    """Like `run_storage`, but also serializes the result as JSON of `response_type` (the route's response model) in the worker."""
+
+    def call() -> Response:
+        content = _type_adapter(response_type).dump_json(func(*args, **kwargs))
+        return Response(content=content, media_type="application/json")
+
+    return await run_storage(project_id, call)
+
+
+@functools.lru_cache(maxsize=None)
+def _type_adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+@contextlib.asynccontextmanager
+async def _project_limit(
+    loop: asyncio.AbstractEventLoop, project_id: str
+) -> AsyncIterator[None]:
+    with _limits_lock:
+        limits = _project_limits.setdefault(loop, {})
+        limit = limits.get(project_id)
+        if limit is None:
+            limit = _ProjectLimit(storage_project_concurrency())
+            limits[project_id] = limit
+        limit.users += 1
+    try:
+        async with limit.semaphore:
+            yield
+    finally:
+        with _limits_lock:
+            limit.users -= 1
+            if limit.users == 0:
+                del limits[project_id]
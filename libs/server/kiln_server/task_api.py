@@ -6,6 +6,7 @@ from kiln_ai.datamodel import Task, TaskRequirement
 from pydantic import BaseModel
 
 from kiln_server.project_api import project_from_id
+from kiln_server.storage_executor import run_storage
 
 logger = logging.getLogger(__name__)
 
@@ -40,11 +41,14 @@ def connect_task_api(app: FastAPI):
                 status_code=400,
                 detail="Task ID cannot be set by client.",
             )
-        parent_project = project_from_id(project_id)
 
-        task = Task.validate_and_save_with_subrelations(
-            task_data, parent=parent_project
-        )
+        def save_task():
+            parent_project = project_from_id(project_id)
+            return Task.validate_and_save_with_subrelations(
+                task_data, parent=parent_project
+            )
+
+        task = await run_storage(project_id, save_task)
         if task is None:
             raise HTTPException(
                 status_code=400,
@@ -72,11 +76,15 @@ def connect_task_api(app: FastAPI):
                 status_code=400,
                 detail="Task ID cannot be changed by client in a patch.",
             )
-        original_task = task_from_id(project_id, task_id)
-        updated_task_data = original_task.model_copy(update=task_updates)
-        updated_task = Task.validate_and_save_with_subrelations(
-            updated_task_data.model_dump(), parent=original_task.parent
-        )
+
+        def save_task():
+            original_task = task_from_id(project_id, task_id)
+            updated_task_data = original_task.model_copy(update=task_updates)
+            return Task.validate_and_save_with_subrelations(
+                updated_task_data.model_dump(), parent=original_task.parent
+            )
+
+        updated_task = await run_storage(project_id, save_task)
         if updated_task is None:
             raise HTTPException(
                 status_code=400,
@@ -92,24 +100,25 @@ def connect_task_api(app: FastAPI):
 
     @app.delete("/api/projects/{project_id}/task/{task_id}")
     async def delete_task(project_id: str, task_id: str) -> None:
-        task = task_from_id(project_id, task_id)
-        task.delete()
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
+        await run_storage(project_id, task.delete)
 
     @app.get("/api/projects/{project_id}/tasks")
     async def get_tasks(project_id: str) -> List[Task]:
-        parent_project = project_from_id(project_id)
-        return parent_project.tasks()
+        parent_project = await run_storage(project_id, project_from_id, project_id)
+        return await run_storage(project_id, parent_project.tasks)
 
     @app.get("/api/projects/{project_id}/tasks/{task_id}")
     async def get_task(project_id: str, task_id: str) -> Task:
-        return task_from_id(project_id, task_id)
+        return await run_storage(project_id, task_from_id, project_id, task_id)
 
     @app.get("/api/projects/{project_id}/tasks/{task_id}/rating_options")
     async def get_rating_options(project_id: str, task_id: str) -> RatingOptionResponse:
         """
         Generates an object which determines which rating options should be shown for a given dataset item.
         """
-        task = task_from_id(project_id, task_id)
+        task = await run_storage(project_id, task_from_id, project_id, task_id)
+        evals = await run_storage(project_id, task.evals, readonly=True)
         results: List[RatingOption] = []
 
         # First add all task requirements. We want these to be shown for all items.
@@ -123,7 +132,7 @@ def connect_task_api(app: FastAPI):
             )
 
         # Then add eval requirements. We want these to be shown for all items in the eval's golden set filter.
-        for eval in task.evals(readonly=True):
+        for eval in evals:
             if not eval.eval_configs_filter_id.startswith("tag::"):
                 logger.warning(
                     "Eval '%s' has non-tag filter '%s'. This isn't compatible with the web UI for automatic rating visibility.",
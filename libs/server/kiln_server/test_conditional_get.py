@@ -0,0 +1,73 @@
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from kiln_server.conditional_get import (
+    collection_etag,
+    etag_matches,
+    not_modified_response,
+)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / "runs"
+    folder.mkdir()
+    return folder
+
+
+def test_collection_etag(folder, tmp_path):
+    etag = collection_etag([folder])
+    assert etag.startswith('W/"')
+    assert collection_etag([folder]) == etag
+    assert collection_etag([folder], "sort=rating") != etag
+    assert collection_etag([folder, tmp_path / "missing"]) != etag
+
+    (folder / "child").mkdir()
+    assert collection_etag([folder]) != etag
+    etag = collection_etag([folder])
+    (folder / "child" / "model.kiln").write_text("{}")
+    assert collection_etag([folder]) != etag
+
+
+@pytest.mark.parametrize(
+    "if_none_match,expected",
+    [
+        (None, False),
+        ('W/"abc"', True),
+        ('"abc"', True),
+        ('W/"other", W/"abc"', True),
+        ("*", True),
+        ('W/"other"', False),
+    ],
+)
+def test_etag_matches(if_none_match, expected):
+    headers = (
+        [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    )
+    request = Request({"type": "http", "headers": headers})
+    assert etag_matches(request, 'W/"abc"') is expected
+
+
+def test_not_modified_response():
+    app = FastAPI()
+    calls = []
+
+    @app.get("/items")
+    async def items(request: Request, response: Response) -> list[int]:
+        not_modified = not_modified_response(request, response, 'W/"v1"')
+        if not_modified is not None:
+            return not_modified  # type: ignore
+        calls.append(1)
+        return [1, 2]
+
+    client = TestClient(app)
+    response = client.get("/items")
+    assert response.status_code == 200
+    assert response.json() == [1, 2]
+    assert response.headers["ETag"] == 'W/"v1"'
+
+    response = client.get("/items", headers={"If-None-Match": 'W/"v1"'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert len(calls) == 1
@@ -0,0 +1,71 @@
+import json
+import threading
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from kiln_server import ndjson
+from kiln_server.ndjson import ndjson_chunks, ndjson_response
+
+
+class Record(BaseModel):
+    id: int
+    text: str
+
+
+def test_ndjson_chunks(monkeypatch):
+    monkeypatch.setattr(ndjson, "CHUNK_BYTES", 100)
+    records = [Record(id=i, text="x" * 30) for i in range(10)]
+
+    chunks = list(ndjson_chunks(records))
+    # Several records per chunk, and every chunk ends on a record boundary
+    assert 1 < len(chunks) < len(records)
+    assert all(chunk.endswith(b"\n") for chunk in chunks)
+    lines = b"".join(chunks).decode().splitlines()
+    assert [Record.model_validate_json(line) for line in lines] == records
+
+    assert list(ndjson_chunks([])) == []
+
+
+def test_ndjson_response_is_lazy():
+    loaded = []
+
+    def records():
+        for i in range(3):
+            loaded.append(i)
+            yield Record(id=i, text="text")
+
+    response = ndjson_response("project1", records())
+    # Nothing is loaded until the body is sent
+    assert loaded == []
+    assert response.media_type == "application/x-ndjson"
+
+    app = FastAPI()
+
+    @app.get("/records")
+    async def get_records() -> StreamingResponse:
+        return response
+
+    body = TestClient(app).get("/records").text
+    assert [json.loads(line)["id"] for line in body.splitlines()] == [0, 1, 2]
+
+
+def test_ndjson_response_loads_in_storage_pool():
+    threads = []
+
+    def records():
+        for i in range(3):
+            threads.append(threading.current_thread().name)
+            yield Record(id=i, text="text")
+
+    app = FastAPI()
+
+    @app.get("/records")
+    async def get_records() -> StreamingResponse:
+        return ndjson_response("project1", records())
+
+    body = TestClient(app).get("/records").text
+    assert len(body.splitlines()) == 3
+    assert all(name.startswith("kiln_storage") for name in threads)
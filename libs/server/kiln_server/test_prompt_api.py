@@ -107,6 +107,32 @@ def test_get_prompts_success(client, project_and_task):
     assert res["prompts"][0]["name"] == "Test Prompt"
 
 
+def test_get_prompts_conditional(client, project_and_task):
+    project, task = project_and_task
+    url = f"/api/projects/{project.id}/task/{task.id}/prompts"
+    prompt = Prompt(name="Test Prompt", prompt="This is a test prompt", parent=task)
+    prompt.save_to_file()
+
+    with patch("kiln_server.prompt_api.task_from_id", return_value=task):
+        response = client.get(url)
+        etag = response.headers["ETag"]
+        assert response.headers["Cache-Control"] == "no-cache"
+
+        with patch.object(Task, "prompts") as prompts:
+            unchanged = client.get(url, headers={"If-None-Match": etag})
+            # Answered without loading the prompts
+            prompts.assert_not_called()
+        assert unchanged.status_code == 304
+        assert unchanged.headers["ETag"] == etag
+
+        prompt.description = "edited"
+        prompt.save_to_file()
+        changed = client.get(url, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+        assert changed.json()["prompts"][0]["description"] == "edited"
+
+
 def test_get_prompts_task_not_found(client):
     response = client.get("/api/projects/project-id/task/fake-task-id/prompts")
     assert response.status_code == 404
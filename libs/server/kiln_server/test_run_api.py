@@ -1,3 +1,4 @@
+from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -21,6 +22,7 @@ from kiln_server.run_api import (
     RunSummary,
     connect_run_api,
     deep_update,
+    encode_cursor,
     model_provider_from_string,
     parse_splits,
     run_from_id,
@@ -749,6 +751,25 @@ def test_run_summary_from_run(task_run_setup):
     assert summary.input_source == run.input_source.type
 
 
+def test_get_runs_stream(client, tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    runs = save_summary_runs(task)
+
+    with patch("kiln_server.run_api.task_from_id", return_value=task):
+        response = client.get(f"/api/projects/{project.id}/tasks/{task.id}/runs_stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    streamed = [
+        TaskRun.model_validate_json(line) for line in response.text.splitlines()
+    ]
+    assert sorted(run.id for run in streamed) == sorted(run.id for run in runs)
+    assert streamed[0].input.startswith("input")
+
+
 @pytest.mark.asyncio
 async def test_get_runs_summaries_success(client, task_run_setup):
     project = task_run_setup["project"]
@@ -756,9 +777,7 @@ async def test_get_runs_summaries_success(client, task_run_setup):
     task_run = task_run_setup["task_run"]
 
     with patch("kiln_server.run_api.task_from_id") as mock_task_from_id:
-        mock_task = MagicMock()
-        mock_task.runs.return_value = [task_run]
-        mock_task_from_id.return_value = mock_task
+        mock_task_from_id.return_value = task
 
         response = client.get(
             f"/api/projects/{project.id}/tasks/{task.id}/runs_summaries"
@@ -794,6 +813,289 @@ async def test_get_runs_summaries_task_not_found(client):
     assert response.json()["message"] == "Task not found"
 
 
+def save_summary_runs(task, count=5):
+    # Run i: rated i stars (run 0 unrated), model "model_{i % 2}", tagged "even" if i is even
+    runs = []
+    for i in range(count):
+        run = TaskRun(
+            parent=task,
+            input=f"input {i}",
+            input_source=DataSource(
+                type=DataSourceType.human, properties={"created_by": "Test User"}
+            ),
+            output=TaskOutput(
+                output=f"output {i}",
+                source=DataSource(
+                    type=DataSourceType.synthetic,
+                    properties={
+                        "model_name": f"model_{i % 2}",
+                        "model_provider": "ollama",
+                        "adapter_name": "kiln_langchain_adapter",
+                    },
+                ),
+                rating=TaskOutputRating(value=i) if i > 0 else None,
+            ),
+            tags=["even"] if i % 2 == 0 else [],
+            created_at=datetime(2025, 1, 1, 0, 0, i),
+        )
+        run.save_to_file()
+        runs.append(run)
+    return runs
+
+
+def get_summary_pages(client, project, task, **params):
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(
+            f"/api/projects/{project.id}/tasks/{task.id}/runs_summaries",
+            params={**params, **({"cursor": cursor} if cursor else {})},
+        )
+        assert response.status_code == 200
+        pages.append([summary["id"] for summary in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages, response
+
+
+@pytest.mark.parametrize(
+    "params,expected_order",
+    [
+        ({"sort": "created_at"}, [0, 1, 2, 3, 4]),
+        ({"sort": "created_at", "descending": True}, [4, 3, 2, 1, 0]),
+        ({"sort": "rating"}, [0, 1, 2, 3, 4]),
+        ({"sort": "rating", "descending": True}, [4, 3, 2, 1, 0]),
+        ({"sort": "model"}, [0, 2, 4, 1, 3]),
+        ({"sort": "model", "descending": True}, [3, 1, 4, 2, 0]),
+    ],
+)
+@pytest.mark.parametrize("index_enabled", [False, True])
+def test_get_runs_summaries_paged(
+    client, tmp_path, params, expected_order, index_enabled
+):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    runs = save_summary_runs(task)
+
+    with (
+        patch("kiln_server.run_api.task_from_id", return_value=task),
+        patch(
+            "kiln_ai.datamodel.run_index.task_run_index_enabled",
+            return_value=index_enabled,
+        ),
+    ):
+        pages, last_response = get_summary_pages(
+            client, project, task, limit=2, **params
+        )
+
+    expected_ids = [runs[i].id for i in expected_order]
+    assert pages == [expected_ids[0:2], expected_ids[2:4], expected_ids[4:]]
+    assert last_response.headers["X-Total-Count"] == "5"
+
+
+def test_get_runs_summaries_paged_from_index(client, tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    runs = save_summary_runs(task)
+    url = f"/api/projects/{project.id}/tasks/{task.id}/runs_summaries"
+
+    with (
+        patch("kiln_server.run_api.task_from_id", return_value=task),
+        patch("kiln_ai.datamodel.run_index.task_run_index_enabled", return_value=True),
+        patch.object(
+            TaskRun, "load_summary", wraps=TaskRun.load_summary
+        ) as load_summary,
+    ):
+        response = client.get(
+            url, params={"sort": "rating", "descending": True, "limit": 2}
+        )
+
+    # Only the runs on the page are loaded
+    assert load_summary.call_count == 2
+    assert [s["id"] for s in response.json()] == [runs[4].id, runs[3].id]
+    assert response.headers["X-Total-Count"] == "5"
+    assert "X-Next-Cursor" in response.headers
+
+
+def test_get_runs_summaries_pages_stable_across_deletes(client, tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    runs = save_summary_runs(task)
+    url = f"/api/projects/{project.id}/tasks/{task.id}/runs_summaries"
+
+    with patch("kiln_server.run_api.task_from_id", return_value=task):
+        first = client.get(url, params={"sort": "created_at", "limit": 2})
+        assert [s["id"] for s in first.json()] == [runs[0].id, runs[1].id]
+        # Deleting an earlier run doesn't shift the next page
+        runs[0].delete()
+        second = client.get(
+            url,
+            params={
+                "sort": "created_at",
+                "limit": 2,
+                "cursor": first.headers["X-Next-Cursor"],
+            },
+        )
+    assert [s["id"] for s in second.json()] == [runs[2].id, runs[3].id]
+    assert second.headers["X-Total-Count"] == "4"
+
+
+@pytest.mark.parametrize("index_enabled", [False, True])
+def test_get_runs_summaries_filtered(client, tmp_path, index_enabled):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    runs = save_summary_runs(task)
+
+    with (
+        patch("kiln_server.run_api.task_from_id", return_value=task),
+        patch(
+            "kiln_ai.datamodel.run_index.task_run_index_enabled",
+            return_value=index_enabled,
+        ),
+    ):
+        pages, last_response = get_summary_pages(
+            client,
+            project,
+            task,
+            filter_id="multi_filter::tag::even&high_rating",
+            sort="created_at",
+        )
+    assert pages == [[runs[4].id]]
+    assert last_response.headers["X-Total-Count"] == "1"
+
+
+@pytest.mark.parametrize("index_enabled", [False, True])
+def test_get_tag_counts(client, tmp_path, index_enabled):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    save_summary_runs(task)
+
+    with (
+        patch("kiln_server.run_api.task_from_id", return_value=task),
+        patch(
+            "kiln_ai.datamodel.run_index.task_run_index_enabled",
+            return_value=index_enabled,
+        ),
+        patch.object(
+            TaskRun, "load_summary", wraps=TaskRun.load_summary
+        ) as load_summary,
+    ):
+        response = client.get(f"/api/projects/{project.id}/tasks/{task.id}/tag_counts")
+
+    assert response.status_code == 200
+    assert response.json() == {"even": 3}
+    # With the index, counted from its tag table
+    assert load_summary.call_count == (0 if index_enabled else 5)
+
+
+def test_get_runs_summaries_unpaged_has_total(client, task_run_setup):
+    project = task_run_setup["project"]
+    task = task_run_setup["task"]
+    with patch("kiln_server.run_api.task_from_id", return_value=task):
+        response = client.get(
+            f"/api/projects/{project.id}/tasks/{task.id}/runs_summaries"
+        )
+    assert response.headers["X-Total-Count"] == "1"
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_runs_summaries_conditional(client, task_run_setup):
+    project = task_run_setup["project"]
+    task = task_run_setup["task"]
+    task_run = task_run_setup["task_run"]
+    url = f"/api/projects/{project.id}/tasks/{task.id}/runs_summaries"
+
+    with patch("kiln_server.run_api.task_from_id", return_value=task):
+        etag = client.get(url).headers["ETag"]
+        # Each set of query parameters is its own response
+        assert client.get(url, params={"sort": "rating"}).headers["ETag"] != etag
+
+        with patch.object(TaskRun, "load_summary") as load_summary:
+            response = client.get(url, headers={"If-None-Match": etag})
+            load_summary.assert_not_called()
+        assert response.status_code == 304
+
+        task_run.output.rating = TaskOutputRating(value=5)
+        task_run.save_to_file()
+        response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["rating"]["value"] == 5
+
+
+def test_get_runs_summaries_conditional_external_edit(client, task_run_setup):
+    project = task_run_setup["project"]
+    task = task_run_setup["task"]
+    task_run = task_run_setup["task_run"]
+    url = f"/api/projects/{project.id}/tasks/{task.id}/runs_summaries"
+
+    with patch("kiln_server.run_api.task_from_id", return_value=task):
+        etag = client.get(url).headers["ETag"]
+        # Edited outside this process (eg. a git pull), without Kiln's save hooks
+        contents = task_run.path.read_text()
+        task_run.path.write_text(contents.replace("Test input", "Pulled input"))
+        response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()[0]["input_preview"] == "Pulled input"
+
+
+@pytest.mark.parametrize(
+    "cursor_params,params",
+    [
+        # Sort keys of the same shape, so only the cursor's sort tells them apart
+        ({"sort": "created_at"}, {"sort": "created_at", "descending": True}),
+        ({"sort": "rating"}, {"sort": "created_at"}),
+        ({"sort": "model"}, {"sort": "created_at"}),
+    ],
+)
+def test_get_runs_summaries_cursor_from_other_sort(
+    client, tmp_path, cursor_params, params
+):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    save_summary_runs(task)
+    url = f"/api/projects/{project.id}/tasks/{task.id}/runs_summaries"
+
+    with patch("kiln_server.run_api.task_from_id", return_value=task):
+        first = client.get(url, params={**cursor_params, "limit": 2})
+        cursor = first.headers["X-Next-Cursor"]
+        response = client.get(url, params={**params, "limit": 2, "cursor": cursor})
+    assert response.status_code == 400
+    assert "different sort" in response.json()["message"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"filter_id": "not_a_filter"},
+        {"cursor": "not a cursor"},
+        # A sort key which doesn't match the sort
+        {"sort": "model", "cursor": encode_cursor("model", False, [1.0, "id"])},
+    ],
+)
+def test_get_runs_summaries_bad_params(client, task_run_setup, params):
+    project = task_run_setup["project"]
+    task = task_run_setup["task"]
+    with patch("kiln_server.run_api.task_from_id", return_value=task):
+        response = client.get(
+            f"/api/projects/{project.id}/tasks/{task.id}/runs_summaries",
+            params=params,
+        )
+    assert response.status_code == 400
+
+
 @pytest.mark.asyncio
 async def test_delete_multiple_runs_success(client, task_run_setup):
     project = task_run_setup["project"]
@@ -882,8 +1184,8 @@ async def test_delete_multiple_runs_with_exception(client, task_run_setup):
     with patch("kiln_server.run_api.task_from_id") as mock_task_from_id:
         mock_task_from_id.return_value = task
         # Simulate an unexpected error during deletion
-        with patch.object(TaskRun, "delete") as mock_delete:
-            mock_delete.side_effect = Exception("Unexpected error")
+        with patch("kiln_ai.datamodel.bulk_delete.os.rename") as mock_rename:
+            mock_rename.side_effect = Exception("Unexpected error")
             response = client.post(
                 f"/api/projects/{project.id}/tasks/{task.id}/runs/delete", json=run_ids
             )
@@ -0,0 +1,242 @@
+import asyncio
+import contextvars
+import json
+import statistics
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+from kiln_ai.datamodel import (
+    DataSource,
+    DataSourceType,
+    Project,
+    Task,
+    TaskOutput,
+    TaskRun,
+)
+from pydantic import BaseModel
+
+from kiln_server import storage_executor
+from kiln_server.server import make_app
+from kiln_server.storage_executor import (
+    run_storage,
+    run_storage_json,
+    shutdown_storage_executor,
+)
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+PING_INTERVAL = 0.005
+
+
+@pytest.mark.asyncio
+async def test_run_storage():
+    def work(value, suffix=""):
+        return value + suffix, threading.current_thread().name, request_id.get()
+
+    request_id.set("abc")
+    result, thread_name, seen_request_id = await run_storage(
+        "project", work, "value", suffix="!"
+    )
+    assert result == "value!"
+    assert thread_name.startswith("kiln_storage")
+    # Context is copied to the worker, like asyncio.to_thread
+    assert seen_request_id == "abc"
+
+    result, _, _ = await run_storage(None, work, "no project")
+    assert result == "no project"
+
+
+@pytest.mark.asyncio
+async def test_run_storage_raises():
+    def fail():
+        raise ValueError("disk on fire")
+
+    with pytest.raises(ValueError, match="disk on fire"):
+        await run_storage("project", fail)
+
+
+@pytest.mark.asyncio
+async def test_run_storage_project_limit():
+    running = {"a": 0, "b": 0}
+    most_running = {"a": 0, "b": 0}
+    lock = threading.Lock()
+
+    def work(project_id):
+        with lock:
+            running[project_id] += 1
+            most_running[project_id] = max(
+                most_running[project_id], running[project_id]
+            )
+        time.sleep(0.02)
+        with lock:
+            running[project_id] -= 1
+
+    with patch.object(storage_executor, "storage_project_concurrency", return_value=2):
+        await asyncio.gather(
+            *[run_storage(project_id, work, project_id) for project_id in "aaaaaabb"]
+        )
+    assert most_running == {"a": 2, "b": 2}
+
+
+@pytest.mark.asyncio
+async def test_run_storage_busy_project_does_not_block_others():
+    release = threading.Event()
+
+    with patch.object(storage_executor, "storage_project_concurrency", return_value=2):
+        busy = [
+            asyncio.ensure_future(run_storage("busy", release.wait, 10))
+            for _ in range(4)
+        ]
+        try:
+            # Busy calls beyond the limit wait on the loop, leaving workers for other projects
+            result = await asyncio.wait_for(
+                run_storage("other", lambda: "done"), timeout=5
+            )
+            assert result == "done"
+        finally:
+            release.set()
+            await asyncio.gather(*busy)
+
+
+@pytest.mark.asyncio
+async def test_run_storage_project_limits_dropped():
+    def fail():
+        raise ValueError("no such project")
+
+    await asyncio.gather(*[run_storage(f"project {i}", lambda: None) for i in range(5)])
+    with pytest.raises(ValueError):
+        await run_storage("not a project", fail)
+    # Limits only exist while a project has calls running or waiting
+    assert storage_executor._project_limits.get(asyncio.get_running_loop(), {}) == {}
+
+
+@pytest.mark.asyncio
+async def test_run_storage_json():
+    class Item(BaseModel):
+        name: str
+        count: int = 0
+
+    def load(names):
+        assert threading.current_thread().name.startswith("kiln_storage")
+        return [Item(name=name) for name in names]
+
+    response = await run_storage_json("project", list[Item], load, ["a", "b"])
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == [
+        {"name": "a", "count": 0},
+        {"name": "b", "count": 0},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_shutdown_storage_executor():
+    executor = storage_executor.storage_executor()
+    shutdown_storage_executor()
+    # A later call starts a new pool
+    assert await run_storage(None, lambda: 1) == 1
+    assert storage_executor.storage_executor() is not executor
+
+
+def save_runs(task: Task, count: int):
+    # Copy one run's file to many run folders, without going through the models
+    source = DataSource(type=DataSourceType.human, properties={"created_by": "tester"})
+    run = TaskRun(
+        parent=task,
+        input="test input",
+        input_source=source,
+        output=TaskOutput(output="test output", source=source),
+    )
+    run.save_to_file()
+    template = run.path.read_text()
+    runs_folder = run.path.parent.parent
+    for i in range(count):
+        run_id = f"bench{i:07d}"
+        path = runs_folder / run_id / TaskRun.base_filename()
+        path.parent.mkdir()
+        path.write_text(template.replace(run.id, run_id))
+
+
+async def ping_latencies_during_listing(app, project_id: str, task_id: str):
+    """Ping the server every PING_INTERVAL while it lists every run. Returns (ping latencies, listing time) in seconds."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        pinging = asyncio.Event()
+        listing_done = asyncio.Event()
+
+        async def list_runs():
+            await pinging.wait()
+            start = time.perf_counter()
+            response = await client.get(
+                f"/api/projects/{project_id}/tasks/{task_id}/runs"
+            )
+            assert response.status_code == 200
+            listing_done.set()
+            return time.perf_counter() - start
+
+        latencies = []
+
+        async def ping():
+            # Pings are due every PING_INTERVAL. Latency counts from when a ping was due, so time spent waiting for a blocked loop to send it counts too.
+            due = time.perf_counter()
+            while not listing_done.is_set():
+                await asyncio.sleep(max(0, due - time.perf_counter()))
+                response = await client.get("/ping")
+                assert response.status_code == 200
+                latencies.append(time.perf_counter() - due)
+                pinging.set()
+                due = max(due + PING_INTERVAL, time.perf_counter())
+
+        listing_time, _ = await asyncio.gather(list_runs(), ping())
+        return latencies, listing_time
+
+
+def p99(latencies):
+    return (
+        statistics.quantiles(latencies, n=100, method="inclusive")[98]
+        if len(latencies) > 1
+        else 0
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_benchmark_ping_latency_during_listing(tmp_path):
+    project = Project(name="Test Project", path=tmp_path / "project.kiln")
+    project.save_to_file()
+    task = Task(name="Test Task", instruction="Do the thing", parent=project)
+    task.save_to_file()
+    save_runs(task, 3000)
+    app = make_app()
+
+    async def run_inline(project_id, func, /, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    async def run_json_inline(project_id, response_type, func, /, *args, **kwargs):
+        # FastAPI serializes the result on the loop
+        return func(*args, **kwargs)
+
+    with patch("kiln_server.run_api.task_from_id", return_value=task):
+        # Listings blocking the event loop, as before the storage executor
+        with (
+            patch("kiln_server.run_api.run_storage", run_inline),
+            patch("kiln_server.run_api.run_storage_json", run_json_inline),
+        ):
+            (
+                blocking_latencies,
+                blocking_listing_time,
+            ) = await ping_latencies_during_listing(app, project.id, task.id)
+        latencies, listing_time = await ping_latencies_during_listing(
+            app, project.id, task.id
+        )
+
+    # I get a ping p99 of 10-15ms while listing 3000 runs. When the listing blocks the loop, a ping waits for the whole listing and serializing it (~1.5s).
+    print(
+        f"Ping p99 while listing 3000 runs: {p99(latencies) * 1000:.1f}ms over {len(latencies)} pings (listing {listing_time * 1000:.0f}ms). "
+        f"Blocking: p99 {p99(blocking_latencies) * 1000:.1f}ms, max {max(blocking_latencies) * 1000:.0f}ms over {len(blocking_latencies)} pings (listing {blocking_listing_time * 1000:.0f}ms)"
+    )
+    assert len(latencies) > 10
+    # Pings keep being answered while the listing runs. Lenient for CI and a loaded machine running the rest of the suite.
+    assert p99(latencies) < max(0.25, listing_time / 2)